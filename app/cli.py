@@ -0,0 +1,244 @@
+"""Interface de linha de comando (sem PyQt5) para uso em scripts e servidores.
+
+Exemplos:
+    python -m app.cli add expense 45,90 --category Alimentação --description Mercado
+    python -m app.cli list expense --month 2024-05
+    python -m app.cli report --month 2024-05
+    python -m app.cli import extrato.ofx --map mercado=Alimentação
+    python -m app.cli export expense despesas.csv --start 2024-01-01 --end 2025-01-01
+"""
+import argparse
+import sqlite3
+import sys
+from datetime import date
+from typing import List, Optional, Sequence
+
+from app.utils.dates import MONTH_NAMES
+from app.utils.formatting import format_cents_brl, format_date_brl
+
+KINDS = ("expense", "revenue")
+
+
+def _parse_month(value: str) -> tuple[int, int]:
+    """Aceita 'AAAA-MM' ou 'MM/AAAA'."""
+    value = value.strip()
+    try:
+        if "/" in value:
+            month, year = value.split("/")
+        else:
+            year, month = value.split("-")[:2]
+        year, month = int(year), int(month)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"mês inválido: {value!r} (use AAAA-MM)")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"mês inválido: {value!r} (use AAAA-MM)")
+    return year, month
+
+
+def _parse_date(value: str) -> str:
+    from app.services.import_service import parse_date
+    try:
+        return parse_date(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+
+def _parse_amount(value: str) -> int:
+    from app.services.import_service import parse_amount
+    try:
+        cents = parse_amount(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    if cents <= 0:
+        raise argparse.ArgumentTypeError("o valor deve ser positivo")
+    return cents
+
+
+def _controller(kind: str):
+    # Importa só o necessário: cada subcomando abre apenas as tabelas que usa
+    if kind == "expense":
+        from app.controllers.expense_controller import ExpenseController
+        return ExpenseController()
+    from app.controllers.revenue_controller import RevenueController
+    return RevenueController()
+
+
+def _print_table(headers: Sequence[str], rows: List[Sequence[str]], right: Sequence[int] = ()) -> None:
+    widths = [len(h) for h in headers]
+    for row in rows:
+        widths = [max(w, len(str(c))) for w, c in zip(widths, row)]
+
+    def fmt(row):
+        return "  ".join(
+            str(c).rjust(w) if i in right else str(c).ljust(w) for i, (c, w) in enumerate(zip(row, widths))
+        ).rstrip()
+
+    print(fmt(headers))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print(fmt(row))
+
+
+# ---- Subcomandos ----
+def cmd_add(args) -> int:
+    if args.kind == "contribution":
+        if args.investment_id is None:
+            print("erro: --investment-id é obrigatório para aportes", file=sys.stderr)
+            return 2
+        from app.controllers.investment_controller import InvestmentController
+        InvestmentController().add_contribution(args.investment_id, args.date, args.description, args.amount)
+    else:
+        if not args.category:
+            print("erro: --category é obrigatório", file=sys.stderr)
+            return 2
+        controller = _controller(args.kind)
+        if args.kind == "expense":
+            controller.add_expense(args.date, args.category, args.description, args.amount)
+        else:
+            controller.add_revenue(args.date, args.category, args.description, args.amount)
+    print(f"{args.kind} {format_date_brl(args.date)} {format_cents_brl(args.amount)}")
+    return 0
+
+
+def cmd_list(args) -> int:
+    if args.kind == "investment":
+        from app.controllers.investment_controller import InvestmentController
+        items = InvestmentController().list_investments_with_totals()
+        _print_table(
+            ("ID", "Nome", "Corretora", "Início", "Inicial", "Aportes", "Total"),
+            [
+                (i["id"], i["name"], i["broker"], format_date_brl(i["start_date"]), format_cents_brl(i["initial_amount"]),
+                 format_cents_brl(i["contributions_sum"]), format_cents_brl(i["total"]))
+                for i in items
+            ],
+            right=(0, 4, 5, 6),
+        )
+        return 0
+    year, month = args.month
+    controller = _controller(args.kind)
+    page = getattr(controller, f"list_{args.kind}s_page")
+    rows, after = [], None
+    # Percorre o mês em páginas (keyset) como as tabelas da UI
+    while True:
+        items = page(year, month, after, 1000)
+        rows.extend(
+            (i["id"], format_date_brl(i["date"]), i["category"], i["description"], format_cents_brl(i["amount"]))
+            for i in items
+        )
+        if len(items) < 1000:
+            break
+        after = (items[-1]["date"], items[-1]["id"])
+    _print_table(("ID", "Data", "Categoria", "Descrição", "Valor"), rows, right=(0, 4))
+    print(f"\nTotal do mês: {format_cents_brl(controller.month_total(year, month))}")
+    return 0
+
+
+def cmd_report(args) -> int:
+    from app.services.report_service import ReportService
+    year, month = args.month
+    reports = ReportService().build_reports(year, month)
+    labels = {"expense": "Despesas", "revenue": "Receitas"}
+    if args.annual:
+        for kind in KINDS:
+            print(f"{labels[kind]} por mês ({year})")
+            _print_table(
+                ("Categoria",) + tuple(MONTH_NAMES),
+                [(cat,) + tuple(format_cents_brl(v) for v in months) for cat, months in reports[f"{kind}_annual"]],
+                right=range(1, 13),
+            )
+            print()
+        return 0
+    totals = {}
+    for kind in KINDS:
+        rows = reports[f"{kind}_monthly"]
+        totals[kind] = sum(total for _cat, total, _pct in rows)
+        print(f"{labels[kind]} por categoria ({month:02d}/{year})")
+        _print_table(
+            ("Categoria", "Total", "%"),
+            [(cat, format_cents_brl(total), f"{pct:.1f}%".replace(".", ",")) for cat, total, pct in rows],
+            right=(1, 2),
+        )
+        print()
+    balance = _controller("revenue").total_revenues_until_month(year, month) - _controller("expense").total_expenses_until_month(year, month)
+    print(f"Receitas do mês: {format_cents_brl(totals['revenue'])}")
+    print(f"Despesas do mês: {format_cents_brl(totals['expense'])}")
+    print(f"Saldo acumulado: {format_cents_brl(balance)}")
+    return 0
+
+
+def cmd_import(args) -> int:
+    from app.services.import_service import ImportService
+    category_map = {}
+    for item in args.map or []:
+        key, sep, category = item.partition("=")
+        if not sep or not key.strip() or not category.strip():
+            print(f"erro: --map espera PALAVRA=CATEGORIA, recebido {item!r}", file=sys.stderr)
+            return 2
+        category_map[key.strip()] = category.strip()
+    result = ImportService().import_file(args.path, args.kind, category_map, args.default_category)
+    print(f"{result.expenses} despesas e {result.revenues} receitas importadas; {result.skipped} ignoradas.")
+    for error in result.errors:
+        print(f"  {error}", file=sys.stderr)
+    return 0
+
+
+def cmd_export(args) -> int:
+    from app.services.export_service import ExportService
+    count = ExportService().export(args.kind, args.path, args.format, args.start, args.end, args.category)
+    print(f"{count} registros exportados para {args.path}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Mymoney em linha de comando")
+    sub = parser.add_subparsers(dest="command", required=True)
+    today = date.today()
+
+    p = sub.add_parser("add", help="adiciona despesa, receita ou aporte")
+    p.add_argument("kind", choices=KINDS + ("contribution",))
+    p.add_argument("amount", type=_parse_amount, help="valor em reais (ex.: 45,90)")
+    p.add_argument("--date", type=_parse_date, default=today.isoformat())
+    p.add_argument("--category", default="")
+    p.add_argument("--description", default="")
+    p.add_argument("--investment-id", type=int, help="investimento do aporte")
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("list", help="lista lançamentos do mês ou investimentos")
+    p.add_argument("kind", choices=KINDS + ("investment",))
+    p.add_argument("--month", type=_parse_month, default=(today.year, today.month), help="AAAA-MM (padrão: mês atual)")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("report", help="relatório por categoria e saldo")
+    p.add_argument("--month", type=_parse_month, default=(today.year, today.month), help="AAAA-MM (padrão: mês atual)")
+    p.add_argument("--annual", action="store_true", help="totais por mês do ano do --month")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("import", help="importa extrato CSV/OFX")
+    p.add_argument("path")
+    p.add_argument("--kind", choices=KINDS, help="força o tipo (padrão: pelo sinal do valor)")
+    p.add_argument("--map", action="append", metavar="PALAVRA=CATEGORIA", help="categoria por palavra na descrição")
+    p.add_argument("--default-category", default="Outros")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="exporta para CSV ou formato colunar")
+    p.add_argument("kind", choices=("expense", "revenue", "investment", "contribution"))
+    p.add_argument("path")
+    p.add_argument("--format", choices=("csv", "columnar"), default="csv")
+    p.add_argument("--start", type=_parse_date, help="data inicial (inclusiva)")
+    p.add_argument("--end", type=_parse_date, help="data final (exclusiva)")
+    p.add_argument("--category", action="append", help="filtra por categoria/corretora (repetível)")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError, sqlite3.Error) as exc:
+        print(f"erro: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
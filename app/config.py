@@ -26,4 +26,6 @@ ICONS_DIR = os.path.join(PROJECT_ROOT, "app", "ui", "assets", "icons")
 # Em ambiente de desenvolvimento, garante a existência do diretório de ícones;
 # em binários empacotados, os arquivos são incluídos via PyInstaller e não devem ser criados.
 if not getattr(sys, 'frozen', False):
-    os.makedirs(ICONS_DIR, exist_ok=True)
\ No newline at end of file
+    os.makedirs(ICONS_DIR, exist_ok=True)
+# STARTUP_REPORT=1 imprime no stderr os tempos de inicialização da interface
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "") not in ("", "0")
@@ -8,20 +8,31 @@ class ExpenseController:
     def __init__(self):
         self.storage = StorageService()
 
-    def add_expense(self, date: str, category: str, description: str, amount: float) -> None:
+    def add_expense(self, date: str, category: str, description: str, amount: int) -> None:
         expense = Expense(date=date, category=category, description=description, amount=amount)
         self.storage.save_expense(expense)
 
     def list_expenses(self) -> List[Dict]:
         return self.storage.load_expenses()
 
-    def total_expenses(self) -> float:
+    def list_expenses_page(self, year: int, month: int, after: tuple[str, int] | None = None, limit: int = 500) -> List[Dict]:
+        return self.storage.load_expenses_page(year, month, after, limit)
+
+    def get_expense(self, expense_id: int) -> Dict | None:
+        return self.storage.get_expense(expense_id)
+
+    def total_expenses(self) -> int:
         return self.storage.get_total()
 
-    def delete_expenses(self, indices: list[int]) -> None:
-        for i in sorted(indices, reverse=True):
-            self.storage.delete_expense(i)
+    def month_total(self, year: int, month: int) -> int:
+        return self.storage.get_month_total(year, month)
+
+    def total_expenses_until_month(self, year: int, month: int) -> int:
+        return self.storage.get_total_until_month(year, month)
+
+    def delete_expenses(self, expense_ids: list[int]) -> None:
+        self.storage.delete_expenses(expense_ids)
 
-    def update_expense(self, index: int, date: str, category: str, description: str, amount: float) -> None:
+    def update_expense(self, expense_id: int, date: str, category: str, description: str, amount: int) -> None:
         expense = Expense(date=date, category=category, description=description, amount=amount)
-        self.storage.update_expense(index, expense)
\ No newline at end of file
+        self.storage.update_expense(expense_id, expense)
@@ -1,43 +1,71 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+import numpy as np
 
 from app.models.investment import Investment
+from app.services.analytics_service import AnalyticsService
+from app.services.cache import VersionedCache
+from app.services.capital_service import CapitalSeriesService
 from app.services.investment_storage_service import InvestmentStorageService
 
 
 class InvestmentController:
     def __init__(self):
         self.storage = InvestmentStorageService()
+        # Leituras em cache até a próxima escrita em investimentos, corretoras ou aportes
+        self.cache = VersionedCache("investments", "brokers", "contributions")
+        self.analytics = AnalyticsService()
+        self.capital = CapitalSeriesService()
 
     # Investments
-    def add_investment(self, name: str, broker: str, start_date: str, description: str, initial_amount: float) -> None:
+    def add_investment(self, name: str, broker: str, start_date: str, description: str, initial_amount: int) -> None:
         inv = Investment(name=name, broker=broker, start_date=start_date, description=description, initial_amount=initial_amount)
         self.storage.save_investment(inv)
 
     def list_investments(self) -> List[Dict]:
-        return self.storage.load_investments()
+        return self.cache.get("investments", self.storage.load_investments)
+
+    def list_investments_with_totals(self) -> List[Dict]:
+        return self.cache.get("investments_with_totals", self.storage.load_investments_with_totals)
+
+    def list_investments_with_returns(self) -> List[Dict]:
+        """Investimentos com totais, último valor de mercado ("value") e rentabilidade ("xirr", "twr")."""
+        returns = self.analytics.investment_returns()
+        empty = {"value": None, "value_date": None, "xirr": None, "twr": None}
+        return [dict(item, **returns.get(item["id"], empty)) for item in self.list_investments_with_totals()]
 
-    def update_investment(self, index: int, name: str, broker: str, start_date: str, description: str, initial_amount: float) -> None:
+    def update_investment(self, investment_id: int, name: str, broker: str, start_date: str, description: str, initial_amount: int) -> None:
         inv = Investment(name=name, broker=broker, start_date=start_date, description=description, initial_amount=initial_amount)
-        self.storage.update_investment(index, inv)
+        self.storage.update_investment(investment_id, inv)
 
-    def delete_investments(self, indices: list[int]) -> None:
-        for i in sorted(indices, reverse=True):
-            self.storage.delete_investment(i)
+    def delete_investments(self, investment_ids: list[int]) -> None:
+        self.storage.delete_investments(investment_ids)
 
     # Contributions
-    def list_contributions(self, investment_index: int) -> List[Dict]:
-        return self.storage.load_contributions(investment_index)
+    def list_contributions(self, investment_id: int) -> List[Dict]:
+        return self.cache.get(("contributions", investment_id), lambda: self.storage.load_contributions(investment_id))
+
+    def add_contribution(self, investment_id: int, date: str, description: str, amount: int) -> None:
+        self.storage.save_contribution(investment_id, date, description, amount)
+
+    def delete_contributions(self, contribution_ids: list[int]) -> None:
+        self.storage.delete_contributions(contribution_ids)
+
+    # Valuations
+    def add_valuation(self, investment_id: int, date: str, value: int) -> None:
+        self.storage.save_valuation(investment_id, date, value)
 
-    def add_contribution(self, investment_index: int, date: str, description: str, amount: float) -> None:
-        self.storage.save_contribution(investment_index, date, description, amount)
+    # Capital series
+    def capital_series(self, investment_id: int, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Capital investido acumulado por dia em [start, end] (datas e centavos), para gráficos."""
+        return self.capital.investment_series(investment_id, start, end)
 
-    def delete_contributions(self, investment_index: int, indices: list[int]) -> None:
-        for i in sorted(indices, reverse=True):
-            self.storage.delete_contribution(investment_index, i)
+    def broker_capital_series(self, broker: str, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        return self.capital.broker_series(broker, start, end)
 
     # Totals
-    def total_invested(self) -> float:
-        return self.storage.get_total_invested()
+    def total_invested(self) -> int:
+        return self.cache.get("total_invested", self.storage.get_total_invested)
 
-    def contributions_sum(self, investment_index: int) -> float:
-        return self.storage.get_investment_contrib_sum(investment_index)
\ No newline at end of file
+    def contributions_sum(self, investment_id: int) -> int:
+        return self.storage.get_investment_contrib_sum(investment_id)
\ No newline at end of file
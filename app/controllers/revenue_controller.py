@@ -8,20 +8,31 @@ class RevenueController:
     def __init__(self):
         self.storage = RevenueStorageService()
 
-    def add_revenue(self, date: str, category: str, description: str, amount: float) -> None:
+    def add_revenue(self, date: str, category: str, description: str, amount: int) -> None:
         revenue = Revenue(date=date, category=category, description=description, amount=amount)
         self.storage.save_revenue(revenue)
 
     def list_revenues(self) -> List[Dict]:
         return self.storage.load_revenues()
 
-    def total_revenues(self) -> float:
+    def list_revenues_page(self, year: int, month: int, after: tuple[str, int] | None = None, limit: int = 500) -> List[Dict]:
+        return self.storage.load_revenues_page(year, month, after, limit)
+
+    def get_revenue(self, revenue_id: int) -> Dict | None:
+        return self.storage.get_revenue(revenue_id)
+
+    def total_revenues(self) -> int:
         return self.storage.get_total()
 
-    def delete_revenues(self, indices: list[int]) -> None:
-        for i in sorted(indices, reverse=True):
-            self.storage.delete_revenue(i)
+    def month_total(self, year: int, month: int) -> int:
+        return self.storage.get_month_total(year, month)
+
+    def total_revenues_until_month(self, year: int, month: int) -> int:
+        return self.storage.get_total_until_month(year, month)
+
+    def delete_revenues(self, revenue_ids: list[int]) -> None:
+        self.storage.delete_revenues(revenue_ids)
 
-    def update_revenue(self, index: int, date: str, category: str, description: str, amount: float) -> None:
+    def update_revenue(self, revenue_id: int, date: str, category: str, description: str, amount: int) -> None:
         revenue = Revenue(date=date, category=category, description=description, amount=amount)
-        self.storage.update_revenue(index, revenue)
\ No newline at end of file
+        self.storage.update_revenue(revenue_id, revenue)
@@ -1,6 +1,5 @@
 import os
 import sys
-from PyQt5.QtWidgets import QApplication
 
 # Permite executar diretamente app/main.py pelo botão "Run" sem usar -m
 if __package__ is None:
@@ -8,13 +7,20 @@ if __package__ is None:
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
 
+from app.utils.timing import startup
+from PyQt5.QtWidgets import QApplication
 from app.ui.main_window import MainWindow
 
 
 def main():
+    startup.mark("importações")
     app = QApplication(sys.argv)
+    startup.mark("QApplication")
     window = MainWindow()
+    startup.mark("janela construída")
+    # Dados carregam depois de exibir a janela (agendador + DataWorker)
     window.show()
+    startup.mark("janela exibida")
     sys.exit(app.exec_())
 
 
@@ -7,7 +7,7 @@ class Contribution:
     investment_id: int  # referência ao investimento
     date: str  # formato YYYY-MM-DD
     description: str
-    amount: float
+    amount: int  # em centavos
 
     def to_dict(self) -> Dict:
         return asdict(self)
\ No newline at end of file
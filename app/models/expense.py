@@ -7,7 +7,7 @@ class Expense:
     date: str  # formato YYYY-MM-DD
     category: str
     description: str
-    amount: float
+    amount: int  # em centavos
 
     def to_dict(self) -> Dict:
         return asdict(self)
\ No newline at end of file
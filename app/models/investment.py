@@ -8,7 +8,7 @@ class Investment:
     broker: str
     start_date: str  # formato YYYY-MM-DD
     description: str
-    initial_amount: float
+    initial_amount: int  # em centavos
 
     def to_dict(self) -> Dict:
         return asdict(self)
\ No newline at end of file
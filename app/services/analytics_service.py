@@ -0,0 +1,200 @@
+from dataclasses import dataclass
+from typing import Dict
+
+import numpy as np
+
+from app.config import DB_FILE
+from app.services.cache import VersionedCache
+from app.services.db import get_connection
+from app.services.migrations import ensure_schema
+
+DAYS_PER_YEAR = 365.0
+
+# Newton do XIRR: iterações máximas e tolerância sobre ln(1 + taxa)
+XIRR_MAX_ITER = 100
+XIRR_TOLERANCE = 1e-10
+# Faixa de ln(1 + taxa) durante as iterações (taxas de -99,995% a ~22.000x ao ano)
+_X_BOUND = 10.0
+
+# Tipos de linha em CashFlows.kind (ordem de desempate na mesma data)
+FLOW_INITIAL, FLOW_CONTRIBUTION, FLOW_VALUATION = 0, 1, 2
+
+# Dia (desde 1970-01-01) calculado no SQLite; data inválida vira NULL (NaN no array)
+_DAY_SQL = "CAST(julianday(substr({0}, 1, 10)) - 2440587.5 AS INTEGER)"
+
+# (tipo, consulta (investimento, dia, centavos)): uma leitura sequencial por tabela
+_FLOW_QUERIES = (
+    (FLOW_INITIAL, f"SELECT id, {_DAY_SQL.format('start_date')}, initial_amount FROM investments"),
+    (FLOW_CONTRIBUTION, f"SELECT investment_id, {_DAY_SQL.format('date')}, amount FROM contributions"),
+    (FLOW_VALUATION, f"SELECT investment_id, {_DAY_SQL.format('date')}, value FROM valuations"),
+)
+
+
+@dataclass
+class CashFlows:
+    """Fluxos da carteira em arrays paralelos, ordenados por (investimento, data, tipo)."""
+
+    ids: np.ndarray     # id de cada investimento (posição = índice nos resultados)
+    inv: np.ndarray     # índice em `ids` de cada linha
+    day: np.ndarray     # dias desde 1970-01-01
+    kind: np.ndarray    # FLOW_INITIAL / FLOW_CONTRIBUTION / FLOW_VALUATION
+    amount: np.ndarray  # centavos (float64)
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def last_valuation(self) -> np.ndarray:
+        """Índice da linha do último valor de mercado de cada investimento (-1 se não houver)."""
+        last = np.full(self.count, -1, dtype=np.int64)
+        rows = np.flatnonzero(self.kind == FLOW_VALUATION)
+        np.maximum.at(last, self.inv[rows], rows)
+        return last
+
+
+def load_cash_flows(conn) -> CashFlows:
+    """Fluxos de todos os investimentos: três consultas direto para arrays, ordenados no NumPy."""
+    parts, kinds = [], []
+    for kind, sql in _FLOW_QUERIES:
+        rows = np.array(conn.execute(sql).fetchall(), dtype=np.float64).reshape(-1, 3)
+        parts.append(rows)
+        kinds.append(np.full(len(rows), kind, dtype=np.int8))
+    data, kind = np.concatenate(parts), np.concatenate(kinds)
+    keep = ~np.isnan(data).any(axis=1)
+    data, kind = data[keep], kind[keep]
+    order = np.lexsort((kind, data[:, 1], data[:, 0]))
+    data, kind = data[order], kind[order]
+    ids, inv = np.unique(data[:, 0].astype(np.int64), return_inverse=True)
+    return CashFlows(
+        ids=ids,
+        inv=inv.astype(np.int64),
+        day=data[:, 1].astype(np.int64),
+        kind=kind,
+        amount=data[:, 2],
+    )
+
+
+def xirr_batch(flows: CashFlows) -> np.ndarray:
+    """Taxa interna de retorno anual de cada investimento (NaN se indefinida).
+
+    Saídas: valor inicial e aportes até a data do último valor de mercado;
+    entrada: esse valor. Resolve NPV = 0 em x = ln(1 + taxa) com Newton para
+    a carteira inteira de uma vez: cada iteração são duas somas por
+    investimento (np.bincount) sobre todos os fluxos. Multiplicado por
+    e^(x·T), o NPV é decrescente e côncavo em x, então as iterações convergem
+    para a raiz a partir do primeiro passo.
+    """
+    n = flows.count
+    last = flows.last_valuation()
+    has_value = last >= 0
+    safe_last = np.where(has_value, last, 0)
+    end_day = flows.day[safe_last]
+    value = np.where(has_value, flows.amount[safe_last], 0.0)
+
+    out = (flows.kind != FLOW_VALUATION) & has_value[flows.inv]
+    out &= flows.day <= end_day[flows.inv]
+    inv, amount = flows.inv[out], flows.amount[out]
+    dt = (end_day[inv] - flows.day[out]) / DAYS_PER_YEAR
+    # Indefinida sem valor positivo ou sem saída anterior à data do valor
+    valid = has_value & (value > 0) & (np.bincount(inv, amount * (dt > 0), minlength=n) > 0)
+
+    x = np.full(n, 0.1)
+    pending = valid.copy()
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(XIRR_MAX_ITER):
+            growth = amount * np.exp(x[inv] * dt)
+            npv = value - np.bincount(inv, growth, minlength=n)
+            slope = -np.bincount(inv, growth * dt, minlength=n)
+            step = np.where(pending, npv / slope, 0.0)
+            x = np.clip(x - step, -_X_BOUND, _X_BOUND)
+            pending &= np.isfinite(x) & (np.abs(step) >= XIRR_TOLERANCE)
+            if not pending.any():
+                break
+        return np.where(valid & ~pending & np.isfinite(x), np.expm1(x), np.nan)
+
+
+def twr_batch(flows: CashFlows) -> np.ndarray:
+    """Retorno ponderado no tempo (acumulado) de cada investimento (NaN sem valor de mercado).
+
+    Os subperíodos vão de um ponto de valor ao seguinte (o valor inicial na
+    data de início, depois cada valor de mercado). Em cada um, Modified Dietz:
+    R = (V1 - V0 - F) / (V0 + Σ wᵢ·Fᵢ), com wᵢ a fração do período em que o
+    aporte i ficou aplicado; os retornos são encadeados por investimento.
+    Aportes entram ao fim do dia: os do dia de um valor de mercado fazem
+    parte dele, e os da data de início contam desde o início.
+    """
+    n = flows.count
+    points = np.flatnonzero(flows.kind != FLOW_CONTRIBUTION)
+    start, end = points[:-1], points[1:]
+    same = flows.inv[start] == flows.inv[end]
+    start, end = start[same], end[same]
+    per_inv = flows.inv[end]
+    t0, t1 = flows.day[start], flows.day[end]
+    v0, v1 = flows.amount[start], flows.amount[end]
+    from_initial = flows.kind[start] == FLOW_INITIAL
+
+    # Período de cada aporte: o primeiro do investimento que termina no dia do aporte ou depois
+    contrib = np.flatnonzero(flows.kind == FLOW_CONTRIBUTION)
+    c_inv, c_day, c_amount = flows.inv[contrib], flows.day[contrib], flows.amount[contrib]
+    origin = flows.day.min() if len(flows.day) else 0
+    span = (flows.day.max() - origin + 1) if len(flows.day) else 1
+    period = np.searchsorted(per_inv * span + (t1 - origin), c_inv * span + (c_day - origin), side="left")
+    inside = period < len(per_inv)
+    period = np.where(inside, period, 0)
+    if len(per_inv):
+        inside &= per_inv[period] == c_inv
+        inside &= (t0[period] < c_day) | (from_initial[period] & (t0[period] == c_day))
+    period, c_day, c_amount = period[inside], c_day[inside], c_amount[inside]
+
+    length = (t1 - t0).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(length[period] > 0, (t1[period] - c_day) / length[period], 0.0)
+        flow = np.bincount(period, c_amount, minlength=len(per_inv))
+        weighted = np.bincount(period, c_amount * weight, minlength=len(per_inv))
+        capital = v0 + weighted
+        # Período sem capital aplicado não tem retorno definido: fica fora do encadeamento
+        ret = np.where(capital > 0, (v1 - v0 - flow) / capital, 0.0)
+        growth = np.bincount(per_inv, np.log1p(np.maximum(ret, -1.0)), minlength=n)
+        periods = np.bincount(per_inv, minlength=n)
+        return np.where(periods > 0, np.expm1(growth), np.nan)
+
+
+def _optional(value: float):
+    return None if np.isnan(value) else float(value)
+
+
+class AnalyticsService:
+    """Rentabilidade (XIRR e TWR) de todos os investimentos calculada em lote com NumPy."""
+
+    def __init__(self):
+        self.db_path = DB_FILE
+        self.cache = VersionedCache("investments", "contributions", "valuations")
+        ensure_schema(self.db_path)
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def investment_returns(self) -> Dict[int, Dict]:
+        """{id do investimento: {"value", "value_date", "xirr", "twr"}}.
+
+        "value" (centavos) e "value_date" são o último valor de mercado
+        informado; "xirr" é a taxa anual e "twr" o retorno acumulado, ambos
+        frações (0.12 = 12%) ou None quando indefinidos.
+        """
+        return self.cache.get("returns", self._compute_returns)
+
+    def _compute_returns(self) -> Dict[int, Dict]:
+        with self._connect() as conn:
+            flows = load_cash_flows(conn)
+        xirr, twr = xirr_batch(flows), twr_batch(flows)
+        last = flows.last_valuation()
+        result = {}
+        for i, inv_id in enumerate(flows.ids.tolist()):
+            row = int(last[i])
+            result[inv_id] = {
+                "value": int(flows.amount[row]) if row >= 0 else None,
+                "value_date": str(np.datetime64(int(flows.day[row]), "D")) if row >= 0 else None,
+                "xirr": _optional(xirr[i]),
+                "twr": _optional(twr[i]),
+            }
+        return result
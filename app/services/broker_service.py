@@ -1,46 +1,89 @@
-import os
 import sqlite3
-from typing import List
+from typing import Dict, List, Tuple
 
 from app.config import DB_FILE
+from app.services.cache import VersionedCache
+from app.services.capital_service import CapitalSeriesService
+from app.services.db import get_connection, bump_table_version
+from app.services.migrations import ensure_schema
+
+
+def broker_id_for(conn, name: str, create: bool = True) -> Tuple[int | None, bool]:
+    """(id, criada) da corretora `name`; cria-a se `create` (nome vazio -> None).
+
+    Com `criada`, o chamador chama bump_table_version("brokers") depois do commit.
+    """
+    name = (name or "").strip()
+    if not name:
+        return None, False
+    row = conn.execute("SELECT id FROM brokers WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row[0], False
+    if not create:
+        return None, False
+    broker_id = conn.execute("INSERT INTO brokers (name) VALUES (?)", (name,)).lastrowid
+    return broker_id, True
 
 
 class BrokerService:
     def __init__(self):
         self.db_path = DB_FILE
+        self.names_cache = VersionedCache("brokers")
+        self.usage_cache = VersionedCache("brokers", "investments", "contributions")
         self._ensure_db()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection(self.db_path)
 
     def _ensure_db(self) -> None:
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS brokers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL UNIQUE
-                )
-                """
-            )
-            # Seed defaults if empty
-            cur = conn.execute("SELECT COUNT(*) FROM brokers")
-            if (cur.fetchone()[0] or 0) == 0:
-                defaults = ["Nubank", "XP", "Clear", "BTG", "Inter"]
-                conn.executemany(
-                    "INSERT OR IGNORE INTO brokers (name) VALUES (?)",
-                    [(n,) for n in defaults],
-                )
-                conn.commit()
+        ensure_schema(self.db_path)
 
     def list_all(self) -> List[str]:
+        return list(self.names_cache.get("all", self._query_names))
+
+    def _query_names(self) -> List[str]:
         with self._connect() as conn:
             cur = conn.execute(
                 "SELECT name FROM brokers ORDER BY name COLLATE NOCASE ASC"
             )
             return [r[0] for r in cur.fetchall()]
 
+    def usage(self) -> List[Dict]:
+        """Corretoras com o uso de cada uma, em ordem alfabética.
+
+        Cada item traz "name", "count" (investimentos), "total" (valor inicial +
+        aportes, em centavos) e "last_date" (início ou aporte mais recente; None
+        se sem investimentos). Em cache até a próxima escrita em corretoras,
+        investimentos ou aportes.
+        """
+        return self.usage_cache.get("all", self._query_usage)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {"names": self.names_cache.stats(), "usage": self.usage_cache.stats()}
+
+    def _query_usage(self) -> List[Dict]:
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                SELECT b.name, COUNT(i.id),
+                       COALESCE(SUM(i.initial_amount + COALESCE(c.total, 0)), 0),
+                       MAX(MAX(i.start_date, COALESCE(c.last_date, '')))
+                FROM brokers b
+                LEFT JOIN investments i ON i.broker_id = b.id
+                LEFT JOIN (
+                    SELECT investment_id, SUM(amount) AS total, MAX(date) AS last_date
+                    FROM contributions
+                    GROUP BY investment_id
+                ) c ON c.investment_id = i.id
+                GROUP BY b.id
+                ORDER BY b.name COLLATE NOCASE ASC
+                """
+            )
+            return [
+                {"name": r[0], "count": int(r[1]), "total": int(r[2]), "last_date": r[3]}
+                for r in cur.fetchall()
+            ]
+
     def add_broker(self, name: str) -> bool:
         name = (name or "").strip()
         if not name:
@@ -52,6 +95,7 @@ class BrokerService:
                     (name,),
                 )
                 conn.commit()
+                bump_table_version("brokers")
                 return True
             except sqlite3.IntegrityError:
                 return False
@@ -62,16 +106,20 @@ class BrokerService:
         if not old_name or not new_name or old_name == new_name:
             return False
         with self._connect() as conn:
-            # Atualiza investimentos vinculados
-            conn.execute("UPDATE investments SET broker = ? WHERE broker = ?", (new_name, old_name))
-            # Se já existir o novo, remover o antigo, senão atualizar o nome
-            cur = conn.execute("SELECT COUNT(*) FROM brokers WHERE name = ?", (new_name,))
-            exists_new = (cur.fetchone()[0] or 0) > 0
-            if exists_new:
-                conn.execute("DELETE FROM brokers WHERE name = ?", (old_name,))
+            old_id, _ = broker_id_for(conn, old_name, create=False)
+            if old_id is None:
+                return False
+            new_id, _ = broker_id_for(conn, new_name, create=False)
+            if new_id is None:
+                # Investimentos referenciam o id: renomear altera uma única linha
+                conn.execute("UPDATE brokers SET name = ? WHERE id = ?", (new_name, old_id))
             else:
-                conn.execute("UPDATE brokers SET name = ? WHERE name = ?", (new_name, old_name))
+                # Se já existir o novo, mover os investimentos e remover o antigo
+                conn.execute("UPDATE investments SET broker_id = ? WHERE broker_id = ?", (new_id, old_id))
+                CapitalSeriesService.merge_brokers(conn, old_id, new_id)
+                conn.execute("DELETE FROM brokers WHERE id = ?", (old_id,))
             conn.commit()
+            bump_table_version("brokers", "investments", "capital_series")
             return True
 
     def delete_broker(self, name: str, reassign_to: str | None = None) -> bool:
@@ -79,21 +127,28 @@ class BrokerService:
         if not name:
             return False
         with self._connect() as conn:
+            broker_id, _ = broker_id_for(conn, name, create=False)
+            if broker_id is None:
+                return False
             if reassign_to:
                 reassign_to = reassign_to.strip()
-                if not reassign_to:
+                if not reassign_to or reassign_to == name:
                     return False
-                conn.execute("INSERT OR IGNORE INTO brokers (name) VALUES (?)", (reassign_to,))
-                conn.execute("UPDATE investments SET broker = ? WHERE broker = ?", (reassign_to, name))
-                conn.execute("DELETE FROM brokers WHERE name = ?", (name,))
+                target_id, _ = broker_id_for(conn, reassign_to)
+                conn.execute("UPDATE investments SET broker_id = ? WHERE broker_id = ?", (target_id, broker_id))
+                CapitalSeriesService.merge_brokers(conn, broker_id, target_id)
+                conn.execute("DELETE FROM brokers WHERE id = ?", (broker_id,))
                 conn.commit()
+                bump_table_version("brokers", "investments", "capital_series")
                 return True
 
             # Bloquear se houver investimentos ainda vinculados
-            cur = conn.execute("SELECT COUNT(*) FROM investments WHERE broker = ?", (name,))
-            used_count = cur.fetchone()[0] or 0
-            if used_count > 0:
+            used = conn.execute(
+                "SELECT EXISTS(SELECT 1 FROM investments WHERE broker_id = ?)", (broker_id,)
+            ).fetchone()[0]
+            if used:
                 return False
-            conn.execute("DELETE FROM brokers WHERE name = ?", (name,))
+            conn.execute("DELETE FROM brokers WHERE id = ?", (broker_id,))
             conn.commit()
-            return True
\ No newline at end of file
+            bump_table_version("brokers", "investments")
+            return True
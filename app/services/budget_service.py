@@ -0,0 +1,77 @@
+from typing import Dict, List
+
+from app.config import DB_FILE
+from app.services.db import get_connection, bump_table_version
+from app.services.category_service import category_id_for
+from app.services.migrations import ensure_schema
+
+
+class BudgetService:
+    """Orçamento mensal por categoria de despesa comparado ao realizado.
+
+    O limite registrado para um mês vale também para os seguintes, até outro
+    ser registrado (0 encerra o orçamento). O realizado vem de
+    `category_totals`, mantido a cada escrita pelo LedgerService: a
+    comparação é uma busca por chave, sem somar os lançamentos.
+    """
+
+    def __init__(self):
+        self.db_path = DB_FILE
+        self._ensure_db()
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def _ensure_db(self) -> None:
+        ensure_schema(self.db_path)
+
+    def set_budget(self, category: str, year: int, month: int, amount: int) -> bool:
+        """Define o limite (centavos) de `category` a partir de `year`/`month`."""
+        if amount < 0:
+            return False
+        with self._connect() as conn:
+            category_id, _ = category_id_for(conn, category, 'expense', create=False)
+            if category_id is None:
+                return False
+            conn.execute(
+                "INSERT INTO budgets (category_id, month, amount) VALUES (?, ?, ?) "
+                "ON CONFLICT(category_id, month) DO UPDATE SET amount = excluded.amount",
+                (category_id, f"{year:04d}-{month:02d}", int(amount)),
+            )
+            conn.commit()
+            bump_table_version("budgets")
+            return True
+
+    def budget_vs_actual(self, year: int, month: int) -> List[Dict]:
+        """Categorias com orçamento no mês: "category", "budget", "spent", "remaining" e "percent" (do limite usado)."""
+        key = f"{year:04d}-{month:02d}"
+        with self._connect() as conn:
+            # Limite vigente: último registrado até o mês (busca no fim da chave primária)
+            cur = conn.execute(
+                """
+                SELECT c.name, b.amount, COALESCE(t.total, 0)
+                FROM (
+                    SELECT category_id, (
+                        SELECT amount FROM budgets b2
+                        WHERE b2.category_id = b1.category_id AND b2.month <= ?
+                        ORDER BY b2.month DESC LIMIT 1
+                    ) AS amount
+                    FROM (SELECT DISTINCT category_id FROM budgets) b1
+                ) b
+                JOIN categories c ON c.id = b.category_id
+                LEFT JOIN category_totals t ON t.category_id = b.category_id AND t.month = ?
+                WHERE b.amount > 0
+                ORDER BY c.name COLLATE NOCASE ASC
+                """,
+                (key, key),
+            )
+            return [
+                {
+                    "category": name,
+                    "budget": int(budget),
+                    "spent": int(spent),
+                    "remaining": int(budget) - int(spent),
+                    "percent": int(spent) / int(budget) * 100.0,
+                }
+                for name, budget, spent in cur.fetchall()
+            ]
@@ -0,0 +1,47 @@
+import threading
+from typing import Callable, Dict, Hashable, TypeVar
+
+from app.services.db import table_version
+
+T = TypeVar("T")
+
+
+class VersionedCache:
+    """Cache em memória validado pela versão das tabelas de origem.
+
+    Cada entrada guarda `table_version(*tables)` do momento em que foi
+    calculada. Enquanto nenhuma dessas tabelas for gravada (os serviços chamam
+    `bump_table_version` nas escritas), `get` devolve o valor sem SQL algum.
+    Pode ser usado pela thread da UI e pelo DataWorker ao mesmo tempo.
+    """
+
+    def __init__(self, *tables: str):
+        self.tables = tables
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, load: Callable[[], T]) -> T:
+        """Valor de `key`, recalculado por `load()` se alguma tabela mudou desde o último cálculo."""
+        version = table_version(*self.tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # A carga roda fora do lock; a versão lida antes dela garante que uma
+        # escrita concorrente invalide o valor na próxima chamada
+        value = load()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
@@ -0,0 +1,136 @@
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from app.config import DB_FILE
+from app.services.db import get_connection, chunked
+from app.services.migrations import ensure_schema
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# (investimento, data, centavos): valor inicial ou aporte, negativo para estornar
+Flow = Tuple[int, str, int]
+
+
+def _apply_deltas(conn, table: str, key_col: str, deltas: Dict[int, Dict[str, int]]) -> None:
+    """Soma os valores por data nas séries e recalcula o acumulado a partir da primeira data alterada.
+
+    Só os pontos dessa data em diante são reescritos: um aporte novo no fim da
+    série (o caso comum) custa uma busca e um INSERT.
+    """
+    for key, by_date in deltas.items():
+        by_date = {d: a for d, a in by_date.items() if a}
+        if not by_date:
+            continue
+        first = min(by_date)
+        row = conn.execute(
+            f"SELECT cumulative FROM {table} WHERE {key_col} = ? AND date < ? ORDER BY date DESC LIMIT 1",
+            (key, first),
+        ).fetchone()
+        total = row[0] if row else 0
+        merged = dict(conn.execute(f"SELECT date, amount FROM {table} WHERE {key_col} = ? AND date >= ?", (key, first)))
+        for d, amount in by_date.items():
+            merged[d] = merged.get(d, 0) + amount
+        rows = []
+        for d in sorted(merged):
+            if merged[d]:
+                total += merged[d]
+                rows.append((key, d, merged[d], total))
+        conn.execute(f"DELETE FROM {table} WHERE {key_col} = ? AND date >= ?", (key, first))
+        conn.executemany(f"INSERT INTO {table} ({key_col}, date, amount, cumulative) VALUES (?, ?, ?, ?)", rows)
+
+
+class CapitalSeriesService:
+    """Capital investido acumulado por investimento e por corretora, mantido a cada escrita.
+
+    As séries guardam um ponto por dia com movimento (valor do dia e
+    acumulado); as consultas devolvem arrays diários para gráficos sem
+    reprocessar os aportes. Os métodos estáticos recebem a conexão da
+    transação em andamento, como o LedgerService.
+    """
+
+    def __init__(self):
+        self.db_path = DB_FILE
+        ensure_schema(self.db_path)
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    @staticmethod
+    def apply(conn, flows: Iterable[Flow]) -> None:
+        """Aplica valores iniciais/aportes (negativos estornam) às séries do investimento e da sua corretora."""
+        by_investment: Dict[int, Dict[str, int]] = {}
+        for investment_id, date, amount in flows:
+            if amount and _DATE_RE.match(date or ""):
+                series = by_investment.setdefault(investment_id, {})
+                series[date] = series.get(date, 0) + int(amount)
+        if not by_investment:
+            return
+        brokers = {}
+        for chunk in chunked(by_investment):
+            brokers.update(conn.execute(
+                f"SELECT id, broker_id FROM investments WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        by_broker: Dict[int, Dict[str, int]] = {}
+        for investment_id, series in by_investment.items():
+            broker_id = brokers.get(investment_id)
+            if broker_id is None:
+                continue
+            target = by_broker.setdefault(broker_id, {})
+            for date, amount in series.items():
+                target[date] = target.get(date, 0) + amount
+        _apply_deltas(conn, "capital_series", "investment_id", by_investment)
+        _apply_deltas(conn, "broker_capital_series", "broker_id", by_broker)
+
+    @staticmethod
+    def move_investment(conn, investment_id: int, old_broker_id: Optional[int], new_broker_id: Optional[int]) -> None:
+        """Transfere a série do investimento entre corretoras (None = só retira ou só acrescenta)."""
+        if old_broker_id == new_broker_id:
+            return
+        points = conn.execute(
+            "SELECT date, amount FROM capital_series WHERE investment_id = ?", (investment_id,)
+        ).fetchall()
+        deltas: Dict[int, Dict[str, int]] = {}
+        if old_broker_id is not None:
+            deltas[old_broker_id] = {d: -a for d, a in points}
+        if new_broker_id is not None:
+            deltas[new_broker_id] = dict(points)
+        _apply_deltas(conn, "broker_capital_series", "broker_id", deltas)
+
+    @staticmethod
+    def merge_brokers(conn, old_broker_id: int, new_broker_id: int) -> None:
+        """Soma a série de `old_broker_id` à de `new_broker_id` (fusão/reatribuição de corretora)."""
+        points = conn.execute(
+            "SELECT date, amount FROM broker_capital_series WHERE broker_id = ?", (old_broker_id,)
+        ).fetchall()
+        _apply_deltas(conn, "broker_capital_series", "broker_id", {new_broker_id: dict(points)})
+        conn.execute("DELETE FROM broker_capital_series WHERE broker_id = ?", (old_broker_id,))
+
+    def investment_series(self, investment_id: int, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Capital acumulado do investimento em cada dia de [start, end]: (datas datetime64[D], centavos int64)."""
+        return self._daily("capital_series", "investment_id", investment_id, start, end)
+
+    def broker_series(self, broker: str, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Capital acumulado dos investimentos da corretora em cada dia de [start, end]."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM brokers WHERE name = ?", ((broker or "").strip(),)).fetchone()
+        broker_id = row[0] if row else None
+        return self._daily("broker_capital_series", "broker_id", broker_id, start, end)
+
+    def _daily(self, table: str, key_col: str, key, start: str, end: str) -> Tuple[np.ndarray, np.ndarray]:
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+        with self._connect() as conn:
+            # Acumulado na véspera do intervalo: um ponto pela chave primária
+            row = conn.execute(
+                f"SELECT cumulative FROM {table} WHERE {key_col} = ? AND date < ? ORDER BY date DESC LIMIT 1",
+                (key, start),
+            ).fetchone()
+            points = conn.execute(
+                f"SELECT date, cumulative FROM {table} WHERE {key_col} = ? AND date >= ? AND date <= ? ORDER BY date",
+                (key, start, end),
+            ).fetchall()
+        values = np.array([row[0] if row else 0] + [c for _d, c in points], dtype=np.int64)
+        point_days = np.array([d for d, _c in points], dtype="datetime64[D]")
+        # Para cada dia, o último ponto até ele (0 = acumulado anterior ao intervalo)
+        return days, values[np.searchsorted(point_days, days, side="right")]
@@ -1,70 +1,58 @@
-import os
 import sqlite3
-from typing import List
+from typing import Dict, List, Tuple
 
 from app.config import DB_FILE
+from app.services.cache import VersionedCache
+from app.services.db import get_connection, bump_table_version
+from app.services.ledger_service import LedgerService
+from app.services.migrations import ensure_schema
+
+CATEGORY_TABLES = {"expense": "expenses", "revenue": "revenues"}
+
+
+def category_id_for(conn, name: str, cat_type: str, create: bool = True) -> Tuple[int | None, bool]:
+    """(id, criada) da categoria `name` do tipo `cat_type`; cria-a se `create` (nome vazio -> None).
+
+    A versão de "categories" não muda aqui: com `criada`, o chamador chama
+    bump_table_version("categories") depois do commit, junto com as suas tabelas.
+    """
+    name = (name or "").strip()
+    if not name:
+        return None, False
+    row = conn.execute(
+        "SELECT id FROM categories WHERE name = ? AND type = ?", (name, cat_type)
+    ).fetchone()
+    if row:
+        return row[0], False
+    if not create:
+        return None, False
+    cat_id = conn.execute(
+        "INSERT INTO categories (name, type) VALUES (?, ?)", (name, cat_type)
+    ).lastrowid
+    return cat_id, True
 
 
 class CategoryService:
     def __init__(self):
         self.db_path = DB_FILE
+        # Listas por tipo: combos são repovoados a cada inclusão/edição sem SQL
+        # enquanto nenhuma categoria mudar
+        self.names_cache = VersionedCache("categories")
+        self.usage_caches = {t: VersionedCache("categories", table) for t, table in CATEGORY_TABLES.items()}
         self._ensure_db()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection(self.db_path)
 
     def _ensure_db(self) -> None:
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS categories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    type TEXT NOT NULL CHECK (type IN ('expense','revenue')),
-                    UNIQUE(name, type)
-                )
-                """
-            )
-            # Seed defaults if empty
-            cur = conn.execute("SELECT COUNT(*) FROM categories")
-            if (cur.fetchone()[0] or 0) == 0:
-                defaults_expense = ["Alimentação", "Transporte", "Moradia", "Lazer", "Saúde", "Outros"]
-                defaults_revenue = ["Salário", "Freelance", "Vendas", "Investimentos", "Outros"]
-                conn.executemany(
-                    "INSERT OR IGNORE INTO categories (name, type) VALUES (?, 'expense')",
-                    [(n,) for n in defaults_expense],
-                )
-                conn.executemany(
-                    "INSERT OR IGNORE INTO categories (name, type) VALUES (?, 'revenue')",
-                    [(n,) for n in defaults_revenue],
-                )
-                conn.commit()
-
-            # Sync from existing data (ensures legacy categories are present)
-            try:
-                # Expenses
-                cur = conn.execute("SELECT DISTINCT category FROM expenses")
-                for (name,) in cur.fetchall():
-                    if name:
-                        conn.execute(
-                            "INSERT OR IGNORE INTO categories (name, type) VALUES (?, 'expense')",
-                            (name,),
-                        )
-                # Revenues
-                cur = conn.execute("SELECT DISTINCT category FROM revenues")
-                for (name,) in cur.fetchall():
-                    if name:
-                        conn.execute(
-                            "INSERT OR IGNORE INTO categories (name, type) VALUES (?, 'revenue')",
-                            (name,),
-                        )
-                conn.commit()
-            except Exception:
-                pass
+        # Tabela, categorias padrão e sincronização das categorias legadas ficam no schema
+        ensure_schema(self.db_path)
 
     def list_by_type(self, cat_type: str) -> List[str]:
         assert cat_type in ("expense", "revenue")
+        return list(self.names_cache.get(cat_type, lambda: self._query_names(cat_type)))
+
+    def _query_names(self, cat_type: str) -> List[str]:
         with self._connect() as conn:
             cur = conn.execute(
                 "SELECT name FROM categories WHERE type = ? ORDER BY name COLLATE NOCASE ASC",
@@ -72,6 +60,45 @@ class CategoryService:
             )
             return [r[0] for r in cur.fetchall()]
 
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        stats = {"names": self.names_cache.stats()}
+        for cat_type, cache in self.usage_caches.items():
+            stats[f"usage_{cat_type}"] = cache.stats()
+        return stats
+
+    def usage_by_type(self, cat_type: str) -> List[Dict]:
+        """Categorias do tipo com o uso de cada uma, em ordem alfabética.
+
+        Cada item traz "name", "count", "total" (centavos) e "last_date" (None se
+        nunca usada). Uma consulta agrupada sobre o índice de cobertura; o
+        resultado fica em cache até a próxima escrita nas categorias ou nos
+        lançamentos do tipo.
+        """
+        assert cat_type in ("expense", "revenue")
+        return self.usage_caches[cat_type].get(cat_type, lambda: self._query_usage(cat_type))
+
+    def _query_usage(self, cat_type: str) -> List[Dict]:
+        table = CATEGORY_TABLES[cat_type]
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"""
+                SELECT c.name, COALESCE(u.n, 0), COALESCE(u.total, 0), u.last_date
+                FROM categories c
+                LEFT JOIN (
+                    SELECT category_id, COUNT(*) AS n, SUM(amount) AS total, MAX(date) AS last_date
+                    FROM {table}
+                    GROUP BY category_id
+                ) u ON u.category_id = c.id
+                WHERE c.type = ?
+                ORDER BY c.name COLLATE NOCASE ASC
+                """,
+                (cat_type,),
+            )
+            return [
+                {"name": r[0], "count": int(r[1]), "total": int(r[2]), "last_date": r[3]}
+                for r in cur.fetchall()
+            ]
+
     def add_category(self, name: str, cat_type: str) -> bool:
         assert cat_type in ("expense", "revenue")
         name = (name or "").strip()
@@ -84,6 +111,7 @@ class CategoryService:
                     (name, cat_type),
                 )
                 conn.commit()
+                bump_table_version("categories")
                 return True
             except sqlite3.IntegrityError:
                 # Duplicate
@@ -96,28 +124,26 @@ class CategoryService:
         if not old_name or not new_name or old_name == new_name:
             return False
         with self._connect() as conn:
-            # Se já existe a nova, vamos apenas migrar os lançamentos e remover a antiga
-            cur = conn.execute(
-                "SELECT COUNT(*) FROM categories WHERE name = ? AND type = ?",
-                (new_name, cat_type),
-            )
-            exists_new = (cur.fetchone()[0] or 0) > 0
-
-            if cat_type == 'expense':
-                conn.execute("UPDATE expenses SET category = ? WHERE category = ?", (new_name, old_name))
-            else:
-                conn.execute("UPDATE revenues SET category = ? WHERE category = ?", (new_name, old_name))
-
-            if exists_new:
-                # Remover antiga se existir
-                conn.execute("DELETE FROM categories WHERE name = ? AND type = ?", (old_name, cat_type))
+            old_id, _ = category_id_for(conn, old_name, cat_type, create=False)
+            if old_id is None:
+                return False
+            new_id, _ = category_id_for(conn, new_name, cat_type, create=False)
+            if new_id is None:
+                # Lançamentos referenciam o id: renomear altera uma única linha
+                conn.execute("UPDATE categories SET name = ? WHERE id = ?", (new_name, old_id))
             else:
-                # Atualizar nome na tabela de categorias
+                # Se já existe a nova, vamos apenas migrar os lançamentos e remover a antiga
                 conn.execute(
-                    "UPDATE categories SET name = ? WHERE name = ? AND type = ?",
-                    (new_name, old_name, cat_type),
+                    f"UPDATE {CATEGORY_TABLES[cat_type]} SET category_id = ? WHERE category_id = ?",
+                    (new_id, old_id),
                 )
+                conn.execute("UPDATE recurrences SET category_id = ? WHERE category_id = ?", (new_id, old_id))
+                LedgerService.move_category(conn, old_id, new_id)
+                # Orçamentos da antiga valem para a nova nos meses em que ela não tem limite próprio
+                conn.execute("UPDATE OR IGNORE budgets SET category_id = ? WHERE category_id = ?", (new_id, old_id))
+                conn.execute("DELETE FROM categories WHERE id = ?", (old_id,))
             conn.commit()
+            bump_table_version("categories", CATEGORY_TABLES[cat_type])
             return True
 
     def delete_category(self, name: str, cat_type: str, reassign_to: str | None = None) -> bool:
@@ -125,32 +151,35 @@ class CategoryService:
         name = (name or "").strip()
         if not name:
             return False
+        table = CATEGORY_TABLES[cat_type]
         with self._connect() as conn:
+            cat_id, _ = category_id_for(conn, name, cat_type, create=False)
+            if cat_id is None:
+                return False
             # Se há reatribuição, garantir que a categoria alvo exista
             if reassign_to:
                 reassign_to = reassign_to.strip()
-                if not reassign_to:
+                if not reassign_to or reassign_to == name:
                     return False
-                conn.execute(
-                    "INSERT OR IGNORE INTO categories (name, type) VALUES (?, ?)",
-                    (reassign_to, cat_type),
-                )
-                if cat_type == 'expense':
-                    conn.execute("UPDATE expenses SET category = ? WHERE category = ?", (reassign_to, name))
-                else:
-                    conn.execute("UPDATE revenues SET category = ? WHERE category = ?", (reassign_to, name))
-                conn.execute("DELETE FROM categories WHERE name = ? AND type = ?", (name, cat_type))
+                target_id, _ = category_id_for(conn, reassign_to, cat_type)
+                conn.execute(f"UPDATE {table} SET category_id = ? WHERE category_id = ?", (target_id, cat_id))
+                conn.execute("UPDATE recurrences SET category_id = ? WHERE category_id = ?", (target_id, cat_id))
+                LedgerService.move_category(conn, cat_id, target_id)
+                conn.execute("UPDATE OR IGNORE budgets SET category_id = ? WHERE category_id = ?", (target_id, cat_id))
+                conn.execute("DELETE FROM categories WHERE id = ?", (cat_id,))
                 conn.commit()
+                bump_table_version("categories", CATEGORY_TABLES[cat_type])
                 return True
 
-            # Sem reatribuição: bloquear se houver lançamentos
-            if cat_type == 'expense':
-                cur = conn.execute("SELECT COUNT(*) FROM expenses WHERE category = ?", (name,))
-            else:
-                cur = conn.execute("SELECT COUNT(*) FROM revenues WHERE category = ?", (name,))
-            used_count = cur.fetchone()[0] or 0
-            if used_count > 0:
+            # Sem reatribuição: bloquear se houver lançamentos ou recorrências
+            used = conn.execute(
+                f"SELECT EXISTS(SELECT 1 FROM {table} WHERE category_id = ?) "
+                "OR EXISTS(SELECT 1 FROM recurrences WHERE category_id = ?)",
+                (cat_id, cat_id),
+            ).fetchone()[0]
+            if used:
                 return False
-            conn.execute("DELETE FROM categories WHERE name = ? AND type = ?", (name, cat_type))
+            conn.execute("DELETE FROM categories WHERE id = ?", (cat_id,))
             conn.commit()
-            return True
\ No newline at end of file
+            bump_table_version("categories", CATEGORY_TABLES[cat_type])
+            return True
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+
+from app.config import DB_FILE
+
+# Conexões reaproveitadas por thread (sqlite3 não permite compartilhar entre threads)
+_local = threading.local()
+
+# Número de statements preparados mantidos em cache por conexão
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-65536",  # 64 MiB (valor negativo = KiB)
+    "PRAGMA busy_timeout=5000",
+    # Integridade referencial (ex.: aportes removidos junto com o investimento)
+    "PRAGMA foreign_keys=ON",
+)
+
+
+def _open(db_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def open_connection(db_path: str = DB_FILE) -> sqlite3.Connection:
+    """Abre uma conexão exclusiva (fora das compartilhadas por thread); feche-a ao terminar."""
+    return _open(db_path)
+
+
+def get_connection(db_path: str = DB_FILE) -> sqlite3.Connection:
+    """Retorna a conexão da thread atual para o banco, abrindo-a na primeira chamada.
+
+    A conexão é compartilhada por todos os serviços; use-a como context manager
+    (`with get_connection() as conn:`) para obter commit/rollback automáticos.
+    """
+    conns = getattr(_local, "connections", None)
+    if conns is None:
+        conns = _local.connections = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = _open(db_path)
+        conns[db_path] = conn
+    return conn
+
+
+def close_connections() -> None:
+    """Fecha as conexões abertas pela thread atual."""
+    conns = getattr(_local, "connections", None) or {}
+    for conn in conns.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    conns.clear()
+
+
+# Versão de cada tabela: incrementada pelos serviços a cada escrita, permite
+# validar caches em memória sem consultar o banco
+_table_versions = {}
+_versions_lock = threading.Lock()
+
+
+def bump_table_version(*tables: str) -> None:
+    """Marca `tables` como alteradas (chame após cada escrita nelas)."""
+    with _versions_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def table_version(*tables: str) -> tuple:
+    """Versão conjunta de `tables`; muda sempre que alguma delas é gravada neste processo."""
+    return tuple(_table_versions.get(table, 0) for table in tables)
+
+
+# Limite conservador de parâmetros por statement (SQLITE_MAX_VARIABLE_NUMBER antigo = 999)
+MAX_SQL_PARAMS = 900
+
+
+def chunked(values, size: int = MAX_SQL_PARAMS):
+    """Divide `values` em listas de até `size` itens (para cláusulas IN (...))."""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def insert_many(conn: sqlite3.Connection, table: str, columns, rows) -> None:
+    """INSERT em lote passando por uma tabela temporária e um único INSERT ... SELECT.
+
+    Os triggers da busca (FTS5) descarregam o índice a cada statement: com
+    executemany direto na tabela seria um segmento do índice por linha.
+    """
+    cols = ", ".join(columns)
+    staging = f"staging_{table}_{'_'.join(columns)}"
+    # Mesmos tipos declarados da tabela de destino
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} AS SELECT {cols} FROM main.{table} WHERE 0")
+    conn.executemany(f"INSERT INTO temp.{staging} VALUES ({', '.join('?' * len(columns))})", rows)
+    conn.execute(f"INSERT INTO main.{table} ({cols}) SELECT {cols} FROM temp.{staging} ORDER BY rowid")
+    conn.execute(f"DELETE FROM temp.{staging}")
+
+
+def migrate_money_to_cents(conn: sqlite3.Connection, table: str, schema: str, money_columns) -> bool:
+    """Converte colunas monetárias REAL (reais) para INTEGER (centavos), uma única vez.
+
+    `schema` é o CREATE TABLE com `{name}` no lugar do nome da tabela. A tabela
+    é recriada por `rebuild_table` (mantendo o contador do AUTOINCREMENT) e os
+    dados copiados com ROUND(valor * 100). Retorna True se migrou.
+    """
+    info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    if not info:
+        return False
+    types = {r[1]: (r[2] or "").upper() for r in info}
+    if all(types.get(c) == "INTEGER" for c in money_columns):
+        return False
+    columns = [r[1] for r in info]
+    select = ", ".join(
+        f"CAST(ROUND(COALESCE({c}, 0) * 100) AS INTEGER)" if c in money_columns else c
+        for c in columns
+    )
+    rebuild_table(conn, table, schema, ", ".join(columns), f"SELECT {select} FROM {table}")
+    return True
+
+
+def rebuild_table(conn: sqlite3.Connection, table: str, schema: str, columns: str, select_sql: str) -> None:
+    """Recria `table` com o novo `schema` (com `{name}`), copiando os dados por `select_sql`.
+
+    `columns` lista as colunas do novo schema preenchidas pelo SELECT. O
+    contador do AUTOINCREMENT é preservado, para que ids excluídos não voltem.
+    Índices da tabela antiga são descartados; recrie-os em seguida.
+    """
+    seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    tmp = f"{table}_new"
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    conn.execute(f"DROP TABLE IF EXISTS {tmp}")
+    conn.execute(schema.format(name=tmp))
+    conn.execute(f"INSERT INTO {tmp} ({columns}) {select_sql}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {tmp} RENAME TO {table}")
+    if seq:
+        cur = conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+        if cur.rowcount == 0:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, seq[0]))
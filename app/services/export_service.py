@@ -0,0 +1,230 @@
+import csv
+import json
+import struct
+import sys
+import zlib
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import DB_FILE
+from app.services.db import get_connection
+from app.services.migrations import ensure_schema
+
+# Linhas lidas do cursor por vez (e linhas por grupo no formato colunar)
+ROW_GROUP_SIZE = 65536
+
+# Formato colunar próprio (.mmcol):
+#   MAGIC | u32 tamanho + JSON {"kind", "columns": [{"name", "type"}]}
+#   grupos: u32 nº de linhas (0 encerra) + por coluna: u32 tamanho + bloco zlib
+#   int64/money (centavos): valores little-endian; text: offsets u32 (n+1) seguidos do UTF-8
+COLUMNAR_MAGIC = b"MMCOL\x00\x01\x00"
+_U32 = struct.Struct("<I")
+_INTEGER_TYPES = ("int64", "money")
+
+
+# kind -> (colunas (nome, tipo, expressão SQL), FROM ..., coluna de data, coluna de categoria, ORDER BY)
+EXPORT_QUERIES: Dict[str, Tuple[Tuple[Tuple[str, str, str], ...], str, str, str, str]] = {
+    "expense": (
+        (("id", "int64", "t.id"), ("date", "text", "t.date"), ("category", "text", "COALESCE(k.name, '')"),
+         ("description", "text", "COALESCE(t.description, '')"), ("amount", "money", "t.amount")),
+        "expenses t LEFT JOIN categories k ON k.id = t.category_id", "t.date", "k.name", "t.date, t.id",
+    ),
+    "revenue": (
+        (("id", "int64", "t.id"), ("date", "text", "t.date"), ("category", "text", "COALESCE(k.name, '')"),
+         ("description", "text", "COALESCE(t.description, '')"), ("amount", "money", "t.amount")),
+        "revenues t LEFT JOIN categories k ON k.id = t.category_id", "t.date", "k.name", "t.date, t.id",
+    ),
+    "investment": (
+        (("id", "int64", "i.id"), ("name", "text", "i.name"), ("broker", "text", "COALESCE(b.name, '')"),
+         ("start_date", "text", "i.start_date"), ("description", "text", "COALESCE(i.description, '')"),
+         ("initial_amount", "money", "i.initial_amount"),
+         ("contributions_sum", "money",
+          "COALESCE((SELECT SUM(c.amount) FROM contributions c WHERE c.investment_id = i.id), 0)")),
+        "investments i LEFT JOIN brokers b ON b.id = i.broker_id", "i.start_date", "b.name", "i.id",
+    ),
+    "contribution": (
+        (("id", "int64", "c.id"), ("investment_id", "int64", "c.investment_id"), ("investment", "text", "i.name"),
+         ("broker", "text", "COALESCE(b.name, '')"), ("date", "text", "c.date"),
+         ("description", "text", "COALESCE(c.description, '')"), ("amount", "money", "c.amount")),
+        "contributions c JOIN investments i ON i.id = c.investment_id LEFT JOIN brokers b ON b.id = i.broker_id",
+        "c.date", "b.name", "c.date, c.id",
+    ),
+}
+
+EXPORT_FORMATS = ("csv", "columnar")
+
+
+def _money_as_text_sql(expr: str) -> str:
+    """Centavos -> '1234.56' calculado no SQLite (evita formatar milhões de valores em Python)."""
+    return (
+        f"printf('%s%d.%02d', CASE WHEN ({expr}) < 0 THEN '-' ELSE '' END, "
+        f"abs({expr}) / 100, abs({expr}) % 100)"
+    )
+
+
+def _encode_column(values: Sequence, col_type: str) -> bytes:
+    if col_type in _INTEGER_TYPES:
+        data = array("q", (int(v or 0) for v in values))
+        if sys.byteorder != "little":
+            data.byteswap()
+        return zlib.compress(data.tobytes(), 1)
+    encoded = [str("" if v is None else v).encode("utf-8") for v in values]
+    offsets = array("I", [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return zlib.compress(offsets.tobytes() + b"".join(encoded), 1)
+
+
+def _decode_column(payload: bytes, col_type: str, count: int) -> list:
+    raw = zlib.decompress(payload)
+    if col_type in _INTEGER_TYPES:
+        data = array("q")
+        data.frombytes(raw)
+        if sys.byteorder != "little":
+            data.byteswap()
+        return data.tolist()
+    offsets = array("I")
+    offsets.frombytes(raw[: 4 * (count + 1)])
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    blob = raw[4 * (count + 1):]
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(count)]
+
+
+def read_columnar(path: str) -> Iterator[Dict[str, list]]:
+    """Lê um arquivo .mmcol grupo a grupo: {coluna: [valores]} por grupo de linhas."""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError("arquivo colunar inválido")
+        (size,) = _U32.unpack(f.read(4))
+        columns = json.loads(f.read(size).decode("utf-8"))["columns"]
+        while True:
+            (count,) = _U32.unpack(f.read(4))
+            if count == 0:
+                return
+            group = {}
+            for col in columns:
+                (size,) = _U32.unpack(f.read(4))
+                group[col["name"]] = _decode_column(f.read(size), col["type"], count)
+            yield group
+
+
+def read_columnar_rows(path: str) -> Iterator[Dict]:
+    for group in read_columnar(path):
+        names = list(group)
+        for values in zip(*(group[n] for n in names)):
+            yield dict(zip(names, values))
+
+
+class ExportService:
+    """Exporta lançamentos e investimentos direto do cursor do SQLite.
+
+    As linhas são lidas com fetchmany em blocos de `ROW_GROUP_SIZE`, então o
+    uso de memória não depende do tamanho do banco.
+    """
+
+    def __init__(self, row_group_size: int = ROW_GROUP_SIZE):
+        self.db_path = DB_FILE
+        self.row_group_size = row_group_size
+        ensure_schema(self.db_path)
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def iter_row_groups(
+        self,
+        kind: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        categories: Optional[Sequence[str]] = None,
+        money_as_text: bool = False,
+    ) -> Iterator[List[tuple]]:
+        """Blocos de linhas de `kind` com data em [start, end) e categoria (ou corretora) em `categories`."""
+        columns, source, date_col, category_col, order = EXPORT_QUERIES[kind]
+        select = ", ".join(
+            _money_as_text_sql(expr) if money_as_text and col_type == "money" else expr
+            for _name, col_type, expr in columns
+        )
+        where, params = [], []
+        if start:
+            where.append(f"{date_col} >= ?"); params.append(start)
+        if end:
+            where.append(f"{date_col} < ?"); params.append(end)
+        if categories:
+            where.append(f"{category_col} IN ({','.join('?' * len(categories))})"); params.extend(categories)
+        sql = f"SELECT {select} FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        # Cursor próprio: não interfere com outras consultas na conexão compartilhada
+        cur = self._connect().cursor()
+        try:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(self.row_group_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+
+    def export(
+        self,
+        kind: str,
+        path: str,
+        fmt: str = "csv",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        categories: Optional[Sequence[str]] = None,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> int:
+        """Grava `kind` em `path` ('csv' ou 'columnar'); retorna o número de linhas exportadas.
+
+        No CSV os valores saem em reais com ponto decimal ('1234.56'); no
+        formato colunar ficam em centavos (colunas do tipo "money").
+        """
+        assert fmt in EXPORT_FORMATS
+        columns = [(name, col_type) for name, col_type, _expr in EXPORT_QUERIES[kind][0]]
+        groups = self.iter_row_groups(kind, start, end, categories, money_as_text=(fmt == "csv"))
+        if fmt == "csv":
+            return self._write_csv(path, columns, groups, progress)
+        return self._write_columnar(path, kind, columns, groups, progress)
+
+    @staticmethod
+    def _write_csv(path, columns, groups, progress) -> int:
+        written = 0
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([name for name, _ in columns])
+            for rows in groups:
+                writer.writerows(rows)
+                written += len(rows)
+                if progress is not None:
+                    progress(written)
+        return written
+
+    @staticmethod
+    def _write_columnar(path, kind, columns, groups, progress) -> int:
+        header = json.dumps(
+            {"kind": kind, "columns": [{"name": n, "type": t} for n, t in columns]}
+        ).encode("utf-8")
+        written = 0
+        with open(path, "wb") as f:
+            f.write(COLUMNAR_MAGIC)
+            f.write(_U32.pack(len(header)))
+            f.write(header)
+            for rows in groups:
+                f.write(_U32.pack(len(rows)))
+                for i, (_name, col_type) in enumerate(columns):
+                    block = _encode_column([row[i] for row in rows], col_type)
+                    f.write(_U32.pack(len(block)))
+                    f.write(block)
+                written += len(rows)
+                if progress is not None:
+                    progress(written)
+            f.write(_U32.pack(0))
+        return written
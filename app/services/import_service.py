@@ -0,0 +1,317 @@
+import csv
+import os
+import re
+from dataclasses import dataclass, field
+from datetime import date as date_cls, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import DB_FILE
+from app.services.db import get_connection, open_connection, bump_table_version, insert_many
+from app.services.category_service import category_id_for
+from app.services.ledger_service import LedgerService, LEDGER_TABLES
+from app.services.migrations import ensure_schema
+from app.utils.money import to_cents
+
+# Linhas inseridas por executemany
+IMPORT_BATCH_SIZE = 5000
+
+DEFAULT_CATEGORY = "Outros"
+
+# Nomes de coluna aceitos nos CSVs dos bancos (comparados em minúsculas, sem acento)
+CSV_COLUMNS = {
+    "date": ("data", "date", "data lancamento", "data do lancamento", "dt"),
+    "description": ("descricao", "description", "historico", "lancamento", "memo"),
+    "amount": ("valor", "amount", "valor (r$)", "quantia"),
+    "category": ("categoria", "category"),
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%Y%m%d")
+
+_ACCENTS = str.maketrans("áàâãéêíóôõúüç", "aaaaeeiooouuc")
+_BR_DATE_RE = re.compile(r"(\d{2})/(\d{2})/(\d{4})$")
+_ISO_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})$")
+_AMOUNT_RE = re.compile(r"([+-]?)(\d+)(?:\.(\d*))?")
+_OFX_TAG_RE = re.compile(r"<(/?)(\w+)>([^<\r\n]*)")
+
+# (data, descrição, valor em centavos com sinal, categoria ou None)
+RawRow = Tuple[str, str, int, Optional[str]]
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+@dataclass
+class ImportResult:
+    expenses: int = 0
+    revenues: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)  # primeiras linhas rejeitadas
+
+    @property
+    def imported(self) -> int:
+        return self.expenses + self.revenues
+
+
+def _normalize(text: str) -> str:
+    return (text or "").strip().lower().translate(_ACCENTS)
+
+
+def parse_date(value: str) -> str:
+    """Converte as datas usuais dos extratos para 'YYYY-MM-DD' (ValueError se inválida)."""
+    # Descarta horário eventual ('2024-01-31T10:00', '31/01/2024 10:00')
+    value = (value or "").strip().split("T")[0].split(" ")[0]
+    # Caminho rápido para DD/MM/AAAA e AAAA-MM-DD (strptime domina o custo da importação)
+    try:
+        m = _BR_DATE_RE.match(value)
+        if m:
+            day, month, year = m.groups()
+            return date_cls(int(year), int(month), int(day)).isoformat()
+        m = _ISO_DATE_RE.match(value)
+        if m:
+            return date_cls(*map(int, m.groups())).isoformat()
+    except ValueError:
+        raise ValueError(f"data inválida: {value!r}") from None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    raise ValueError(f"data inválida: {value!r}")
+
+
+def parse_amount(value: str) -> int:
+    """Valor do extrato ('1.234,56', '-12.30', 'R$ 5,00') em centavos com sinal."""
+    text = (value or "").strip().replace("R$", "").replace(" ", "")
+    if not text:
+        raise ValueError("valor vazio")
+    if "," in text:
+        # Formato brasileiro: ponto como milhar, vírgula decimal
+        text = text.replace(".", "").replace(",", ".")
+    m = _AMOUNT_RE.fullmatch(text)
+    if not m:
+        raise ValueError(f"valor inválido: {value!r}")
+    sign, whole, frac = m.groups()
+    frac = frac or ""
+    if len(frac) > 2:
+        return to_cents(text)
+    cents = int(whole) * 100 + int(frac.ljust(2, "0"))
+    return -cents if sign == "-" else cents
+
+
+class _ByteCounter:
+    """Envolve um arquivo texto contando os bytes já lidos (para o progresso)."""
+
+    def __init__(self, f, encoding: str):
+        self._f = f
+        self._encoding = encoding
+        self.read_bytes = 0
+
+    def __iter__(self):
+        for line in self._f:
+            self.read_bytes += len(line.encode(self._encoding, "replace"))
+            yield line
+
+
+def _detect_encoding(path: str) -> str:
+    with open(path, "rb") as f:
+        sample = f.read(65536)
+    try:
+        sample.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as exc:
+        # Amostra cortada no meio de um caractere multibyte ainda é UTF-8
+        if exc.start >= len(sample) - 3:
+            return "utf-8-sig"
+        return "cp1252"
+
+
+def read_csv_rows(lines: Iterable[str]) -> Iterator[RawRow]:
+    """Lê um CSV de extrato linha a linha; o cabeçalho define as colunas."""
+    lines = iter(lines)
+    header_line = next(lines, "")
+    try:
+        dialect = csv.Sniffer().sniff(header_line, delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    header = [_normalize(h) for h in next(csv.reader([header_line], dialect), [])]
+    index = {}
+    for key, names in CSV_COLUMNS.items():
+        for i, name in enumerate(header):
+            if name in names:
+                index[key] = i
+                break
+    if "date" not in index or "amount" not in index:
+        raise ValueError("CSV sem colunas de data e valor no cabeçalho")
+    desc_i = index.get("description")
+    cat_i = index.get("category")
+    for record in csv.reader(lines, dialect):
+        if not record:
+            continue
+        try:
+            date = parse_date(record[index["date"]])
+            amount = parse_amount(record[index["amount"]])
+        except (IndexError, ValueError) as exc:
+            yield None, str(exc), 0, None
+            continue
+        description = record[desc_i].strip() if desc_i is not None and desc_i < len(record) else ""
+        category = record[cat_i].strip() if cat_i is not None and cat_i < len(record) else None
+        yield date, description, amount, category or None
+
+
+def read_ofx_rows(lines: Iterable[str]) -> Iterator[RawRow]:
+    """Lê as transações (<STMTTRN>) de um OFX 1.x (SGML) ou 2.x (XML) sem carregar o arquivo."""
+    current: Optional[Dict[str, str]] = None
+    for line in lines:
+        # Vários bancos gravam o OFX numa única linha: percorre tag a tag
+        for closing, tag, value in _OFX_TAG_RE.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not closing:
+                    current = {}
+                    continue
+                if current is None:
+                    continue
+                try:
+                    date = parse_date(current.get("DTPOSTED", "")[:8])
+                    amount = parse_amount(current.get("TRNAMT", ""))
+                except ValueError as exc:
+                    yield None, str(exc), 0, None
+                else:
+                    description = current.get("MEMO") or current.get("NAME") or ""
+                    yield date, description, amount, None
+                current = None
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+class ImportService:
+    """Importa extratos CSV/OFX em lote.
+
+    O arquivo é lido em streaming (geradores) e gravado com executemany em
+    lotes de `batch_size`, todos dentro de uma única transação: ou o extrato
+    entra inteiro (com o razão mensal e as categorias novas), ou nada entra.
+    """
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db_path = DB_FILE
+        self.batch_size = batch_size
+        ensure_schema(self.db_path)
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def import_file(
+        self,
+        path: str,
+        kind: Optional[str] = None,
+        category_map: Optional[Dict[str, str]] = None,
+        default_category: str = DEFAULT_CATEGORY,
+        progress: Optional[Callable[[int, int], bool]] = None,
+    ) -> ImportResult:
+        """Importa `path` (.csv ou .ofx).
+
+        - `kind`: 'expense'/'revenue' força o tipo de todas as linhas (valor em
+          módulo); None usa o sinal (negativo = despesa, positivo = receita).
+        - `category_map`: {palavra-chave: categoria} aplicado à descrição quando
+          o arquivo não traz categoria.
+        - `progress(bytes_lidos, bytes_totais)` é chamado a cada lote; retornar
+          False cancela a importação (rollback).
+
+        A transação usa uma conexão exclusiva: o que `progress` executar (na
+        interface, eventos processados durante a importação) usa a conexão
+        compartilhada da thread e não faz commit da importação pela metade.
+        """
+        assert kind in (None, "expense", "revenue")
+        encoding = _detect_encoding(path)
+        total_bytes = os.path.getsize(path)
+        with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+            counter = _ByteCounter(f, encoding)
+            if path.lower().endswith(".ofx"):
+                rows = read_ofx_rows(counter)
+            else:
+                rows = read_csv_rows(counter)
+            on_batch = None
+            if progress is not None:
+                on_batch = lambda: progress(counter.read_bytes, total_bytes)
+            conn = open_connection(self.db_path)
+            try:
+                result = self.import_rows(rows, kind, category_map, default_category, on_batch, conn=conn)
+            finally:
+                conn.close()
+        if progress is not None:
+            progress(total_bytes, total_bytes)
+        return result
+
+    def import_rows(
+        self,
+        rows: Iterable[RawRow],
+        kind: Optional[str] = None,
+        category_map: Optional[Dict[str, str]] = None,
+        default_category: str = DEFAULT_CATEGORY,
+        on_batch: Optional[Callable[[], bool]] = None,
+        conn=None,
+    ) -> ImportResult:
+        result = ImportResult()
+        rules = [(_normalize(k), v) for k, v in (category_map or {}).items() if k]
+        batches: Dict[str, list] = {"expense": [], "revenue": []}
+        # Deltas do razão acumulados em memória: um upsert por (tipo, mês, categoria) no fim
+        ledger: Dict[Tuple[str, str, Optional[int]], int] = {}
+        # (nome, tipo) -> category_id: cada categoria é resolvida (ou criada) uma vez
+        category_ids: Dict[Tuple[str, str], Optional[int]] = {}
+        created_categories = False
+
+        conn = conn or self._connect()
+        # Numa transação já aberta pelo chamador, commit e rollback ficam com ele
+        owns_transaction = not conn.in_transaction
+        if owns_transaction:
+            conn.execute("BEGIN")
+        try:
+            for record_no, (date, description, amount, category) in enumerate(rows, start=1):
+                if date is None or not amount:
+                    result.skipped += 1
+                    if date is None and len(result.errors) < 20:
+                        result.errors.append(f"registro {record_no}: {description}")
+                    continue
+                row_kind = kind or ("expense" if amount < 0 else "revenue")
+                amount = abs(amount)
+                if not category:
+                    lowered = _normalize(description)
+                    category = next((cat for key, cat in rules if key in lowered), default_category)
+                cat_key = (category, row_kind)
+                if cat_key not in category_ids:
+                    category_ids[cat_key], new_category = category_id_for(conn, category, row_kind)
+                    created_categories = created_categories or new_category
+                batch = batches[row_kind]
+                batch.append((date, category_ids[cat_key], description, amount))
+                key = (row_kind, date[:7], category_ids[cat_key])
+                ledger[key] = ledger.get(key, 0) + amount
+                if len(batch) >= self.batch_size:
+                    self._flush(conn, row_kind, batch, result)
+                    if on_batch is not None and on_batch() is False:
+                        raise ImportCancelled()
+            for row_kind, batch in batches.items():
+                self._flush(conn, row_kind, batch, result)
+            for (row_kind, month, category_id), total in ledger.items():
+                LedgerService.apply(conn, row_kind, month, total, category_id)
+            if owns_transaction:
+                conn.commit()
+        except BaseException:
+            if owns_transaction:
+                conn.rollback()
+            raise
+        bump_table_version("expenses", "revenues")
+        if created_categories:
+            bump_table_version("categories")
+        return result
+
+    @staticmethod
+    def _flush(conn, kind: str, batch: list, result: ImportResult) -> None:
+        if not batch:
+            return
+        insert_many(conn, LEDGER_TABLES[kind], ("date", "category_id", "description", "amount"), batch)
+        if kind == "expense":
+            result.expenses += len(batch)
+        else:
+            result.revenues += len(batch)
+        batch.clear()
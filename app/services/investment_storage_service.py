@@ -1,8 +1,11 @@
-import os
-import sqlite3
-from typing import List, Dict, Tuple
+from typing import List, Dict
 
 from app.config import DB_FILE
+from app.services.db import get_connection, chunked, bump_table_version
+from app.services.migrations import ensure_schema
+from app.services.broker_service import broker_id_for
+from app.services.capital_service import CapitalSeriesService
+from app.services.search_service import SEARCH_LIMIT, search_transactions
 from app.models.investment import Investment
 
 
@@ -12,157 +15,197 @@ class InvestmentStorageService:
         self._ensure_db()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection(self.db_path)
 
     def _ensure_db(self) -> None:
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS investments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    broker TEXT NOT NULL,
-                    start_date TEXT NOT NULL,
-                    description TEXT,
-                    initial_amount REAL NOT NULL DEFAULT 0
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS contributions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    investment_id INTEGER NOT NULL,
-                    date TEXT NOT NULL,
-                    description TEXT,
-                    amount REAL NOT NULL,
-                    FOREIGN KEY (investment_id) REFERENCES investments(id) ON DELETE CASCADE
-                )
-                """
-            )
+        ensure_schema(self.db_path)
 
     # Investments
     def load_investments(self) -> List[Dict]:
         with self._connect() as conn:
             cur = conn.execute(
-                "SELECT name, broker, start_date, description, initial_amount FROM investments ORDER BY id ASC"
+                "SELECT i.id, i.name, COALESCE(b.name, ''), i.start_date, i.description, i.initial_amount "
+                "FROM investments i LEFT JOIN brokers b ON b.id = i.broker_id ORDER BY i.id ASC"
             )
             rows = cur.fetchall()
             return [
                 {
-                    "name": r[0],
-                    "broker": r[1],
-                    "start_date": r[2],
-                    "description": r[3] or "",
-                    "initial_amount": float(r[4] or 0.0),
+                    "id": r[0],
+                    "name": r[1],
+                    "broker": r[2],
+                    "start_date": r[3],
+                    "description": r[4] or "",
+                    "initial_amount": int(r[5] or 0),
                 }
                 for r in rows
             ]
 
-    def save_investment(self, inv: Investment) -> None:
+    def load_investments_with_totals(self) -> List[Dict]:
+        """Investimentos com a soma dos aportes de cada um, numa única consulta."""
         with self._connect() as conn:
-            conn.execute(
-                "INSERT INTO investments (name, broker, start_date, description, initial_amount) VALUES (?, ?, ?, ?, ?)",
-                (inv.name, inv.broker, inv.start_date, inv.description, float(inv.initial_amount)),
+            cur = conn.execute(
+                """
+                SELECT i.id, i.name, COALESCE(b.name, ''), i.start_date, i.description, i.initial_amount,
+                       COALESCE(c.total, 0)
+                FROM investments i
+                LEFT JOIN brokers b ON b.id = i.broker_id
+                LEFT JOIN (
+                    SELECT investment_id, SUM(amount) AS total
+                    FROM contributions
+                    GROUP BY investment_id
+                ) c ON c.investment_id = i.id
+                ORDER BY i.id ASC
+                """
             )
+            rows = cur.fetchall()
+            result = []
+            for r in rows:
+                initial_amount = int(r[5] or 0)
+                contrib_sum = int(r[6] or 0)
+                result.append(
+                    {
+                        "id": r[0],
+                        "name": r[1],
+                        "broker": r[2],
+                        "start_date": r[3],
+                        "description": r[4] or "",
+                        "initial_amount": initial_amount,
+                        "contributions_sum": contrib_sum,
+                        "total": initial_amount + contrib_sum,
+                    }
+                )
+            return result
+
+    def save_investment(self, inv: Investment) -> None:
+        with self._connect() as conn:
+            broker_id, created = broker_id_for(conn, inv.broker)
+            investment_id = conn.execute(
+                "INSERT INTO investments (name, broker_id, start_date, description, initial_amount) VALUES (?, ?, ?, ?, ?)",
+                (inv.name, broker_id, inv.start_date, inv.description, int(inv.initial_amount)),
+            ).lastrowid
+            CapitalSeriesService.apply(conn, [(investment_id, inv.start_date, int(inv.initial_amount))])
             conn.commit()
+            bump_table_version("investments", "capital_series")
+            if created:
+                bump_table_version("brokers")
 
-    def _get_investment_id_by_index(self, index: int) -> int | None:
+    def update_investment(self, investment_id: int, inv: Investment) -> None:
         with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT id FROM investments ORDER BY id ASC LIMIT 1 OFFSET ?",
-                (index,),
+            old = conn.execute(
+                "SELECT broker_id, start_date, initial_amount FROM investments WHERE id = ?", (investment_id,)
+            ).fetchone()
+            if old is None:
+                return
+            broker_id, created = broker_id_for(conn, inv.broker)
+            # Série da corretora antiga passa para a nova; depois troca o valor inicial nas duas
+            CapitalSeriesService.move_investment(conn, investment_id, old[0], broker_id)
+            conn.execute(
+                "UPDATE investments SET name = ?, broker_id = ?, start_date = ?, description = ?, initial_amount = ? WHERE id = ?",
+                (inv.name, broker_id, inv.start_date, inv.description, int(inv.initial_amount), investment_id),
             )
-            row = cur.fetchone()
-            return row[0] if row else None
+            CapitalSeriesService.apply(conn, [
+                (investment_id, old[1], -int(old[2] or 0)),
+                (investment_id, inv.start_date, int(inv.initial_amount)),
+            ])
+            conn.commit()
+            bump_table_version("investments", "capital_series")
+            if created:
+                bump_table_version("brokers")
 
-    def update_investment(self, index: int, inv: Investment) -> None:
+    def delete_investments(self, investment_ids: List[int]) -> None:
+        ids = sorted(set(investment_ids))
+        if not ids:
+            return
         with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT id FROM investments ORDER BY id ASC LIMIT 1 OFFSET ?",
-                (index,),
-            )
-            row = cur.fetchone()
-            if row:
+            for chunk in chunked(ids):
+                # A série do investimento sai em cascata; a da corretora é abatida antes
+                for investment_id, broker_id in conn.execute(
+                    f"SELECT id, broker_id FROM investments WHERE id IN ({','.join('?' * len(chunk))}) "
+                    "AND broker_id IS NOT NULL",
+                    chunk,
+                ).fetchall():
+                    CapitalSeriesService.move_investment(conn, investment_id, broker_id, None)
                 conn.execute(
-                    "UPDATE investments SET name = ?, broker = ?, start_date = ?, description = ?, initial_amount = ? WHERE id = ?",
-                    (inv.name, inv.broker, inv.start_date, inv.description, float(inv.initial_amount), row[0]),
+                    f"DELETE FROM investments WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
                 )
-                conn.commit()
-
-    def delete_investment(self, index: int) -> None:
-        with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT id FROM investments ORDER BY id ASC LIMIT 1 OFFSET ?",
-                (index,),
-            )
-            row = cur.fetchone()
-            if row:
-                conn.execute("DELETE FROM investments WHERE id = ?", (row[0],))
-                conn.commit()
+        # Aportes, valores de mercado e séries de capital saem junto (ON DELETE CASCADE)
+        bump_table_version("investments", "contributions", "valuations", "capital_series")
 
     # Contributions
-    def load_contributions(self, investment_index: int) -> List[Dict]:
-        inv_id = self._get_investment_id_by_index(investment_index)
-        if inv_id is None:
-            return []
+    def load_contributions(self, investment_id: int) -> List[Dict]:
         with self._connect() as conn:
             cur = conn.execute(
-                "SELECT date, description, amount FROM contributions WHERE investment_id = ? ORDER BY id ASC",
-                (inv_id,),
+                "SELECT id, date, description, amount FROM contributions WHERE investment_id = ? ORDER BY date, id",
+                (investment_id,),
             )
             rows = cur.fetchall()
             return [
                 {
-                    "date": r[0],
-                    "description": r[1] or "",
-                    "amount": float(r[2] or 0.0),
+                    "id": r[0],
+                    "date": r[1],
+                    "description": r[2] or "",
+                    "amount": int(r[3] or 0),
                 }
                 for r in rows
             ]
 
-    def save_contribution(self, investment_index: int, date: str, description: str, amount: float) -> None:
-        inv_id = self._get_investment_id_by_index(investment_index)
-        if inv_id is None:
-            return
+    def search_contributions(self, text: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """Aportes cuja descrição contém as palavras de `text`; "label" é o nome do investimento."""
+        with self._connect() as conn:
+            return search_transactions(conn, text, ('contribution',), limit)
+
+    def save_contribution(self, investment_id: int, date: str, description: str, amount: int) -> None:
         with self._connect() as conn:
             conn.execute(
                 "INSERT INTO contributions (investment_id, date, description, amount) VALUES (?, ?, ?, ?)",
-                (inv_id, date, description, float(amount)),
+                (investment_id, date, description, int(amount)),
             )
+            CapitalSeriesService.apply(conn, [(investment_id, date, int(amount))])
             conn.commit()
+            bump_table_version("contributions", "capital_series")
 
-    def delete_contribution(self, investment_index: int, contribution_index: int) -> None:
-        inv_id = self._get_investment_id_by_index(investment_index)
-        if inv_id is None:
+    def delete_contributions(self, contribution_ids: List[int]) -> None:
+        ids = sorted(set(contribution_ids))
+        if not ids:
             return
         with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT id FROM contributions WHERE investment_id = ? ORDER BY id ASC LIMIT 1 OFFSET ?",
-                (inv_id, contribution_index),
+            for chunk in chunked(ids):
+                placeholders = ','.join('?' * len(chunk))
+                removed = conn.execute(
+                    f"SELECT investment_id, date, -SUM(amount) FROM contributions WHERE id IN ({placeholders}) "
+                    "GROUP BY investment_id, date",
+                    chunk,
+                ).fetchall()
+                conn.execute(f"DELETE FROM contributions WHERE id IN ({placeholders})", chunk)
+                CapitalSeriesService.apply(conn, removed)
+        bump_table_version("contributions", "capital_series")
+
+    # Valuations
+    def save_valuation(self, investment_id: int, date: str, value: int) -> None:
+        """Registra o valor de mercado do investimento na data (substitui o da mesma data)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO valuations (investment_id, date, value) VALUES (?, ?, ?) "
+                "ON CONFLICT(investment_id, date) DO UPDATE SET value = excluded.value",
+                (investment_id, date, int(value)),
             )
-            row = cur.fetchone()
-            if row:
-                conn.execute("DELETE FROM contributions WHERE id = ?", (row[0],))
-                conn.commit()
+            conn.commit()
+            bump_table_version("valuations")
 
-    def get_total_invested(self) -> float:
+    def get_total_invested(self) -> int:
         with self._connect() as conn:
             cur1 = conn.execute("SELECT COALESCE(SUM(initial_amount), 0) FROM investments")
-            total_initial = float(cur1.fetchone()[0] or 0.0)
+            total_initial = int(cur1.fetchone()[0] or 0)
             cur2 = conn.execute("SELECT COALESCE(SUM(amount), 0) FROM contributions")
-            total_contrib = float(cur2.fetchone()[0] or 0.0)
+            total_contrib = int(cur2.fetchone()[0] or 0)
             return total_initial + total_contrib
 
-    def get_investment_contrib_sum(self, investment_index: int) -> float:
-        inv_id = self._get_investment_id_by_index(investment_index)
-        if inv_id is None:
-            return 0.0
+    def get_investment_contrib_sum(self, investment_id: int) -> int:
         with self._connect() as conn:
             cur = conn.execute(
                 "SELECT COALESCE(SUM(amount), 0) FROM contributions WHERE investment_id = ?",
-                (inv_id,),
+                (investment_id,),
             )
             total = cur.fetchone()[0]
-            return float(total or 0.0)
\ No newline at end of file
+            return int(total or 0)
\ No newline at end of file
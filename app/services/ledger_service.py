@@ -0,0 +1,106 @@
+import re
+
+from app.config import DB_FILE
+from app.services.db import get_connection
+from app.services.migrations import ensure_schema
+
+# Tabelas de lançamentos acompanhadas pelo razão mensal
+LEDGER_TABLES = {"expense": "expenses", "revenue": "revenues"}
+
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}")
+
+
+class LedgerService:
+    """Totais mensais por tipo (despesa/receita) e por categoria mantidos a cada escrita.
+
+    Os métodos estáticos recebem a conexão da transação em andamento, para que
+    o razão seja atualizado atomicamente junto com o lançamento.
+    """
+
+    def __init__(self):
+        self.db_path = DB_FILE
+        ensure_schema(self.db_path)
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    @staticmethod
+    def apply(conn, kind: str, date: str, amount: int, category_id: int | None = None) -> None:
+        """Soma `amount` em centavos (pode ser negativo) ao total do mês de `date`.
+
+        Com `category_id`, soma também no total do mês da categoria (base dos orçamentos).
+        """
+        if not amount or not _MONTH_RE.match(date or ""):
+            return
+        conn.execute(
+            "INSERT INTO monthly_totals (month, kind, total) VALUES (?, ?, ?) "
+            "ON CONFLICT(kind, month) DO UPDATE SET total = total + excluded.total",
+            (date[:7], kind, amount),
+        )
+        if category_id is not None:
+            conn.execute(
+                "INSERT INTO category_totals (category_id, month, total) VALUES (?, ?, ?) "
+                "ON CONFLICT(category_id, month) DO UPDATE SET total = total + excluded.total",
+                (category_id, date[:7], amount),
+            )
+
+    @staticmethod
+    def move_category(conn, old_id: int, new_id: int) -> None:
+        """Transfere os totais mensais de `old_id` para `new_id` (fusão/reatribuição de categoria)."""
+        conn.execute(
+            "INSERT INTO category_totals (category_id, month, total) "
+            "SELECT ?, month, total FROM category_totals WHERE category_id = ? "
+            "ON CONFLICT(category_id, month) DO UPDATE SET total = total + excluded.total",
+            (new_id, old_id),
+        )
+        conn.execute("DELETE FROM category_totals WHERE category_id = ?", (old_id,))
+
+    @staticmethod
+    def sync(conn, kind: str) -> None:
+        """Reconstrói o razão do tipo (e o das suas categorias) a partir dos lançamentos se ainda não existir."""
+        table = LEDGER_TABLES[kind]
+        has_ledger = conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM monthly_totals WHERE kind = ?)", (kind,)
+        ).fetchone()[0]
+        if has_ledger:
+            return
+        conn.execute(
+            "DELETE FROM category_totals WHERE category_id IN (SELECT id FROM categories WHERE type = ?)", (kind,)
+        )
+        conn.execute(
+            f"""
+            INSERT INTO category_totals (category_id, month, total)
+            SELECT category_id, substr(date, 1, 7), SUM(amount) FROM {table}
+            WHERE category_id IS NOT NULL AND date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+            GROUP BY category_id, substr(date, 1, 7)
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO monthly_totals (month, kind, total)
+            SELECT substr(date, 1, 7), ?, SUM(amount) FROM {table}
+            WHERE date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+            GROUP BY substr(date, 1, 7)
+            """,
+            (kind,),
+        )
+
+    def cumulative_total(self, kind: str, year: int, month: int) -> int:
+        """Soma de todos os meses até `year`/`month` inclusive (prefix-sum sobre o razão)."""
+        assert kind in LEDGER_TABLES
+        with self._connect() as conn:
+            cur = conn.execute(
+                "SELECT COALESCE(SUM(total), 0) FROM monthly_totals WHERE kind = ? AND month <= ?",
+                (kind, f"{year:04d}-{month:02d}"),
+            )
+            return int(cur.fetchone()[0] or 0)
+
+    def month_total(self, kind: str, year: int, month: int) -> int:
+        assert kind in LEDGER_TABLES
+        with self._connect() as conn:
+            cur = conn.execute(
+                "SELECT total FROM monthly_totals WHERE kind = ? AND month = ?",
+                (kind, f"{year:04d}-{month:02d}"),
+            )
+            row = cur.fetchone()
+            return int(row[0]) if row else 0
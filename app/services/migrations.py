@@ -0,0 +1,476 @@
+"""Migrações do banco, aplicadas em ordem e registradas em PRAGMA user_version.
+
+Cada migração roda uma única vez, na sua própria transação. Para mudar o
+schema, acrescente uma função com `@migration(<próxima versão>, "descrição")`
+ao fim deste arquivo; nunca altere uma migração já publicada.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable, List
+
+from app.config import DB_FILE
+from app.services.db import get_connection, migrate_money_to_cents, rebuild_table
+
+# Valores monetários em centavos (INTEGER)
+EXPENSES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT,
+    amount INTEGER NOT NULL
+)
+"""
+
+REVENUES_SCHEMA = EXPENSES_SCHEMA
+
+INVESTMENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    broker TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    description TEXT,
+    initial_amount INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+CONTRIBUTIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    investment_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT,
+    amount INTEGER NOT NULL,
+    FOREIGN KEY (investment_id) REFERENCES investments(id) ON DELETE CASCADE
+)
+"""
+
+# Versão 4: categoria e corretora referenciadas por id (renomear altera uma linha)
+EXPENSES_SCHEMA_V4 = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    category_id INTEGER REFERENCES categories(id),
+    description TEXT,
+    amount INTEGER NOT NULL
+)
+"""
+
+REVENUES_SCHEMA_V4 = EXPENSES_SCHEMA_V4
+
+INVESTMENTS_SCHEMA_V4 = """
+CREATE TABLE IF NOT EXISTS {name} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    broker_id INTEGER REFERENCES brokers(id),
+    start_date TEXT NOT NULL,
+    description TEXT,
+    initial_amount INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Índice de busca: uma tabela FTS5 para os três tipos de lançamento. É
+# "contentless" (não duplica as descrições); o rowid codifica a origem:
+# id * 4 + SEARCH_KINDS[tipo]
+SEARCH_KINDS = {"expense": 1, "revenue": 2, "contribution": 3}
+SEARCH_TABLES = {"expense": "expenses", "revenue": "revenues", "contribution": "contributions"}
+
+DEFAULT_EXPENSE_CATEGORIES = ["Alimentação", "Transporte", "Moradia", "Lazer", "Saúde", "Outros"]
+DEFAULT_REVENUE_CATEGORIES = ["Salário", "Freelance", "Vendas", "Investimentos", "Outros"]
+DEFAULT_BROKERS = ["Nubank", "XP", "Clear", "BTG", "Inter"]
+
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Registra a função decorada como a migração `version` (sequencial, a partir de 1)."""
+    def register(fn):
+        expected = len(MIGRATIONS) + 1
+        if version != expected:
+            raise ValueError(f"migração {version} fora de ordem (esperada {expected})")
+        MIGRATIONS.append(Migration(version, description, fn))
+        return fn
+    return register
+
+
+def schema_version() -> int:
+    """Versão mais recente do schema (a última migração registrada)."""
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def apply_migrations(conn) -> List[int]:
+    """Aplica as migrações pendentes; retorna as versões aplicadas.
+
+    As chaves estrangeiras ficam desligadas durante as migrações (reconstruções
+    de tabela fazem DROP/RENAME) e o estado anterior é restaurado no fim.
+    """
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    pending = [m for m in MIGRATIONS if m.version > current]
+    if not pending:
+        return []
+    if conn.in_transaction:
+        conn.commit()
+    # PRAGMA foreign_keys não tem efeito dentro de transação
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    applied = []
+    try:
+        for m in pending:
+            conn.execute("BEGIN")
+            try:
+                m.apply(conn)
+                conn.execute(f"PRAGMA user_version = {m.version}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            applied.append(m.version)
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+    return applied
+
+
+# Bancos já verificados neste processo
+_ready = set()
+_lock = threading.Lock()
+
+
+def ensure_schema(db_path: str = DB_FILE) -> None:
+    """Deixa o banco na versão mais recente, no máximo uma vez por processo.
+
+    Bancos com `PRAGMA user_version` atualizado não executam nenhum DDL.
+    """
+    if db_path in _ready:
+        return
+    with _lock:
+        if db_path in _ready:
+            return
+        apply_migrations(get_connection(db_path))
+        _ready.add(db_path)
+
+
+# ---- Migrações ----
+@migration(1, "tabelas base, valores em centavos, categorias e corretoras padrão")
+def _m001_base(conn) -> None:
+    # Lançamentos e investimentos
+    conn.execute(EXPENSES_SCHEMA.format(name="expenses"))
+    conn.execute(REVENUES_SCHEMA.format(name="revenues"))
+    conn.execute(INVESTMENTS_SCHEMA.format(name="investments"))
+    conn.execute(CONTRIBUTIONS_SCHEMA.format(name="contributions"))
+    # Bancos antigos guardavam reais em REAL: converte uma vez para centavos
+    migrate_money_to_cents(conn, "expenses", EXPENSES_SCHEMA, ("amount",))
+    migrate_money_to_cents(conn, "revenues", REVENUES_SCHEMA, ("amount",))
+    migrate_money_to_cents(conn, "investments", INVESTMENTS_SCHEMA, ("initial_amount",))
+    migrate_money_to_cents(conn, "contributions", CONTRIBUTIONS_SCHEMA, ("amount",))
+    # Índice por data para filtros mensais (range scan)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_revenues_date ON revenues(date)")
+
+    # Razão mensal: a versão antiga em REAL (reais) é derivada dos lançamentos,
+    # então é descartada e reconstruída em centavos por LedgerService.sync
+    info = conn.execute("PRAGMA table_info(monthly_totals)").fetchall()
+    if any(r[1] == "total" and (r[2] or "").upper() != "INTEGER" for r in info):
+        conn.execute("DROP TABLE monthly_totals")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS monthly_totals (
+            month TEXT NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('expense','revenue')),
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, month)
+        ) WITHOUT ROWID
+        """
+    )
+
+    # Categorias
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL CHECK (type IN ('expense','revenue')),
+            UNIQUE(name, type)
+        )
+        """
+    )
+    if not conn.execute("SELECT EXISTS(SELECT 1 FROM categories)").fetchone()[0]:
+        conn.executemany(
+            "INSERT OR IGNORE INTO categories (name, type) VALUES (?, 'expense')",
+            [(n,) for n in DEFAULT_EXPENSE_CATEGORIES],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO categories (name, type) VALUES (?, 'revenue')",
+            [(n,) for n in DEFAULT_REVENUE_CATEGORIES],
+        )
+    # Categorias usadas em lançamentos antigos (antes da tabela existir)
+    conn.execute(
+        "INSERT OR IGNORE INTO categories (name, type) "
+        "SELECT DISTINCT category, 'expense' FROM expenses WHERE category <> ''"
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO categories (name, type) "
+        "SELECT DISTINCT category, 'revenue' FROM revenues WHERE category <> ''"
+    )
+
+    # Corretoras
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS brokers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    if not conn.execute("SELECT EXISTS(SELECT 1 FROM brokers)").fetchone()[0]:
+        conn.executemany(
+            "INSERT OR IGNORE INTO brokers (name) VALUES (?)",
+            [(n,) for n in DEFAULT_BROKERS],
+        )
+
+
+@migration(2, "índices por categoria, corretora e investimento")
+def _m002_indexes(conn) -> None:
+    # Renomear/excluir categoria e filtros por categoria (WHERE category = ?)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_revenues_category ON revenues(category, date)")
+    # Renomear/excluir corretora (WHERE broker = ?)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_investments_broker ON investments(broker)")
+    # Aportes de um investimento (load_contributions, somas, exclusão em cascata)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contributions_investment ON contributions(investment_id)")
+    conn.execute("ANALYZE")
+
+
+@migration(3, "remove aportes órfãos e cria índice de cobertura (investment_id, date, amount)")
+def _m003_contributions_fk(conn) -> None:
+    # Sem PRAGMA foreign_keys o ON DELETE CASCADE nunca rodou: limpa os órfãos
+    conn.execute(
+        "DELETE FROM contributions WHERE NOT EXISTS "
+        "(SELECT 1 FROM investments i WHERE i.id = contributions.investment_id)"
+    )
+    # Substitui o índice simples: atende a cascata, a listagem por data e as somas sem ler a tabela
+    conn.execute("DROP INDEX IF EXISTS idx_contributions_investment")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_contributions_investment_date "
+        "ON contributions(investment_id, date, amount)"
+    )
+    conn.execute("ANALYZE contributions")
+
+
+@migration(4, "categoria e corretora como chaves estrangeiras inteiras (category_id, broker_id)")
+def _m004_reference_ids(conn) -> None:
+    for table, kind in (("expenses", "expense"), ("revenues", "revenue")):
+        # Nomes usados nos lançamentos e ausentes do cadastro viram categorias
+        conn.execute(
+            f"INSERT OR IGNORE INTO categories (name, type) "
+            f"SELECT DISTINCT TRIM(category), '{kind}' FROM {table} WHERE TRIM(category) <> ''"
+        )
+        # Categoria vazia fica NULL (relatórios mostram "sem categoria")
+        rebuild_table(
+            conn, table, EXPENSES_SCHEMA_V4,
+            "id, date, category_id, description, amount",
+            f"SELECT t.id, t.date, c.id, t.description, t.amount FROM {table} t "
+            f"LEFT JOIN categories c ON c.type = '{kind}' AND c.name = TRIM(t.category)",
+        )
+        # DROP TABLE levou os índices antigos
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table}(date)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_category ON {table}(category_id, date)")
+
+    conn.execute(
+        "INSERT OR IGNORE INTO brokers (name) "
+        "SELECT DISTINCT TRIM(broker) FROM investments WHERE TRIM(broker) <> ''"
+    )
+    rebuild_table(
+        conn, "investments", INVESTMENTS_SCHEMA_V4,
+        "id, name, broker_id, start_date, description, initial_amount",
+        "SELECT i.id, i.name, b.id, i.start_date, i.description, i.initial_amount FROM investments i "
+        "LEFT JOIN brokers b ON b.name = TRIM(i.broker)",
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_investments_broker ON investments(broker_id)")
+    conn.execute("ANALYZE")
+
+
+@migration(5, "índices de cobertura (category_id, date, amount) para estatísticas e relatórios")
+def _m005_category_covering(conn) -> None:
+    # Uso por categoria e relatórios agrupam por categoria somando amount: sem
+    # ler a tabela, a consulta percorre só o índice
+    for table in ("expenses", "revenues"):
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table}_category")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_category ON {table}(category_id, date, amount)")
+        conn.execute(f"ANALYZE {table}")
+
+
+
+def create_search_triggers(conn, kind: str) -> None:
+    """Triggers que mantêm search_fts em dia com a tabela de `kind`.
+
+    Reconstruções de tabela (DROP/RENAME) descartam os triggers: recrie-os.
+    """
+    table, code = SEARCH_TABLES[kind], SEARCH_KINDS[kind]
+    # Tabela contentless: a remoção informa os valores antigos ao comando 'delete'
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO search_fts (rowid, description) VALUES (NEW.id * 4 + {code}, COALESCE(NEW.description, ''));
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO search_fts (search_fts, rowid, description) VALUES ('delete', OLD.id * 4 + {code}, COALESCE(OLD.description, ''));
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_search_au AFTER UPDATE OF description ON {table} BEGIN
+            INSERT INTO search_fts (search_fts, rowid, description) VALUES ('delete', OLD.id * 4 + {code}, COALESCE(OLD.description, ''));
+            INSERT INTO search_fts (rowid, description) VALUES (NEW.id * 4 + {code}, COALESCE(NEW.description, ''));
+        END
+        """
+    )
+
+
+@migration(6, "busca textual (FTS5) nas descrições de despesas, receitas e aportes")
+def _m006_search(conn) -> None:
+    # remove_diacritics: "onibus" encontra "Ônibus"
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+        "description, content='', tokenize='unicode61 remove_diacritics 2')"
+    )
+    for kind, table in SEARCH_TABLES.items():
+        conn.execute(
+            f"INSERT INTO search_fts (rowid, description) "
+            f"SELECT id * 4 + {SEARCH_KINDS[kind]}, COALESCE(description, '') FROM {table}"
+        )
+        create_search_triggers(conn, kind)
+    conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+
+
+@migration(7, "lançamentos recorrentes (regras com próxima data a gerar)")
+def _m007_recurrences(conn) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS recurrences (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL CHECK (kind IN ('expense','revenue','contribution')),
+            frequency TEXT NOT NULL CHECK (frequency IN ('weekly','monthly','yearly')),
+            start_date TEXT NOT NULL,
+            end_date TEXT,
+            next_date TEXT NOT NULL,
+            category_id INTEGER REFERENCES categories(id),
+            investment_id INTEGER REFERENCES investments(id) ON DELETE CASCADE,
+            description TEXT,
+            amount INTEGER NOT NULL
+        )
+        """
+    )
+    # Regras vencidas (next_date <= hoje) sem varrer as demais
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recurrences_next ON recurrences(next_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_recurrences_investment ON recurrences(investment_id)")
+
+
+@migration(8, "totais mensais por categoria e orçamentos (limite por categoria a partir de um mês)")
+def _m008_budgets(conn) -> None:
+    # Mantida junto com monthly_totals por LedgerService.apply; lançamentos sem
+    # categoria ficam só no razão por tipo
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS category_totals (
+            category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+            month TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category_id, month)
+        ) WITHOUT ROWID
+        """
+    )
+    for table in ("expenses", "revenues"):
+        conn.execute(
+            f"""
+            INSERT INTO category_totals (category_id, month, total)
+            SELECT category_id, substr(date, 1, 7), SUM(amount) FROM {table}
+            WHERE category_id IS NOT NULL AND date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+            GROUP BY category_id, substr(date, 1, 7)
+            ON CONFLICT(category_id, month) DO UPDATE SET total = total + excluded.total
+            """
+        )
+    # Um limite vale do mês informado em diante, até o próximo registrado
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS budgets (
+            category_id INTEGER NOT NULL REFERENCES categories(id) ON DELETE CASCADE,
+            month TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            PRIMARY KEY (category_id, month)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+@migration(9, "valor de mercado informado por investimento e data (base da rentabilidade)")
+def _m009_valuations(conn) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS valuations (
+            investment_id INTEGER NOT NULL REFERENCES investments(id) ON DELETE CASCADE,
+            date TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (investment_id, date)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+@migration(10, "capital investido acumulado por investimento e por corretora (séries por data)")
+def _m010_capital_series(conn) -> None:
+    # Um ponto por dia com movimento: valor do dia e acumulado até ele
+    for table, key, parent in (("capital_series", "investment_id", "investments"),
+                               ("broker_capital_series", "broker_id", "brokers")):
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key} INTEGER NOT NULL REFERENCES {parent}(id) ON DELETE CASCADE,
+                date TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                cumulative INTEGER NOT NULL,
+                PRIMARY KEY ({key}, date)
+            ) WITHOUT ROWID
+            """
+        )
+    flows = (
+        "SELECT id AS investment_id, start_date AS date, initial_amount AS amount FROM investments "
+        "UNION ALL SELECT investment_id, date, amount FROM contributions"
+    )
+    conn.execute(
+        f"""
+        INSERT INTO capital_series (investment_id, date, amount, cumulative)
+        SELECT investment_id, date, amount, SUM(amount) OVER (PARTITION BY investment_id ORDER BY date)
+        FROM (
+            SELECT investment_id, date, SUM(amount) AS amount FROM ({flows})
+            WHERE date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+            GROUP BY investment_id, date HAVING SUM(amount) <> 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO broker_capital_series (broker_id, date, amount, cumulative)
+        SELECT broker_id, date, amount, SUM(amount) OVER (PARTITION BY broker_id ORDER BY date)
+        FROM (
+            SELECT i.broker_id, s.date, SUM(s.amount) AS amount
+            FROM capital_series s JOIN investments i ON i.id = s.investment_id
+            WHERE i.broker_id IS NOT NULL
+            GROUP BY i.broker_id, s.date HAVING SUM(s.amount) <> 0
+        )
+        """
+    )
@@ -0,0 +1,206 @@
+import calendar
+from datetime import date as date_cls, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from app.config import DB_FILE
+from app.services.db import get_connection, bump_table_version, insert_many
+from app.services.capital_service import CapitalSeriesService
+from app.services.category_service import category_id_for
+from app.services.ledger_service import LedgerService
+from app.services.migrations import ensure_schema
+
+FREQUENCIES = ("weekly", "monthly", "yearly")
+RECURRENCE_KINDS = ("expense", "revenue", "contribution")
+
+# Tabela e colunas gravadas por tipo de lançamento gerado
+_TARGETS = {
+    "expense": ("expenses", ("date", "category_id", "description", "amount")),
+    "revenue": ("revenues", ("date", "category_id", "description", "amount")),
+    "contribution": ("contributions", ("investment_id", "date", "description", "amount")),
+}
+
+
+def next_occurrence(current: str, frequency: str, anchor_day: int) -> str:
+    """Data seguinte a `current` ('YYYY-MM-DD') na frequência da regra.
+
+    Mensal e anual voltam ao dia `anchor_day` (o dia da data inicial) sempre
+    que o mês permite: uma regra do dia 31 cai em 28/02 e volta a 31/03.
+    """
+    d = date_cls.fromisoformat(current)
+    if frequency == "weekly":
+        return (d + timedelta(days=7)).isoformat()
+    if frequency == "monthly":
+        year, month = (d.year + 1, 1) if d.month == 12 else (d.year, d.month + 1)
+    else:
+        year, month = d.year + 1, d.month
+    day = min(anchor_day, calendar.monthrange(year, month)[1])
+    return date_cls(year, month, day).isoformat()
+
+
+def occurrences(current: str, frequency: str, anchor_day: int, last: str) -> Iterator[str]:
+    """Datas de `current` até `last` (inclusive); equivale a repetir `next_occurrence`.
+
+    Trabalha com inteiros (ano, mês) em vez de converter cada data, o que
+    importa ao recuperar anos de ocorrências de milhares de regras.
+    """
+    if frequency == "weekly":
+        d, end, step = date_cls.fromisoformat(current), date_cls.fromisoformat(last), timedelta(days=7)
+        while d <= end:
+            yield d.isoformat()
+            d += step
+        return
+    year, month = int(current[:4]), int(current[5:7])
+    months = 1 if frequency == "monthly" else 12
+    while current <= last:
+        yield current
+        month += months
+        year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+        current = f"{year:04d}-{month:02d}-{min(anchor_day, calendar.monthrange(year, month)[1]):02d}"
+
+
+class RecurrenceService:
+    """Regras de lançamentos recorrentes (aluguel, salário, aporte mensal).
+
+    Cada regra guarda a próxima data a gerar (`next_date`): `materialize`
+    percorre só as regras vencidas pelo índice dessa coluna e nunca relê o
+    histórico de lançamentos.
+    """
+
+    def __init__(self):
+        self.db_path = DB_FILE
+        self._ensure_db()
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def _ensure_db(self) -> None:
+        ensure_schema(self.db_path)
+
+    def add_recurrence(
+        self,
+        kind: str,
+        frequency: str,
+        start_date: str,
+        amount: int,
+        description: str = "",
+        category: Optional[str] = None,
+        investment_id: Optional[int] = None,
+        end_date: Optional[str] = None,
+    ) -> int:
+        """Cria a regra; a primeira ocorrência é `start_date`. Retorna o id."""
+        assert kind in RECURRENCE_KINDS and frequency in FREQUENCIES
+        if kind == "contribution":
+            assert investment_id is not None
+        with self._connect() as conn:
+            category_id, created = category_id_for(conn, category, kind) if kind != "contribution" else (None, False)
+            rule_id = conn.execute(
+                "INSERT INTO recurrences (kind, frequency, start_date, end_date, next_date, category_id, "
+                "investment_id, description, amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, frequency, start_date, end_date or None, start_date, category_id,
+                 investment_id if kind == "contribution" else None, description, int(amount)),
+            ).lastrowid
+            conn.commit()
+            if created:
+                bump_table_version("categories")
+            return rule_id
+
+    def list_recurrences(self) -> List[Dict]:
+        """Regras com o nome da categoria ou do investimento em "label"."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                """
+                SELECT r.id, r.kind, r.frequency, r.start_date, r.end_date, r.next_date,
+                       COALESCE(c.name, i.name, ''), r.description, r.amount
+                FROM recurrences r
+                LEFT JOIN categories c ON c.id = r.category_id
+                LEFT JOIN investments i ON i.id = r.investment_id
+                ORDER BY r.kind, r.next_date, r.id
+                """
+            )
+            return [
+                {
+                    "id": r[0],
+                    "kind": r[1],
+                    "frequency": r[2],
+                    "start_date": r[3],
+                    "end_date": r[4],
+                    "next_date": r[5],
+                    "label": r[6],
+                    "description": r[7] or "",
+                    "amount": int(r[8] or 0),
+                }
+                for r in cur.fetchall()
+            ]
+
+    def end_recurrence(self, rule_id: int, end_date: str) -> None:
+        """Encerra a regra em `end_date` (inclusive); os lançamentos já gerados ficam."""
+        with self._connect() as conn:
+            conn.execute("UPDATE recurrences SET end_date = ? WHERE id = ?", (end_date, rule_id))
+            conn.commit()
+
+    def delete_recurrence(self, rule_id: int) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM recurrences WHERE id = ?", (rule_id,))
+            conn.commit()
+
+    def materialize(self, until: Optional[str] = None) -> Dict[str, int]:
+        """Gera as ocorrências vencidas até `until` (padrão: hoje) numa única transação.
+
+        As datas são calculadas em memória e gravadas em um INSERT ... SELECT
+        por tipo (`insert_many`); o razão mensal recebe um upsert por
+        (tipo, mês, categoria). Retorna quantos lançamentos foram gerados por tipo.
+        """
+        until = until or date_cls.today().isoformat()
+        counts = {kind: 0 for kind in RECURRENCE_KINDS}
+        conn = self._connect()
+        # Numa transação já aberta pelo chamador, commit e rollback ficam com ele
+        owns_transaction = not conn.in_transaction
+        if owns_transaction:
+            conn.execute("BEGIN")
+        try:
+            rules = conn.execute(
+                "SELECT id, kind, frequency, start_date, end_date, next_date, category_id, investment_id, "
+                "description, amount FROM recurrences "
+                "WHERE next_date <= ? AND (end_date IS NULL OR next_date <= end_date)",
+                (until,),
+            ).fetchall()
+            if not rules:
+                if owns_transaction:
+                    conn.rollback()
+                return counts
+            rows: Dict[str, list] = {kind: [] for kind in RECURRENCE_KINDS}
+            ledger: Dict[tuple, int] = {}
+            advanced = []
+            for rule_id, kind, frequency, start, end, current, category_id, investment_id, description, amount in rules:
+                last = min(until, end) if end else until
+                anchor_day = int(start[8:10])
+                dates = list(occurrences(current, frequency, anchor_day, last))
+                if kind == "contribution":
+                    rows[kind].extend((investment_id, d, description, amount) for d in dates)
+                else:
+                    rows[kind].extend((d, category_id, description, amount) for d in dates)
+                    for d in dates:
+                        key = (kind, d[:7], category_id)
+                        ledger[key] = ledger.get(key, 0) + amount
+                advanced.append((next_occurrence(dates[-1], frequency, anchor_day), rule_id))
+            for kind, batch in rows.items():
+                if batch:
+                    table, columns = _TARGETS[kind]
+                    insert_many(conn, table, columns, batch)
+                    counts[kind] = len(batch)
+            for (kind, month, category_id), total in ledger.items():
+                LedgerService.apply(conn, kind, month, total, category_id)
+            CapitalSeriesService.apply(conn, ((inv_id, d, amount) for inv_id, d, _desc, amount in rows["contribution"]))
+            conn.executemany("UPDATE recurrences SET next_date = ? WHERE id = ?", advanced)
+            if owns_transaction:
+                conn.commit()
+        except BaseException:
+            if owns_transaction:
+                conn.rollback()
+            raise
+        tables = [_TARGETS[kind][0] for kind, n in counts.items() if n]
+        if counts["contribution"]:
+            tables.append("capital_series")
+        if tables:
+            bump_table_version(*tables)
+        return counts
@@ -0,0 +1,80 @@
+from typing import Dict, List, Tuple
+
+from app.config import DB_FILE
+from app.services.db import get_connection
+from app.services.ledger_service import LedgerService
+from app.services.migrations import ensure_schema
+
+UNCATEGORIZED = "(Sem categoria)"
+
+REPORT_TABLES = {"expense": "expenses", "revenue": "revenues"}
+
+
+class ReportService:
+    """Agregações por categoria lidas dos totais mensais mantidos pelo LedgerService."""
+
+    def __init__(self):
+        self.db_path = DB_FILE
+        ensure_schema(self.db_path)
+        # Os relatórios dependem do razão: reconstrói se este serviço abrir o banco primeiro (CLI)
+        with self._connect() as conn:
+            for kind in REPORT_TABLES:
+                LedgerService.sync(conn, kind)
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def annual_by_category(self, kind: str, year: int) -> Dict[str, List[int]]:
+        """Retorna {categoria: [total jan, ..., total dez]} (centavos) do ano informado."""
+        assert kind in REPORT_TABLES
+        first, last = f"{year:04d}-01", f"{year:04d}-12"
+        with self._connect() as conn:
+            # No máximo 12 linhas por categoria (category_totals), sem ler os lançamentos
+            cur = conn.execute(
+                """
+                SELECT c.name, CAST(substr(t.month, 6, 2) AS INTEGER), t.total
+                FROM category_totals t JOIN categories c ON c.id = t.category_id
+                WHERE c.type = ? AND t.month >= ? AND t.month <= ? AND t.total <> 0
+                """,
+                (kind, first, last),
+            )
+            sums: Dict[str, List[int]] = {}
+            categorized = [0] * 12
+            for cat, m, total in cur.fetchall():
+                if not 1 <= (m or 0) <= 12:
+                    continue
+                sums.setdefault(cat, [0] * 12)[m - 1] += int(total)
+                categorized[m - 1] += int(total)
+            # Lançamentos sem categoria: diferença entre o razão do tipo e a soma das categorias
+            cur = conn.execute(
+                "SELECT CAST(substr(month, 6, 2) AS INTEGER), total FROM monthly_totals "
+                "WHERE kind = ? AND month >= ? AND month <= ?",
+                (kind, first, last),
+            )
+            for m, total in cur.fetchall():
+                if 1 <= (m or 0) <= 12 and int(total) != categorized[m - 1]:
+                    sums.setdefault(UNCATEGORIZED, [0] * 12)[m - 1] += int(total) - categorized[m - 1]
+            return sums
+
+    @staticmethod
+    def monthly_rows(annual: Dict[str, List[int]], month: int) -> List[Tuple[str, int, float]]:
+        """Extrai do agregado anual as linhas (categoria, total, percentual) de um mês."""
+        sums = {cat: arr[month - 1] for cat, arr in annual.items() if arr[month - 1]}
+        month_total = sum(sums.values())
+        return [
+            (cat, sums[cat], (sums[cat] / month_total * 100.0) if month_total > 0 else 0.0)
+            for cat in sorted(sums.keys())
+        ]
+
+    @staticmethod
+    def annual_rows(annual: Dict[str, List[int]]) -> List[Tuple[str, List[int]]]:
+        return [(cat, annual[cat]) for cat in sorted(annual.keys())]
+
+    def build_reports(self, year: int, month: int) -> Dict[str, list]:
+        """Calcula os quatro relatórios (mensal e anual, despesas e receitas) a partir dos totais mensais."""
+        reports = {}
+        for kind in REPORT_TABLES:
+            annual = self.annual_by_category(kind, year)
+            reports[f"{kind}_monthly"] = self.monthly_rows(annual, month)
+            reports[f"{kind}_annual"] = self.annual_rows(annual)
+        return reports
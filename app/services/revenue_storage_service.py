@@ -1,114 +1,179 @@
 import json
 import os
-import sqlite3
 from typing import List, Dict
 
 from app.config import REVENUES_FILE, DB_FILE
+from app.services.db import get_connection, chunked, bump_table_version
+from app.services.migrations import ensure_schema
+from app.services.category_service import category_id_for
+from app.services.ledger_service import LedgerService
+from app.services.search_service import SEARCH_LIMIT, search_transactions
+from app.utils.dates import month_range
+from app.utils.money import to_cents
 from app.models.revenue import Revenue
 
 
+# Lançamentos com o nome da categoria (a tabela guarda apenas category_id)
+_SELECT = (
+    "SELECT t.id, t.date, COALESCE(c.name, ''), t.description, t.amount "
+    "FROM revenues t LEFT JOIN categories c ON c.id = t.category_id"
+)
+
+
 class RevenueStorageService:
     def __init__(self, filepath: str = REVENUES_FILE):
         # filepath mantido para migração
         self.filepath = filepath
         self.db_path = DB_FILE
+        self.ledger = LedgerService()
         self._ensure_db()
         self._migrate_from_json_if_needed()
+        with self._connect() as conn:
+            LedgerService.sync(conn, 'revenue')
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection(self.db_path)
 
     def _ensure_db(self) -> None:
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS revenues (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    date TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    description TEXT,
-                    amount REAL NOT NULL
-                )
-                """
-            )
+        ensure_schema(self.db_path)
 
     def _migrate_from_json_if_needed(self) -> None:
         try:
+            # Checa o arquivo antes: sem JSON legado não há consulta alguma
+            if not os.path.exists(self.filepath):
+                return
             with self._connect() as conn:
-                cur = conn.execute("SELECT COUNT(*) FROM revenues")
-                count = cur.fetchone()[0]
-                if count == 0 and os.path.exists(self.filepath):
+                has_rows = conn.execute("SELECT EXISTS(SELECT 1 FROM revenues)").fetchone()[0]
+                if not has_rows:
                     with open(self.filepath, "r", encoding="utf-8") as f:
                         data = json.load(f) or []
                     if data:
+                        # Categorias do JSON entram no cadastro (um id por nome)
+                        category_ids = {}
+                        for item in data:
+                            name = (item.get("category") or "").strip()
+                            if name not in category_ids:
+                                category_ids[name], _ = category_id_for(conn, name, 'revenue')
                         conn.executemany(
-                            "INSERT INTO revenues (date, category, description, amount) VALUES (?, ?, ?, ?)",
+                            "INSERT INTO revenues (date, category_id, description, amount) VALUES (?, ?, ?, ?)",
                             [
                                 (
                                     item.get("date", ""),
-                                    item.get("category", ""),
+                                    category_ids[(item.get("category") or "").strip()],
                                     item.get("description", ""),
-                                    float(item.get("amount", 0.0)),
+                                    to_cents(item.get("amount", 0)),
                                 )
                                 for item in data
                             ],
                         )
                         conn.commit()
+                        bump_table_version("revenues", "categories")
         except Exception:
             pass
 
     def load_revenues(self) -> List[Dict]:
         with self._connect() as conn:
             cur = conn.execute(
-                "SELECT date, category, description, amount FROM revenues ORDER BY id ASC"
+                f"{_SELECT} ORDER BY t.id ASC"
+            )
+            return [self._row_to_dict(r) for r in cur.fetchall()]
+
+    def load_revenues_page(self, year: int, month: int, after: tuple[str, int] | None = None, limit: int = 500) -> List[Dict]:
+        """Página de lançamentos do mês ordenada por (data, id).
+
+        Paginação por chave (keyset): `after` é o (date, id) da última linha já
+        carregada, o que permite seguir pelo índice de data sem OFFSET.
+        """
+        start, end = month_range(year, month)
+        after_date, after_id = after if after else ("", 0)
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"{_SELECT} WHERE t.date >= ? AND t.date < ? AND (t.date, t.id) > (?, ?) "
+                "ORDER BY t.date, t.id LIMIT ?",
+                (start, end, after_date, after_id, limit),
             )
-            rows = cur.fetchall()
-            return [
-                {
-                    "date": r[0],
-                    "category": r[1],
-                    "description": r[2] or "",
-                    "amount": float(r[3] or 0.0),
-                }
-                for r in rows
-            ]
+            return [self._row_to_dict(r) for r in cur.fetchall()]
+
+    def get_revenue(self, revenue_id: int) -> Dict | None:
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"{_SELECT} WHERE t.id = ?",
+                (revenue_id,),
+            )
+            row = cur.fetchone()
+            return self._row_to_dict(row) if row else None
+
+    def search_revenues(self, text: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """Lançamentos de qualquer data cuja descrição contém as palavras de `text` (mais relevantes primeiro)."""
+        with self._connect() as conn:
+            return search_transactions(conn, text, ('revenue',), limit)
+
+    @staticmethod
+    def _row_to_dict(r) -> Dict:
+        return {
+            "id": r[0],
+            "date": r[1],
+            "category": r[2],
+            "description": r[3] or "",
+            "amount": int(r[4] or 0),
+        }
 
     def save_revenue(self, revenue: Revenue) -> None:
         with self._connect() as conn:
+            category_id, created = category_id_for(conn, revenue.category, 'revenue')
             conn.execute(
-                "INSERT INTO revenues (date, category, description, amount) VALUES (?, ?, ?, ?)",
-                (revenue.date, revenue.category, revenue.description, float(revenue.amount)),
+                "INSERT INTO revenues (date, category_id, description, amount) VALUES (?, ?, ?, ?)",
+                (revenue.date, category_id, revenue.description, int(revenue.amount)),
             )
+            LedgerService.apply(conn, 'revenue', revenue.date, int(revenue.amount), category_id)
             conn.commit()
+            bump_table_version("revenues")
+            if created:
+                bump_table_version("categories")
 
-    def get_total(self) -> float:
+    def get_total(self) -> int:
         with self._connect() as conn:
             cur = conn.execute("SELECT COALESCE(SUM(amount), 0) FROM revenues")
-            total = cur.fetchone()[0]
-            return float(total or 0.0)
+            return int(cur.fetchone()[0] or 0)
 
-    def delete_revenue(self, index: int) -> None:
+    def get_month_total(self, year: int, month: int) -> int:
+        return self.ledger.month_total('revenue', year, month)
+
+    def get_total_until_month(self, year: int, month: int) -> int:
+        """Total acumulado até o mês informado (inclusive), lido do razão mensal."""
+        return self.ledger.cumulative_total('revenue', year, month)
+
+    def delete_revenues(self, revenue_ids: List[int]) -> None:
+        ids = sorted(set(revenue_ids))
+        if not ids:
+            return
+        # Exclusão em lote por id, numa única transação
         with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT id FROM revenues ORDER BY id ASC LIMIT 1 OFFSET ?",
-                (index,),
-            )
-            row = cur.fetchone()
-            if row:
-                conn.execute("DELETE FROM revenues WHERE id = ?", (row[0],))
-                conn.commit()
+            for chunk in chunked(ids):
+                placeholders = ','.join('?' * len(chunk))
+                # Estorna no razão os valores removidos, agrupados por mês e categoria
+                cur = conn.execute(
+                    f"SELECT substr(date, 1, 7), category_id, SUM(amount) FROM revenues WHERE id IN ({placeholders}) GROUP BY 1, 2",
+                    chunk,
+                )
+                for month, category_id, amount in cur.fetchall():
+                    LedgerService.apply(conn, 'revenue', month, -int(amount or 0), category_id)
+                conn.execute(f"DELETE FROM revenues WHERE id IN ({placeholders})", chunk)
+        bump_table_version("revenues")
 
-    def update_revenue(self, index: int, revenue: Revenue) -> None:
+    def update_revenue(self, revenue_id: int, revenue: Revenue) -> None:
         with self._connect() as conn:
-            cur = conn.execute(
-                "SELECT id FROM revenues ORDER BY id ASC LIMIT 1 OFFSET ?",
-                (index,),
+            row = conn.execute("SELECT date, amount, category_id FROM revenues WHERE id = ?", (revenue_id,)).fetchone()
+            if row is None:
+                return
+            category_id, created = category_id_for(conn, revenue.category, 'revenue')
+            LedgerService.apply(conn, 'revenue', row[0], -int(row[1] or 0), row[2])
+            LedgerService.apply(conn, 'revenue', revenue.date, int(revenue.amount), category_id)
+            conn.execute(
+                "UPDATE revenues SET date = ?, category_id = ?, description = ?, amount = ? WHERE id = ?",
+                (revenue.date, category_id, revenue.description, int(revenue.amount), revenue_id),
             )
-            row = cur.fetchone()
-            if row:
-                conn.execute(
-                    "UPDATE revenues SET date = ?, category = ?, description = ?, amount = ? WHERE id = ?",
-                    (revenue.date, revenue.category, revenue.description, float(revenue.amount), row[0]),
-                )
-                conn.commit()
\ No newline at end of file
+            conn.commit()
+            bump_table_version("revenues")
+            if created:
+                bump_table_version("categories")
@@ -0,0 +1,91 @@
+import re
+from typing import Dict, List, Optional, Sequence
+
+from app.config import DB_FILE
+from app.services.db import get_connection, chunked
+from app.services.migrations import SEARCH_KINDS, ensure_schema
+
+# Resultados por busca (os mais relevantes, pelo bm25 do FTS5)
+SEARCH_LIMIT = 200
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# tipo -> SELECT (id, date, description, amount, rótulo) dos ids encontrados
+_DETAIL_QUERIES = {
+    "expense": (
+        "SELECT t.id, t.date, t.description, t.amount, COALESCE(c.name, '') "
+        "FROM expenses t LEFT JOIN categories c ON c.id = t.category_id WHERE t.id IN ({})"
+    ),
+    "revenue": (
+        "SELECT t.id, t.date, t.description, t.amount, COALESCE(c.name, '') "
+        "FROM revenues t LEFT JOIN categories c ON c.id = t.category_id WHERE t.id IN ({})"
+    ),
+    "contribution": (
+        "SELECT c.id, c.date, c.description, c.amount, i.name "
+        "FROM contributions c JOIN investments i ON i.id = c.investment_id WHERE c.id IN ({})"
+    ),
+}
+
+
+def match_expression(text: str) -> str:
+    """Texto digitado -> consulta FTS5: cada palavra é obrigatória, como palavra ou prefixo.
+
+    `("merc" OR "merc"*)`: a palavra exata soma duas vezes no bm25 e fica à
+    frente dos prefixos. As palavras vão entre aspas, então operadores e
+    aspas digitados não quebram a consulta.
+    """
+    return " AND ".join(f'("{token}" OR "{token}"*)' for token in _TOKEN_RE.findall(text or ""))
+
+
+def search_transactions(conn, text: str, kinds: Optional[Sequence[str]] = None, limit: int = SEARCH_LIMIT) -> List[Dict]:
+    """Lançamentos cuja descrição contém as palavras de `text`, do mais ao menos relevante.
+
+    Cada item traz "kind", "id", "date", "description", "amount" (centavos) e
+    "label" (categoria ou, nos aportes, o nome do investimento). O ranking é
+    feito dentro do FTS5 (ORDER BY rank) sobre todas as ocorrências, de todos
+    os anos; só os `limit` primeiros ids são lidos das tabelas.
+    """
+    query = match_expression(text)
+    if not query:
+        return []
+    kinds = list(kinds or SEARCH_KINDS)
+    codes = {SEARCH_KINDS[k]: k for k in kinds}
+    sql = "SELECT rowid FROM search_fts WHERE search_fts MATCH ?"
+    if len(codes) < len(SEARCH_KINDS):
+        sql += f" AND (rowid & 3) IN ({','.join(map(str, codes))})"
+    # rank = bm25: menor = mais relevante
+    ranked = conn.execute(sql + " ORDER BY rank LIMIT ?", (query, limit)).fetchall()
+
+    order, ids_by_kind = [], {}
+    for (rowid,) in ranked:
+        key = (codes[rowid & 3], rowid >> 2)
+        order.append(key)
+        ids_by_kind.setdefault(key[0], []).append(key[1])
+    found = {}
+    for kind, ids in ids_by_kind.items():
+        for chunk in chunked(ids):
+            cur = conn.execute(_DETAIL_QUERIES[kind].format(",".join("?" * len(chunk))), chunk)
+            for r in cur.fetchall():
+                found[(kind, r[0])] = {
+                    "kind": kind,
+                    "id": r[0],
+                    "date": r[1],
+                    "description": r[2] or "",
+                    "amount": int(r[3] or 0),
+                    "label": r[4] or "",
+                }
+    return [found[key] for key in order if key in found]
+
+
+class SearchService:
+    """Busca textual nas descrições de despesas, receitas e aportes (índice FTS5)."""
+
+    def __init__(self):
+        self.db_path = DB_FILE
+        ensure_schema(self.db_path)
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def search(self, text: str, kinds: Optional[Sequence[str]] = None, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        return search_transactions(self._connect(), text, kinds, limit)
@@ -0,0 +1,89 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _WorkerSignals(QObject):
+    # chave da requisição, geração, resultado/mensagem de erro
+    finished = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, int, str)
+
+
+class _QueryRunnable(QRunnable):
+    def __init__(self, worker: "DataWorker", key: str, generation: int, fn: Callable[[], Any]):
+        super().__init__()
+        self._worker = worker
+        self._key = key
+        self._generation = generation
+        self._fn = fn
+
+    def run(self):
+        # Requisição já substituída por outra mais nova: nem executa a consulta
+        if not self._worker.is_current(self._key, self._generation):
+            return
+        try:
+            result = self._fn()
+        except Exception as exc:
+            self._worker.signals.failed.emit(self._key, self._generation, str(exc))
+        else:
+            self._worker.signals.finished.emit(self._key, self._generation, result)
+
+
+class DataWorker(QObject):
+    """Executa leituras do banco fora da thread da UI.
+
+    Cada requisição tem uma chave (ex.: "tables", "reports"); uma nova
+    requisição com a mesma chave cancela a anterior, cujo resultado é
+    descartado. Os callbacks são chamados na thread da UI via sinais.
+    Cada thread do pool usa sua própria conexão SQLite (ver app.services.db).
+    """
+
+    def __init__(self, parent=None, max_threads: int = 2):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # Mantém as threads vivas para reaproveitar as conexões abertas nelas
+        self.pool.setExpiryTimeout(-1)
+        self.signals = _WorkerSignals()
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+        self._generations: Dict[str, int] = {}
+        self._callbacks: Dict[str, Tuple[int, Callable[[Any], None], Optional[Callable[[str], None]]]] = {}
+        self.discarded_count = 0
+
+    def submit(self, key: str, fn: Callable[[], Any], on_result: Callable[[Any], None],
+               on_error: Optional[Callable[[str], None]] = None) -> int:
+        """Agenda `fn` no pool; `on_result(resultado)` roda na thread da UI se ainda for a requisição atual."""
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        self._callbacks[key] = (generation, on_result, on_error)
+        self.pool.start(_QueryRunnable(self, key, generation, fn))
+        return generation
+
+    def cancel(self, key: str) -> None:
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._callbacks.pop(key, None)
+
+    def is_current(self, key: str, generation: int) -> bool:
+        return self._generations.get(key) == generation
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        return self.pool.waitForDone(msecs)
+
+    def _take_callback(self, key: str, generation: int):
+        entry = self._callbacks.get(key)
+        if entry is None or entry[0] != generation or not self.is_current(key, generation):
+            self.discarded_count += 1
+            return None
+        del self._callbacks[key]
+        return entry
+
+    def _on_finished(self, key: str, generation: int, result: Any) -> None:
+        entry = self._take_callback(key, generation)
+        if entry is not None:
+            entry[1](result)
+
+    def _on_failed(self, key: str, generation: int, message: str) -> None:
+        entry = self._take_callback(key, generation)
+        if entry is not None and entry[2] is not None:
+            entry[2](message)
@@ -1,23 +1,78 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout,
-    QDateEdit, QTableWidget, QTableWidgetItem,
-    QLabel, QHBoxLayout, QTabWidget, QHeaderView, QFrame
+    QDateEdit, QLabel, QHBoxLayout, QTabWidget, QFrame,
+    QPushButton, QFileDialog, QProgressDialog, QMessageBox, QApplication, QInputDialog,
+    QLineEdit, QDialog
 )
 import os
-from PyQt5.QtCore import QDate, Qt, QSize, QLocale
+from PyQt5.QtCore import QDate, Qt, QSize, QLocale, QTimer
 from PyQt5.QtGui import QIcon
-from datetime import datetime, timedelta
 
 from app.controllers.expense_controller import ExpenseController
 from app.controllers.revenue_controller import RevenueController
 from app.controllers.investment_controller import InvestmentController
-from app.utils.formatting import format_currency_brl, format_date_brl
-from app.config import ICONS_DIR
+from app.utils.formatting import format_cents_brl, format_date_brl
+from app.config import ICONS_DIR, STARTUP_REPORT
 from app.services.category_service import CategoryService
 from app.services.broker_service import BrokerService
+from app.services.report_service import ReportService
+from app.services.import_service import ImportService, ImportCancelled
+from app.services.export_service import ExportService
+from app.services.search_service import SearchService
+from app.services.recurrence_service import RecurrenceService
+from app.services.budget_service import BudgetService
+from app.services.import_service import parse_amount
+from app.utils.dates import MONTH_NAMES, month_range
 from app.ui.tabs.investments_tab import InvestmentsTab
 from app.ui.tabs.expenses_tab import ExpensesTab
 from app.ui.tabs.revenues_tab import RevenuesTab
+from app.ui.table_model import RecordTableModel, TableColumn, currency_column, format_percent, create_table_view, ALIGN_RIGHT, PAGE_SIZE
+from app.ui.data_worker import DataWorker
+from app.ui.refresh_scheduler import RefreshScheduler
+from app.utils.timing import startup
+
+REPORT_COLUMNS = (
+    TableColumn("Categoria", "category"),
+    currency_column("Total (R$)", "total"),
+    TableColumn("Percentual", "percent", format_percent, ALIGN_RIGHT),
+)
+
+ANNUAL_COLUMNS = (TableColumn("Categoria", "category"),) + tuple(
+    currency_column(name, lambda row, m=m: row["months"][m]) for m, name in enumerate(MONTH_NAMES)
+)
+
+BUDGET_COLUMNS = (
+    TableColumn("Categoria", "category"),
+    currency_column("Orçamento (R$)", "budget"),
+    currency_column("Realizado (R$)", "spent"),
+    currency_column("Disponível (R$)", "remaining"),
+    TableColumn("Usado", "percent", format_percent, ALIGN_RIGHT),
+)
+
+SEARCH_KIND_LABELS = {"expense": "Despesa", "revenue": "Receita", "contribution": "Aporte"}
+
+SEARCH_COLUMNS = (
+    TableColumn("Tipo", lambda row: SEARCH_KIND_LABELS[row["kind"]]),
+    TableColumn("Data", "date", format_date_brl),
+    TableColumn("Descrição", "description"),
+    TableColumn("Categoria / investimento", "label"),
+    currency_column("Valor (R$)", "amount"),
+)
+
+FREQUENCY_LABELS = {"weekly": "Semanal", "monthly": "Mensal", "yearly": "Anual"}
+
+RECURRENCE_COLUMNS = (
+    TableColumn("Tipo", lambda row: SEARCH_KIND_LABELS[row["kind"]]),
+    TableColumn("Repetição", lambda row: FREQUENCY_LABELS[row["frequency"]]),
+    TableColumn("Próxima", "next_date", format_date_brl),
+    TableColumn("Até", lambda row: format_date_brl(row["end_date"]) if row["end_date"] else "—"),
+    TableColumn("Descrição", "description"),
+    TableColumn("Categoria / investimento", "label"),
+    currency_column("Valor (R$)", "amount"),
+)
+
+# Intervalo entre verificações de recorrências vencidas com o app aberto (virada de dia/mês)
+RECURRENCE_CHECK_MS = 60 * 60 * 1000
 
 
 class MainWindow(QMainWindow):
@@ -29,22 +84,40 @@ class MainWindow(QMainWindow):
         self.investment_controller = InvestmentController()
         self.category_service = CategoryService()
         self.broker_service = BrokerService()
-        self.expense_edit_index = None
-        self.revenue_edit_index = None
-        self.investment_edit_index = None
-        self.current_investment_index = None
+        self.report_service = ReportService()
+        self.import_service = ImportService()
+        self.export_service = ExportService()
+        self.search_service = SearchService()
+        self.recurrence_service = RecurrenceService()
+        self.budget_service = BudgetService()
+        self.data_worker = DataWorker(self)
+        self.refresh_scheduler = RefreshScheduler(self)
+        startup.mark("serviços")
+        self.expense_edit_id = None
+        self.revenue_edit_id = None
+        self.investment_edit_id = None
+        self.current_investment_id = None
         self._setup_ui()
         # Locale pt-BR para calendários e datas
         self._apply_locale()
         self.setMinimumSize(1024, 700)
         self.resize(1280, 800)
         self._apply_theme()
-        # Garantir que os combos de categoria sejam preenchidos na inicialização
-        self._load_categories()
-        self._refresh_tables()
-        # Inicializa relatórios na carga
-        if hasattr(self, '_refresh_reports'):
-            self._refresh_reports()
+        startup.mark("interface")
+        # Combos de categoria são preenchidos logo após a janela aparecer
+        QTimer.singleShot(0, self._load_categories)
+        # Atualizações passam pelo agendador: agrupadas por frame e só para views visíveis
+        self.refresh_scheduler.register("tables", self._refresh_tables)
+        self.refresh_scheduler.register("reports", self._refresh_reports, lambda: self.tabs.currentWidget() is self.reports_tab)
+        self.tabs.currentChanged.connect(self.refresh_scheduler.flush)
+        self.refresh_scheduler.request("tables", "reports")
+        # Lançamentos recorrentes vencidos entram logo após a abertura e, com o app aberto, a cada hora
+        QTimer.singleShot(0, self._materialize_recurrences)
+        self.recurrence_error = None
+        self.recurrence_timer = QTimer(self)
+        self.recurrence_timer.setInterval(RECURRENCE_CHECK_MS)
+        self.recurrence_timer.timeout.connect(self._materialize_recurrences)
+        self.recurrence_timer.start()
 
     def _setup_ui(self):
         central = QWidget(self)
@@ -62,6 +135,15 @@ class MainWindow(QMainWindow):
         self.month_filter.dateChanged.connect(self._on_month_changed)
         filter_layout.addWidget(filter_label)
         filter_layout.addWidget(self.month_filter)
+        filter_layout.addStretch()
+        self.search_edit = QLineEdit(); self.search_edit.setPlaceholderText("Buscar na descrição..."); self.search_edit.setClearButtonEnabled(True); self.search_edit.setMinimumWidth(240); self.search_edit.returnPressed.connect(self._on_search)
+        filter_layout.addWidget(self.search_edit)
+        self.recurrences_btn = QPushButton("Recorrências"); self.recurrences_btn.setProperty("variant", "secondary"); self.recurrences_btn.clicked.connect(self._on_manage_recurrences)
+        filter_layout.addWidget(self.recurrences_btn)
+        self.import_btn = QPushButton("Importar extrato"); self.import_btn.setProperty("variant", "secondary"); self.import_btn.clicked.connect(self._on_import_statement)
+        filter_layout.addWidget(self.import_btn)
+        self.export_btn = QPushButton("Exportar"); self.export_btn.setProperty("variant", "secondary"); self.export_btn.clicked.connect(self._on_export)
+        filter_layout.addWidget(self.export_btn)
         layout.addLayout(filter_layout)
 
         # Abas
@@ -78,28 +160,28 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.tabs)
 
         # Aba Despesas (extraída para classe dedicada)
-        self.expenses_tab = ExpensesTab(self.expense_controller, self.category_service, self._refresh_tables, getattr(self, '_refresh_reports', None))
+        self.expenses_tab = ExpensesTab(self.expense_controller, self.category_service, self._request_tables_refresh, self._request_reports_refresh, self.recurrence_service)
         self.tabs.addTab(self.expenses_tab, "Despesas")
         self.tabs.setTabIcon(self.tabs.indexOf(self.expenses_tab), QIcon(os.path.join(ICONS_DIR, "expense.svg")))
 
         # Aba Receitas (extraída para classe dedicada)
-        self.revenues_tab = RevenuesTab(self.revenue_controller, self.category_service, self._refresh_tables, getattr(self, '_refresh_reports', None))
+        self.revenues_tab = RevenuesTab(self.revenue_controller, self.category_service, self._request_tables_refresh, self._request_reports_refresh, self.recurrence_service)
         self.tabs.addTab(self.revenues_tab, "Receitas")
         self.tabs.setTabIcon(self.tabs.indexOf(self.revenues_tab), QIcon(os.path.join(ICONS_DIR, "revenue.svg")))
 
         # Aba Investimentos (extraída para classe dedicada)
-        self.investments_tab = InvestmentsTab(self.investment_controller, self.broker_service)
+        self.investments_tab = InvestmentsTab(self.investment_controller, self.broker_service, self.data_worker, self.recurrence_service)
         self.tabs.addTab(self.investments_tab, "Investimentos")
         # Ícone será adicionado ao assets; se não existir, usa report.svg como fallback
         inv_icon_path = os.path.join(ICONS_DIR, "investment.svg")
         self.tabs.setTabIcon(self.tabs.indexOf(self.investments_tab), QIcon(inv_icon_path if os.path.exists(inv_icon_path) else os.path.join(ICONS_DIR, "report.svg")))
 
         # Aba Relatórios
-        reports_tab = QWidget()
-        reports_layout = QVBoxLayout(); reports_tab.setLayout(reports_layout)
+        self.reports_tab = QWidget()
+        reports_layout = QVBoxLayout(); self.reports_tab.setLayout(reports_layout)
         self._build_reports_section(reports_layout)
-        self.tabs.addTab(reports_tab, "Relatórios")
-        self.tabs.setTabIcon(self.tabs.indexOf(reports_tab), QIcon(os.path.join(ICONS_DIR, "report.svg")))
+        self.tabs.addTab(self.reports_tab, "Relatórios")
+        self.tabs.setTabIcon(self.tabs.indexOf(self.reports_tab), QIcon(os.path.join(ICONS_DIR, "report.svg")))
 
         # Totais gerais (cards)
         self.summary_container = QFrame()
@@ -153,21 +235,15 @@ class MainWindow(QMainWindow):
         # Relatório de despesas por categoria
         exp_label = QLabel("Despesas por categoria")
         monthly_layout.addWidget(exp_label)
-        self.expense_report_table = QTableWidget(0, 3)
-        self.expense_report_table.setHorizontalHeaderLabels(["Categoria", "Total (R$)", "Percentual"])
-        self.expense_report_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.expense_report_table.setAlternatingRowColors(True)
-        self.expense_report_table.setShowGrid(False)
+        self.expense_report_model = RecordTableModel(REPORT_COLUMNS, self)
+        self.expense_report_table = create_table_view(self.expense_report_model, selectable=False)
         monthly_layout.addWidget(self.expense_report_table)
 
         # Relatório de receitas por categoria
         rev_label = QLabel("Receitas por categoria")
         monthly_layout.addWidget(rev_label)
-        self.revenue_report_table = QTableWidget(0, 3)
-        self.revenue_report_table.setHorizontalHeaderLabels(["Categoria", "Total (R$)", "Percentual"])
-        self.revenue_report_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.revenue_report_table.setAlternatingRowColors(True)
-        self.revenue_report_table.setShowGrid(False)
+        self.revenue_report_model = RecordTableModel(REPORT_COLUMNS, self)
+        self.revenue_report_table = create_table_view(self.revenue_report_model, selectable=False)
         monthly_layout.addWidget(self.revenue_report_table)
 
         # Adiciona aba Mensal com ícone
@@ -182,32 +258,33 @@ class MainWindow(QMainWindow):
         # Despesas por mês no ano
         exp_year_label = QLabel("Despesas por mês (ano)")
         annual_layout.addWidget(exp_year_label)
-        self.expense_annual_table = QTableWidget(0, 13)
-        self.expense_annual_table.setHorizontalHeaderLabels([
-            "Categoria", "Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
-            "Jul", "Ago", "Set", "Out", "Nov", "Dez"
-        ])
-        self.expense_annual_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.expense_annual_table.setAlternatingRowColors(True)
-        self.expense_annual_table.setShowGrid(False)
+        self.expense_annual_model = RecordTableModel(ANNUAL_COLUMNS, self)
+        self.expense_annual_table = create_table_view(self.expense_annual_model, selectable=False)
         annual_layout.addWidget(self.expense_annual_table)
 
         # Receitas por mês no ano
         rev_year_label = QLabel("Receitas por mês (ano)")
         annual_layout.addWidget(rev_year_label)
-        self.revenue_annual_table = QTableWidget(0, 13)
-        self.revenue_annual_table.setHorizontalHeaderLabels([
-            "Categoria", "Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
-            "Jul", "Ago", "Set", "Out", "Nov", "Dez"
-        ])
-        self.revenue_annual_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.revenue_annual_table.setAlternatingRowColors(True)
-        self.revenue_annual_table.setShowGrid(False)
+        self.revenue_annual_model = RecordTableModel(ANNUAL_COLUMNS, self)
+        self.revenue_annual_table = create_table_view(self.revenue_annual_model, selectable=False)
         annual_layout.addWidget(self.revenue_annual_table)
 
         # Adiciona aba Anual com ícone e insere as sub-abas no layout principal
         reports_tabs.addTab(annual_tab, "Anual")
         reports_tabs.setTabIcon(reports_tabs.indexOf(annual_tab), QIcon(os.path.join(ICONS_DIR, "annual.svg")))
+
+        # Orçamento x realizado do mês do filtro
+        budget_tab = QWidget(); budget_layout = QVBoxLayout(); budget_tab.setLayout(budget_layout)
+        budget_layout.addWidget(QLabel("Orçamento x realizado (usa mês do filtro; o limite vale do mês definido em diante)"))
+        self.budget_model = RecordTableModel(BUDGET_COLUMNS, self)
+        self.budget_table = create_table_view(self.budget_model, selectable=False)
+        budget_layout.addWidget(self.budget_table)
+        budget_btns = QHBoxLayout()
+        self.budget_set_btn = QPushButton("Definir orçamento"); self.budget_set_btn.setProperty("variant", "secondary"); self.budget_set_btn.clicked.connect(self._on_set_budget)
+        budget_btns.addStretch(); budget_btns.addWidget(self.budget_set_btn)
+        budget_layout.addLayout(budget_btns)
+        reports_tabs.addTab(budget_tab, "Orçamento")
+        reports_tabs.setTabIcon(reports_tabs.indexOf(budget_tab), QIcon(os.path.join(ICONS_DIR, "monthly.svg")))
         parent_layout.addWidget(reports_tabs)
 
     
@@ -227,108 +304,54 @@ class MainWindow(QMainWindow):
 
     
     def _refresh_tables(self):
-        # Mês selecionado
+        # Mês selecionado; as consultas rodam no DataWorker e o resultado volta para a UI
         sel_qdate = self.month_filter.date()
         sel_year = sel_qdate.year()
         sel_month = sel_qdate.month()
-        month_str = sel_qdate.toString("MM/yyyy")
-        # Último dia do mês selecionado
-        next_month = 1 if sel_month == 12 else sel_month + 1
-        next_year = sel_year + 1 if sel_month == 12 else sel_year
-        end_of_month = datetime(next_year, next_month, 1) - timedelta(days=1)
-
-        # Despesas
-        expenses = self.expense_controller.list_expenses()
-        # Filtrar por mês selecionado e mapear linha→índice real
-        expense_row_to_index = []
-        expenses_month = []
-        for idx, item in enumerate(expenses):
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt.year == sel_year and dt.month == sel_month:
-                    expenses_month.append(item)
-                    expense_row_to_index.append(idx)
-            except Exception:
-                continue
-        if hasattr(self, 'expenses_tab'):
-            self.expenses_tab.expense_row_to_index = expense_row_to_index
-            table = self.expenses_tab.expense_table
-            total_label = self.expenses_tab.expense_total_label
-        else:
-            self.expense_row_to_index = expense_row_to_index
-            table = self.expense_table
-            total_label = self.expense_total_label
-        table.setRowCount(0)
-        for item in expenses_month:
-            row = table.rowCount()
-            table.insertRow(row)
-            table.setItem(row, 0, QTableWidgetItem(format_date_brl(item.get("date", ""))))
-            table.setItem(row, 1, QTableWidgetItem(item.get("category", "")))
-            table.setItem(row, 2, QTableWidgetItem(item.get("description", "")))
-            amount_item = QTableWidgetItem(format_currency_brl(item.get("amount", 0.0)))
-            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            table.setItem(row, 3, amount_item)
-
-        expense_month_total = sum(float(i.get("amount", 0.0)) for i in expenses_month)
-        total_label.setText(f"Total do mês: {format_currency_brl(expense_month_total)}")
-
-        # Receitas
-        revenues = self.revenue_controller.list_revenues()
-        # Filtrar por mês selecionado e mapear linha→índice real
-        self.revenue_row_to_index = []
-        revenues_month = []
-        for idx, item in enumerate(revenues):
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt.year == sel_year and dt.month == sel_month:
-                    revenues_month.append(item)
-                    self.revenue_row_to_index.append(idx)
-            except Exception:
-                continue
-        if hasattr(self, 'revenues_tab'):
-            self.revenues_tab.revenue_row_to_index = self.revenue_row_to_index
-            rtable = self.revenues_tab.revenue_table
-            rtotal_label = self.revenues_tab.revenue_total_label
-        else:
-            rtable = self.revenue_table
-            rtotal_label = self.revenue_total_label
-        rtable.setRowCount(0)
-        for item in revenues_month:
-            row = rtable.rowCount()
-            rtable.insertRow(row)
-            rtable.setItem(row, 0, QTableWidgetItem(format_date_brl(item.get("date", ""))))
-            rtable.setItem(row, 1, QTableWidgetItem(item.get("category", "")))
-            rtable.setItem(row, 2, QTableWidgetItem(item.get("description", "")))
-            amount_item = QTableWidgetItem(format_currency_brl(item.get("amount", 0.0)))
-            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            rtable.setItem(row, 3, amount_item)
-
-        revenue_month_total = sum(float(i.get("amount", 0.0)) for i in revenues_month)
-        rtotal_label.setText(f"Total do mês: {format_currency_brl(revenue_month_total)}")
+        self.data_worker.submit(
+            "tables",
+            lambda: self._load_tables_data(sel_year, sel_month),
+            lambda data: self._apply_tables_data(sel_year, sel_month, data),
+        )
+
+    def _load_tables_data(self, year: int, month: int) -> dict:
+        # Executa fora da thread da UI: apenas consultas, sem tocar em widgets
+        return {
+            "expense_page": self.expense_controller.list_expenses_page(year, month, None, PAGE_SIZE),
+            "revenue_page": self.revenue_controller.list_revenues_page(year, month, None, PAGE_SIZE),
+            "expense_month_total": self.expense_controller.month_total(year, month),
+            "revenue_month_total": self.revenue_controller.month_total(year, month),
+            "expenses_cum": self.expense_controller.total_expenses_until_month(year, month),
+            "revenues_cum": self.revenue_controller.total_revenues_until_month(year, month),
+        }
+
+    def _apply_tables_data(self, sel_year: int, sel_month: int, data: dict):
+        month_str = f"{sel_month:02d}/{sel_year:04d}"
+
+        # Despesas e receitas do mês: primeira página já carregada, demais sob demanda
+        expense_month_total = data["expense_month_total"]
+        self.expenses_tab.set_expenses_source(
+            lambda after, limit: self.expense_controller.list_expenses_page(sel_year, sel_month, after, limit),
+            expense_month_total,
+            data["expense_page"],
+        )
+
+        revenue_month_total = data["revenue_month_total"]
+        self.revenues_tab.set_revenues_source(
+            lambda after, limit: self.revenue_controller.list_revenues_page(sel_year, sel_month, after, limit),
+            revenue_month_total,
+            data["revenue_page"],
+        )
 
         # Totais acumulados até o fim do mês selecionado
-        expenses_cum = 0.0
-        for item in expenses:
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt <= end_of_month:
-                    expenses_cum += float(item.get("amount", 0.0))
-            except Exception:
-                continue
-        revenues_cum = 0.0
-        for item in revenues:
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt <= end_of_month:
-                    revenues_cum += float(item.get("amount", 0.0))
-            except Exception:
-                continue
+        expenses_cum = data["expenses_cum"]
+        revenues_cum = data["revenues_cum"]
 
         # Atualizar cartões: receitas/despesas do mês; saldo acumulado
-        self.revenue_card_value_label.setText(format_currency_brl(revenue_month_total))
-        self.expense_card_value_label.setText(format_currency_brl(expense_month_total))
+        self.revenue_card_value_label.setText(format_cents_brl(revenue_month_total))
+        self.expense_card_value_label.setText(format_cents_brl(expense_month_total))
         balance = revenues_cum - expenses_cum
-        self.balance_value_label.setText(format_currency_brl(balance))
+        self.balance_value_label.setText(format_cents_brl(balance))
         # Subtextos dos cards
         if hasattr(self, 'revenue_sub_label'):
             self.revenue_sub_label.setText(f"Mensal ({month_str})")
@@ -340,119 +363,203 @@ class MainWindow(QMainWindow):
             self.balance_value_label.setStyleSheet("color:#15803d;")
         else:
             self.balance_value_label.setStyleSheet("color:#b91c1c;")
+        # Primeira carga concluída: fecha a medição de inicialização
+        startup.finish("primeiros dados", STARTUP_REPORT)
 
     def _refresh_reports(self):
         # Mês selecionado
         sel_qdate = self.month_filter.date()
         sel_year = sel_qdate.year()
         sel_month = sel_qdate.month()
+        self.data_worker.submit(
+            "reports",
+            lambda: dict(self.report_service.build_reports(sel_year, sel_month), budget=self.budget_service.budget_vs_actual(sel_year, sel_month)),
+            self._apply_reports,
+        )
 
-        # Agregação de despesas por categoria
-        exp_sums = {}
-        for item in self.expense_controller.list_expenses():
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt.year == sel_year and dt.month == sel_month:
-                    cat = (item.get("category", "") or "").strip() or "(Sem categoria)"
-                    exp_sums[cat] = exp_sums.get(cat, 0.0) + float(item.get("amount", 0.0))
-            except Exception:
-                continue
-        # Preencher tabela de despesas
-        self.expense_report_table.setRowCount(0)
-        exp_total_month = sum(exp_sums.values()) if exp_sums else 0.0
-        for cat in sorted(exp_sums.keys()):
-            row = self.expense_report_table.rowCount()
-            self.expense_report_table.insertRow(row)
-            self.expense_report_table.setItem(row, 0, QTableWidgetItem(cat))
-            amt_item = QTableWidgetItem(format_currency_brl(exp_sums[cat]))
-            amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.expense_report_table.setItem(row, 1, amt_item)
-            # Percentual da categoria em relação ao total do mês
-            pct = (exp_sums[cat] / exp_total_month * 100.0) if exp_total_month > 0 else 0.0
-            pct_str = f"{pct:.1f}%".replace('.', ',')
-            pct_item = QTableWidgetItem(pct_str)
-            pct_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.expense_report_table.setItem(row, 2, pct_item)
-
-        # Agregação de receitas por categoria
-        rev_sums = {}
-        for item in self.revenue_controller.list_revenues():
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt.year == sel_year and dt.month == sel_month:
-                    cat = (item.get("category", "") or "").strip() or "(Sem categoria)"
-                    rev_sums[cat] = rev_sums.get(cat, 0.0) + float(item.get("amount", 0.0))
-            except Exception:
-                continue
-        # Preencher tabela de receitas
-        self.revenue_report_table.setRowCount(0)
-        rev_total_month = sum(rev_sums.values()) if rev_sums else 0.0
-        for cat in sorted(rev_sums.keys()):
-            row = self.revenue_report_table.rowCount()
-            self.revenue_report_table.insertRow(row)
-            self.revenue_report_table.setItem(row, 0, QTableWidgetItem(cat))
-            amt_item = QTableWidgetItem(format_currency_brl(rev_sums[cat]))
-            amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.revenue_report_table.setItem(row, 1, amt_item)
-            # Percentual da categoria em relação ao total do mês
-            pct = (rev_sums[cat] / rev_total_month * 100.0) if rev_total_month > 0 else 0.0
-            pct_str = f"{pct:.1f}%".replace('.', ',')
-            pct_item = QTableWidgetItem(pct_str)
-            pct_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.revenue_report_table.setItem(row, 2, pct_item)
-
-        # Relatório anual: despesas por mês e categoria
-        exp_year_sums = {}
-        for item in self.expense_controller.list_expenses():
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt.year == sel_year:
-                    cat = (item.get("category", "") or "").strip() or "(Sem categoria)"
-                    arr = exp_year_sums.get(cat)
-                    if arr is None:
-                        arr = [0.0] * 12
-                        exp_year_sums[cat] = arr
-                    arr[dt.month - 1] += float(item.get("amount", 0.0))
-            except Exception:
-                continue
-        self.expense_annual_table.setRowCount(0)
-        for cat in sorted(exp_year_sums.keys()):
-            row = self.expense_annual_table.rowCount()
-            self.expense_annual_table.insertRow(row)
-            self.expense_annual_table.setItem(row, 0, QTableWidgetItem(cat))
-            for m in range(12):
-                amt_item = QTableWidgetItem(format_currency_brl(exp_year_sums[cat][m]))
-                amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.expense_annual_table.setItem(row, 1 + m, amt_item)
-
-        # Relatório anual: receitas por mês e categoria
-        rev_year_sums = {}
-        for item in self.revenue_controller.list_revenues():
-            try:
-                dt = datetime.strptime(item.get("date", ""), "%Y-%m-%d")
-                if dt.year == sel_year:
-                    cat = (item.get("category", "") or "").strip() or "(Sem categoria)"
-                    arr = rev_year_sums.get(cat)
-                    if arr is None:
-                        arr = [0.0] * 12
-                        rev_year_sums[cat] = arr
-                    arr[dt.month - 1] += float(item.get("amount", 0.0))
-            except Exception:
-                continue
-        self.revenue_annual_table.setRowCount(0)
-        for cat in sorted(rev_year_sums.keys()):
-            row = self.revenue_annual_table.rowCount()
-            self.revenue_annual_table.insertRow(row)
-            self.revenue_annual_table.setItem(row, 0, QTableWidgetItem(cat))
-            for m in range(12):
-                amt_item = QTableWidgetItem(format_currency_brl(rev_year_sums[cat][m]))
-                amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.revenue_annual_table.setItem(row, 1 + m, amt_item)
+    def _apply_reports(self, reports: dict):
+        # Relatórios mensais por categoria (despesas e receitas)
+        self.expense_report_model.set_rows(
+            {"category": cat, "total": total, "percent": pct} for cat, total, pct in reports["expense_monthly"]
+        )
+        self.revenue_report_model.set_rows(
+            {"category": cat, "total": total, "percent": pct} for cat, total, pct in reports["revenue_monthly"]
+        )
+        # Relatórios anuais: totais por mês e categoria
+        self.expense_annual_model.set_rows({"category": cat, "months": months} for cat, months in reports["expense_annual"])
+        self.revenue_annual_model.set_rows({"category": cat, "months": months} for cat, months in reports["revenue_annual"])
+        self.budget_model.set_rows(reports["budget"])
+
+    def _on_set_budget(self):
+        cats = self.category_service.list_by_type('expense')
+        if not cats:
+            return
+        qdate = self.month_filter.date()
+        cat, ok = QInputDialog.getItem(self, "Definir orçamento", f"Categoria (a partir de {qdate.month():02d}/{qdate.year()}):", cats, 0, False)
+        if not ok:
+            return
+        text, ok = QInputDialog.getText(self, "Definir orçamento", f"Limite mensal de {cat} (R$, 0 encerra):")
+        if not ok:
+            return
+        try:
+            amount = parse_amount(text)
+        except ValueError:
+            QMessageBox.warning(self, "Definir orçamento", "Valor inválido.")
+            return
+        if self.budget_service.set_budget(cat, qdate.year(), qdate.month(), amount):
+            self.refresh_scheduler.request("reports")
+
+    def _on_import_statement(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Importar extrato", "", "Extratos (*.csv *.ofx);;CSV (*.csv);;OFX (*.ofx)")
+        if not path:
+            return
+        dialog = QProgressDialog("Importando extrato...", "Cancelar", 0, 1000, self)
+        dialog.setWindowTitle("Importar extrato"); dialog.setMinimumDuration(0); dialog.setAutoClose(False); dialog.setAutoReset(False)
+        # A transação da importação fica aberta na conexão da thread da interface até o fim:
+        # nada mais pode usá-la (e fazer commit pela metade) enquanto processEvents roda
+        dialog.setWindowModality(Qt.WindowModal)
+        self.import_btn.setEnabled(False)
+        self.recurrence_timer.stop()
+
+        def on_progress(done: int, total: int) -> bool:
+            dialog.setValue(int(done * 1000 / total) if total else 1000)
+            QApplication.processEvents()
+            return not dialog.wasCanceled()
+
+        try:
+            result = self.import_service.import_file(path, progress=on_progress)
+        except ImportCancelled:
+            return
+        except Exception as exc:
+            QMessageBox.warning(self, "Importar extrato", f"Falha na importação: {exc}")
+            return
+        finally:
+            dialog.close()
+            self.import_btn.setEnabled(True)
+            self.recurrence_timer.start()
+        self._load_categories()
+        self.refresh_scheduler.request("tables", "reports")
+        summary = f"{result.expenses} despesas e {result.revenues} receitas importadas."
+        if result.skipped:
+            summary += f"\n{result.skipped} linhas ignoradas."
+        if result.errors:
+            summary += "\n\n" + "\n".join(result.errors[:5])
+        QMessageBox.information(self, "Importar extrato", summary)
+
+    def _on_export(self):
+        # Exporta o tipo da aba atual (Relatórios exporta despesas)
+        current = self.tabs.currentWidget()
+        if current is self.revenues_tab:
+            kind, label = "revenue", "receitas"
+        elif current is self.investments_tab:
+            kind, label = "contribution", "aportes"
+        else:
+            kind, label = "expense", "despesas"
+        scopes = ["Mês selecionado", "Ano selecionado", "Tudo"]
+        scope, ok = QInputDialog.getItem(self, "Exportar", f"Período ({label}):", scopes, 0, False)
+        if not ok:
+            return
+        qdate = self.month_filter.date()
+        if scope == scopes[0]:
+            start, end = month_range(qdate.year(), qdate.month())
+        elif scope == scopes[1]:
+            start, end = f"{qdate.year():04d}-01-01", f"{qdate.year() + 1:04d}-01-01"
+        else:
+            start = end = None
+        path, selected = QFileDialog.getSaveFileName(self, "Exportar", f"{label}.csv", "CSV (*.csv);;Colunar (*.mmcol)")
+        if not path:
+            return
+        fmt = "columnar" if path.lower().endswith(".mmcol") or selected.startswith("Colunar") else "csv"
+        try:
+            count = self.export_service.export(kind, path, fmt, start, end)
+        except Exception as exc:
+            QMessageBox.warning(self, "Exportar", f"Falha na exportação: {exc}")
+            return
+        QMessageBox.information(self, "Exportar", f"{count} registros exportados.")
+
+    def _on_search(self):
+        text = self.search_edit.text().strip()
+        if not text:
+            return
+        # Busca em todos os anos, fora da thread da UI (índice FTS5)
+        self.data_worker.submit("search", lambda: self.search_service.search(text), lambda rows: self._show_search_results(text, rows))
+
+    def _show_search_results(self, text, rows):
+        if not rows:
+            QMessageBox.information(self, "Buscar", f"Nenhum lançamento encontrado para \"{text}\".")
+            return
+        dialog = QDialog(self); dialog.setWindowTitle(f"Buscar: {text}"); dialog.resize(900, 500)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(f"{len(rows)} lançamento(s), do mais relevante ao menos relevante. Clique duas vezes para abrir o mês."))
+        model = RecordTableModel(SEARCH_COLUMNS, dialog); model.set_rows(rows)
+        view = create_table_view(model)
+        view.doubleClicked.connect(lambda index: self._open_search_result(model.row_at(index.row()), dialog))
+        layout.addWidget(view)
+        self.search_dialog = dialog
+        dialog.show()
+
+    def _open_search_result(self, row, dialog):
+        if row is None:
+            return
+        qdate = QDate.fromString(row.get("date", ""), "yyyy-MM-dd")
+        if qdate.isValid():
+            self.month_filter.setDate(qdate)
+        tabs = {"expense": self.expenses_tab, "revenue": self.revenues_tab}
+        self.tabs.setCurrentWidget(tabs.get(row["kind"], self.investments_tab))
+        dialog.close()
+
+    def _materialize_recurrences(self):
+        try:
+            counts = self.recurrence_service.materialize()
+        except Exception as exc:
+            # Nova tentativa a cada hora: a mesma falha é avisada uma vez só
+            if str(exc) != self.recurrence_error:
+                self.recurrence_error = str(exc)
+                QMessageBox.warning(self, "Recorrências", f"Falha ao gerar lançamentos recorrentes: {exc}")
+            return
+        self.recurrence_error = None
+        if counts["expense"] or counts["revenue"]:
+            self._load_categories()
+            self.refresh_scheduler.request("tables", "reports")
+        if counts["contribution"]:
+            self.investments_tab.refresh()
+
+    def _on_manage_recurrences(self):
+        dialog = QDialog(self); dialog.setWindowTitle("Recorrências"); dialog.resize(900, 400)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel("Lançamentos gerados automaticamente. Encerrar mantém os já gerados e interrompe os próximos."))
+        model = RecordTableModel(RECURRENCE_COLUMNS, dialog); model.set_rows(self.recurrence_service.list_recurrences())
+        view = create_table_view(model)
+        layout.addWidget(view)
+        btns = QHBoxLayout()
+        end_btn = QPushButton("Encerrar selecionada"); end_btn.setProperty("variant", "secondary")
+        btns.addStretch(); btns.addWidget(end_btn)
+        layout.addLayout(btns)
+
+        def on_end():
+            selected = view.selectionModel().selectedRows()
+            if len(selected) != 1:
+                return
+            row = model.row_at(selected[0].row())
+            if row is None:
+                return
+            # Encerra no dia anterior à próxima ocorrência: nada mais é gerado
+            last = QDate.fromString(row["next_date"], "yyyy-MM-dd").addDays(-1).toString("yyyy-MM-dd")
+            self.recurrence_service.end_recurrence(row["id"], last)
+            model.set_rows(self.recurrence_service.list_recurrences())
+
+        end_btn.clicked.connect(on_end)
+        self.recurrences_dialog = dialog
+        dialog.show()
+
+    def _request_tables_refresh(self):
+        self.refresh_scheduler.request("tables")
+
+    def _request_reports_refresh(self):
+        self.refresh_scheduler.request("reports")
 
     def _on_month_changed(self, *_):
-        self._refresh_tables()
-        if hasattr(self, '_refresh_reports'):
-            self._refresh_reports()
+        self.refresh_scheduler.request("tables", "reports")
 
     def _apply_theme(self):
         # Tema leve com acentos modernos
@@ -466,9 +573,9 @@ class MainWindow(QMainWindow):
             QTabBar::tab:hover { background: #f1f5f9; color: #1f2937; }
             QTabBar::tab:selected { background: #1d4ed8; color: #ffffff; font-weight: 700; padding: 10px 16px; padding-left: 18px; padding-right: 18px; min-width: 130px; border: 2px solid #1d4ed8; }
             QHeaderView::section { background: #eef2ff; padding: 6px; border: none; font-weight: 600; }
-            QTableWidget { alternate-background-color: #ffffff; background: #f8fafc; }
-            QTableWidget::item:selected { background: #bfdbfe; color: #111827; }
-            QTableWidget::item:hover { background: #e0f2fe; }
+            QTableView { alternate-background-color: #ffffff; background: #f8fafc; }
+            QTableView::item:selected { background: #bfdbfe; color: #111827; }
+            QTableView::item:hover { background: #e0f2fe; }
             QPushButton { background: #60a5fa; color: white; border: none; padding: 8px 12px; border-radius: 6px; }
             QPushButton:hover { background: #3b82f6; }
             QPushButton:pressed { background: #2563eb; }
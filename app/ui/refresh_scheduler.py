@@ -0,0 +1,70 @@
+from typing import Callable, Dict, Set, Tuple
+
+from PyQt5.QtCore import QObject, QTimer
+
+
+class RefreshScheduler(QObject):
+    """Agenda atualizações de views marcando-as como "sujas".
+
+    Pedidos feitos dentro do mesmo intervalo (um frame, por padrão) são
+    agrupados num único disparo do timer; views não visíveis ficam pendentes
+    até voltarem a ser exibidas (ver `flush`).
+    """
+
+    def __init__(self, parent=None, interval_ms: int = 16):
+        super().__init__(parent)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.flush)
+        self._views: Dict[str, Tuple[Callable[[], None], Callable[[], bool]]] = {}
+        self._dirty: Set[str] = set()
+        # Contadores para diagnóstico
+        self.requested_count = 0
+        self.executed_count = 0
+        self.coalesced_count = 0  # pedidos absorvidos por outro pendente
+        self.deferred_count = 0  # disparos adiados por a view estar oculta
+
+    def register(self, view: str, refresh: Callable[[], None], is_visible: Callable[[], bool] = lambda: True) -> None:
+        self._views[view] = (refresh, is_visible)
+
+    def request(self, *views: str) -> None:
+        """Marca as views como sujas; a atualização acontece no próximo disparo do timer."""
+        for view in views:
+            if view not in self._views:
+                continue
+            self.requested_count += 1
+            if view in self._dirty:
+                self.coalesced_count += 1
+            self._dirty.add(view)
+        if self._dirty and not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self, *_) -> None:
+        """Atualiza agora as views sujas que estão visíveis (ex.: ao trocar de aba)."""
+        self._timer.stop()
+        for view in [v for v in self._views if v in self._dirty]:
+            refresh, is_visible = self._views[view]
+            if not is_visible():
+                self.deferred_count += 1
+                continue
+            self._dirty.discard(view)
+            self.executed_count += 1
+            refresh()
+
+    def is_dirty(self, view: str) -> bool:
+        return view in self._dirty
+
+    @property
+    def skipped_count(self) -> int:
+        return self.requested_count - self.executed_count - len(self._dirty)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requested": self.requested_count,
+            "executed": self.executed_count,
+            "skipped": self.skipped_count,
+            "coalesced": self.coalesced_count,
+            "deferred": self.deferred_count,
+            "pending": len(self._dirty),
+        }
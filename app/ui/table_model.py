@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtWidgets import QAbstractItemView, QHeaderView, QTableView
+
+from app.utils.formatting import format_cents_brl, format_date_brl
+
+ALIGN_RIGHT = int(Qt.AlignRight | Qt.AlignVCenter)
+
+
+def format_percent(value: float) -> str:
+    return f"{value:.1f}%".replace('.', ',')
+
+
+@dataclass(frozen=True)
+class TableColumn:
+    header: str
+    key: Union[str, Callable[[Dict], Any]]  # chave do dict ou função que extrai o valor
+    formatter: Optional[Callable[[Any], str]] = None
+    alignment: Optional[int] = None
+
+    def value(self, row: Dict) -> Any:
+        if callable(self.key):
+            return self.key(row)
+        return row.get(self.key, "")
+
+
+def currency_column(header: str, key) -> TableColumn:
+    return TableColumn(header, key, format_cents_brl, ALIGN_RIGHT)
+
+
+# Colunas padrão das tabelas de despesas/receitas
+TRANSACTION_COLUMNS = (
+    TableColumn("Data", "date", format_date_brl),
+    TableColumn("Categoria", "category"),
+    TableColumn("Descrição", "description"),
+    currency_column("Valor (R$)", "amount"),
+)
+
+
+def transaction_cursor(row: Dict) -> tuple:
+    """Cursor de paginação das listas de lançamentos: (data, id)."""
+    return row.get("date", ""), row.get("id", 0)
+
+
+class RecordTableModel(QAbstractTableModel):
+    """Modelo de tabela somente leitura sobre uma lista de dicts.
+
+    Os valores são formatados sob demanda em `data()`, então apenas as células
+    visíveis geram strings; nenhum QTableWidgetItem é alocado.
+    """
+
+    def __init__(self, columns: Sequence[TableColumn], parent=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._rows: List[Dict] = []
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = self._columns[index.column()]
+        if role == Qt.DisplayRole:
+            value = column.value(self._rows[index.row()])
+            if column.formatter is not None:
+                return column.formatter(value)
+            return "" if value is None else str(value)
+        if role == Qt.TextAlignmentRole:
+            return column.alignment
+        if role == Qt.UserRole:
+            return self._rows[index.row()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self._columns):
+            return self._columns[section].header
+        return super().headerData(section, orientation, role)
+
+    # ---- API pública ----
+    def set_rows(self, rows) -> None:
+        """Substitui todas as linhas num único reset do modelo."""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self.endResetModel()
+
+    def rows(self) -> List[Dict]:
+        return self._rows
+
+    def row_at(self, row: int) -> Optional[Dict]:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_id(self, row: int) -> Optional[int]:
+        item = self.row_at(row)
+        return item.get("id") if item is not None else None
+
+
+# Tamanho padrão das páginas buscadas sob demanda
+PAGE_SIZE = 500
+
+
+class PagedRecordTableModel(RecordTableModel):
+    """Modelo que carrega as linhas em páginas conforme a rolagem (canFetchMore/fetchMore).
+
+    `fetch_page(after, limit)` recebe o cursor da última linha carregada
+    (calculado por `cursor_key`) ou None para a primeira página.
+    """
+
+    def __init__(self, columns: Sequence[TableColumn], cursor_key: Callable[[Dict], Any], page_size: int = PAGE_SIZE, parent=None):
+        super().__init__(columns, parent)
+        self._cursor_key = cursor_key
+        self._page_size = page_size
+        self._fetch_page: Optional[Callable[[Any, int], List[Dict]]] = None
+        self._exhausted = True
+
+    def set_source(self, fetch_page: Optional[Callable[[Any, int], List[Dict]]], first_page: Optional[List[Dict]] = None) -> None:
+        """Troca a origem dos dados e carrega apenas a primeira página.
+
+        `first_page` pode vir pré-carregada (ex.: buscada em segundo plano).
+        """
+        self._fetch_page = fetch_page
+        if first_page is not None:
+            first = first_page
+        else:
+            first = fetch_page(None, self._page_size) if fetch_page else []
+        self._exhausted = len(first) < self._page_size
+        self.set_rows(first)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+        return not self._exhausted and self._fetch_page is not None
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        if not self.canFetchMore(parent):
+            return
+        after = self._cursor_key(self._rows[-1]) if self._rows else None
+        page = self._fetch_page(after, self._page_size)
+        self._exhausted = len(page) < self._page_size
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+
+def create_table_view(model: QAbstractTableModel, selectable: bool = True) -> QTableView:
+    """Cria um QTableView com a aparência padrão das tabelas do app."""
+    view = QTableView()
+    view.setModel(model)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    # Altura fixa das linhas: evita medir cada linha em modelos grandes
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.setAlternatingRowColors(True)
+    view.setShowGrid(False)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    if selectable:
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+    return view
@@ -1,29 +1,31 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QFormLayout, QHBoxLayout, QTableWidget,
-    QTableWidgetItem, QLabel, QPushButton, QComboBox, QLineEdit, QDateEdit, QHeaderView
+    QWidget, QVBoxLayout, QFormLayout, QHBoxLayout,
+    QLabel, QPushButton, QComboBox, QLineEdit, QDateEdit
 )
 from PyQt5.QtCore import QDate, Qt, QLocale
 from PyQt5.QtGui import QIcon
 import os
 
-from app.utils.formatting import format_currency_brl, format_date_brl
+from app.utils.formatting import format_cents_brl, format_usage
 from app.ui.widgets.money_line_edit import MoneyLineEdit
+from app.ui.widgets.repeat_combo import RepeatComboBox
+from app.ui.table_model import PagedRecordTableModel, TRANSACTION_COLUMNS, create_table_view, transaction_cursor
 from app.config import ICONS_DIR
 
 
 class ExpensesTab(QWidget):
-    def __init__(self, expense_controller, category_service, on_refresh_tables, on_refresh_reports=None):
+    def __init__(self, expense_controller, category_service, on_refresh_tables, on_refresh_reports=None, recurrence_service=None):
         super().__init__()
         self.expense_controller = expense_controller
         self.category_service = category_service
         self.on_refresh_tables = on_refresh_tables
         self.on_refresh_reports = on_refresh_reports
+        self.recurrence_service = recurrence_service
 
-        self.expense_edit_index = None
-        self.expense_row_to_index = []
+        self.expense_edit_id = None
 
         self._build_ui()
-        self.reload_categories()
+        # Categorias são carregadas pela janela principal após ser exibida
 
     def _build_ui(self):
         layout = QVBoxLayout()
@@ -45,11 +47,13 @@ class ExpensesTab(QWidget):
 
         self.expense_description_edit = QLineEdit()
         self.expense_amount_edit = MoneyLineEdit()
+        self.expense_repeat_box = RepeatComboBox(); self.expense_repeat_box.setToolTip("Gera o lançamento automaticamente a cada período a partir da data")
 
         form_layout.addRow("Data:", self.expense_date_edit)
         form_layout.addRow("Categoria:", cat_row_w)
         form_layout.addRow("Descrição:", self.expense_description_edit)
         form_layout.addRow("Valor (R$):", self.expense_amount_edit)
+        form_layout.addRow("Repetir:", self.expense_repeat_box)
         layout.addLayout(form_layout)
 
         btn_layout = QHBoxLayout()
@@ -63,18 +67,18 @@ class ExpensesTab(QWidget):
         btn_layout.addWidget(self.expense_save_edit_btn)
         layout.addLayout(btn_layout)
 
-        self.expense_table = QTableWidget(0, 4)
-        self.expense_table.setHorizontalHeaderLabels(["Data", "Categoria", "Descrição", "Valor (R$)"])
-        self.expense_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.expense_table.setAlternatingRowColors(True)
-        self.expense_table.setShowGrid(False)
-        self.expense_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.expense_table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
+        self.expense_model = PagedRecordTableModel(TRANSACTION_COLUMNS, transaction_cursor, parent=self)
+        self.expense_table = create_table_view(self.expense_model)
         layout.addWidget(self.expense_table)
 
         self.expense_total_label = QLabel("Total de despesas: R$ 0,00")
         layout.addWidget(self.expense_total_label)
 
+    def set_expenses_source(self, fetch_page, month_total: int, first_page=None) -> None:
+        """Define a função de paginação do mês exibido; as linhas são buscadas sob demanda."""
+        self.expense_model.set_source(fetch_page, first_page)
+        self.expense_total_label.setText(f"Total do mês: {format_cents_brl(month_total)}")
+
     def apply_locale(self, locale: QLocale):
         if isinstance(self.expense_date_edit, QDateEdit):
             self.expense_date_edit.setLocale(locale)
@@ -86,8 +90,11 @@ class ExpensesTab(QWidget):
 
     def reload_categories(self):
         try:
+            # Lista em cache no serviço; o combo só é refeito se ela mudou
             cats = self.category_service.list_by_type('expense')
-            self.expense_category_box.clear(); self.expense_category_box.addItems(cats)
+            box = self.expense_category_box
+            if cats != [box.itemText(i) for i in range(box.count())]:
+                box.clear(); box.addItems(cats)
         except Exception:
             pass
 
@@ -95,12 +102,19 @@ class ExpensesTab(QWidget):
         date_str = self.expense_date_edit.date().toString("yyyy-MM-dd")
         category = self.expense_category_box.currentText()
         description = self.expense_description_edit.text().strip()
-        amount = self.expense_amount_edit.value()
-        if amount <= 0.0:
+        amount = self.expense_amount_edit.cents()
+        if amount <= 0:
             return
-        self.expense_controller.add_expense(date_str, category, description, amount)
+        frequency = self.expense_repeat_box.frequency()
+        if frequency and self.recurrence_service is not None:
+            # A regra gera este e os próximos lançamentos (os vencidos já agora)
+            self.recurrence_service.add_recurrence('expense', frequency, date_str, amount, description, category=category)
+            self.recurrence_service.materialize()
+        else:
+            self.expense_controller.add_expense(date_str, category, description, amount)
         self.expense_description_edit.clear()
         self.expense_amount_edit.clear()
+        self.expense_repeat_box.reset()
         if callable(self.on_refresh_tables):
             self.on_refresh_tables()
         if callable(self.on_refresh_reports):
@@ -115,14 +129,9 @@ class ExpensesTab(QWidget):
         selected = self.expense_table.selectionModel().selectedRows()
         if not selected:
             return
-        rows = sorted([idx.row() for idx in selected], reverse=True)
-        if not hasattr(self, 'expense_row_to_index'):
-            return
-        indices = []
-        for r in rows:
-            if 0 <= r < len(self.expense_row_to_index):
-                indices.append(self.expense_row_to_index[r])
-        self.expense_controller.delete_expenses(indices)
+        ids = [self.expense_model.row_id(idx.row()) for idx in selected]
+        ids = [i for i in ids if i is not None]
+        self.expense_controller.delete_expenses(ids)
         if callable(self.on_refresh_tables):
             self.on_refresh_tables()
         if callable(self.on_refresh_reports):
@@ -136,13 +145,12 @@ class ExpensesTab(QWidget):
         if len(selected) != 1:
             return
         row = selected[0].row()
-        if not hasattr(self, 'expense_row_to_index') or row < 0 or row >= len(self.expense_row_to_index):
+        expense_id = self.expense_model.row_id(row)
+        if expense_id is None:
             return
-        full_idx = self.expense_row_to_index[row]
-        items = self.expense_controller.list_expenses()
-        if full_idx < 0 or full_idx >= len(items):
+        item = self.expense_controller.get_expense(expense_id)
+        if item is None:
             return
-        item = items[full_idx]
         qdate = QDate.fromString(item.get("date", ""), "yyyy-MM-dd")
         if not qdate.isValid():
             qdate = QDate.currentDate()
@@ -159,24 +167,24 @@ class ExpensesTab(QWidget):
                     pass
         self.expense_category_box.setCurrentText(item.get("category", ""))
         self.expense_description_edit.setText(item.get("description", ""))
-        amount = float(item.get("amount", 0.0))
-        self.expense_amount_edit.setText(format_currency_brl(amount).replace("R$ ", ""))
-        self.expense_edit_index = full_idx
+        amount = int(item.get("amount", 0))
+        self.expense_amount_edit.setText(format_cents_brl(amount).replace("R$ ", ""))
+        self.expense_edit_id = expense_id
         self.expense_save_edit_btn.setEnabled(True)
         self.expense_add_btn.setEnabled(False)
         self.expense_delete_btn.setEnabled(False)
 
     def _on_save_expense_edit(self):
-        if self.expense_edit_index is None:
+        if self.expense_edit_id is None:
             return
         date_str = self.expense_date_edit.date().toString("yyyy-MM-dd")
         category = self.expense_category_box.currentText()
         description = self.expense_description_edit.text().strip()
-        amount = self.expense_amount_edit.value()
-        if amount <= 0.0:
+        amount = self.expense_amount_edit.cents()
+        if amount <= 0:
             return
-        self.expense_controller.update_expense(self.expense_edit_index, date_str, category, description, amount)
-        self.expense_edit_index = None
+        self.expense_controller.update_expense(self.expense_edit_id, date_str, category, description, amount)
+        self.expense_edit_id = None
         self.expense_save_edit_btn.setEnabled(False)
         self.expense_add_btn.setEnabled(True)
         self.expense_delete_btn.setEnabled(True)
@@ -207,13 +215,18 @@ class ExpensesTab(QWidget):
 
     def _on_manage_categories(self):
         from PyQt5.QtWidgets import QInputDialog, QMessageBox
-        cats = self.category_service.list_by_type('expense')
-        if not cats:
+        # Uso de cada categoria vem de uma consulta agrupada em cache
+        usage = self.category_service.usage_by_type('expense')
+        if not usage:
             QMessageBox.information(self, "Categorias", "Nenhuma categoria encontrada.")
             return
-        sel, ok = QInputDialog.getItem(self, "Gerenciar categorias", "Selecione a categoria:", cats, 0, False)
+        cats = [u["name"] for u in usage]
+        labels = [format_usage(u, "lançamento", "lançamentos") for u in usage]
+        label, ok = QInputDialog.getItem(self, "Gerenciar categorias", "Selecione a categoria:", labels, 0, False)
         if not ok:
             return
+        i = labels.index(label)
+        sel, used = cats[i], usage[i]["count"]
         action, ok2 = QInputDialog.getItem(self, "Ação", "Escolha a ação:", ["Renomear", "Excluir"], 0, False)
         if not ok2:
             return
@@ -229,6 +242,13 @@ class ExpensesTab(QWidget):
                 QMessageBox.information(self, "Categorias", "Categoria renomeada com sucesso.")
             else:
                 QMessageBox.warning(self, "Categorias", "Não foi possível renomear a categoria.")
+        elif not used:
+            # Sem lançamentos: nada a reatribuir
+            success = self.category_service.delete_category(sel, 'expense')
+            if success:
+                QMessageBox.information(self, "Categorias", "Categoria excluída.")
+            else:
+                QMessageBox.warning(self, "Categorias", "Não foi possível excluir a categoria.")
         else:
             # Exclusão com reatribuição
             self.category_service.add_category("Outros", 'expense')
@@ -238,7 +258,7 @@ class ExpensesTab(QWidget):
             if not reassign_options:
                 QMessageBox.information(self, "Categorias", "Crie outra categoria para reatribuir antes de excluir.")
                 return
-            reassign_to, ok4 = QInputDialog.getItem(self, "Reatribuir lançamentos", "Mover lançamentos para:", reassign_options, 0, False)
+            reassign_to, ok4 = QInputDialog.getItem(self, "Reatribuir lançamentos", f"Mover {used} lançamento(s) para:", reassign_options, 0, False)
             if not ok4:
                 return
             success = self.category_service.delete_category(sel, 'expense', reassign_to=reassign_to)
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QFormLayout, QLineEdit, QComboBox, QDateEdit,
-    QPushButton, QTableWidget, QTableWidgetItem, QLabel, QHBoxLayout, QTabWidget, QHeaderView, QInputDialog, QMessageBox
+    QPushButton, QLabel, QHBoxLayout, QTabWidget, QInputDialog, QMessageBox
 )
 from PyQt5.QtCore import QDate, Qt, QSize, QLocale
 from PyQt5.QtGui import QIcon
@@ -8,20 +8,44 @@ import os
 
 from app.controllers.investment_controller import InvestmentController
 from app.ui.widgets.money_line_edit import MoneyLineEdit
-from app.utils.formatting import format_currency_brl, format_date_brl
+from app.ui.widgets.repeat_combo import RepeatComboBox
+from app.utils.formatting import format_cents_brl, format_date_brl, format_usage
+from app.ui.table_model import RecordTableModel, TableColumn, currency_column, create_table_view, format_percent, ALIGN_RIGHT
 from app.config import ICONS_DIR
 from app.services.broker_service import BrokerService
+from app.services.import_service import parse_amount
+from app.ui.data_worker import DataWorker
+
+INVESTMENT_COLUMNS = (
+    TableColumn("Investimento", "name"),
+    TableColumn("Corretora", "broker"),
+    TableColumn("Data", "start_date", format_date_brl),
+    currency_column("Valor inicial (R$)", "initial_amount"),
+    currency_column("Aportes (R$)", "contributions_sum"),
+    currency_column("Total investido (R$)", "total"),
+    TableColumn("Valor atual (R$)", "value", lambda v: "—" if v is None else format_cents_brl(v), ALIGN_RIGHT),
+    TableColumn("Rentab. a.a. (TIR)", "xirr", lambda v: "—" if v is None else format_percent(v * 100), ALIGN_RIGHT),
+    TableColumn("Rentab. (TWR)", "twr", lambda v: "—" if v is None else format_percent(v * 100), ALIGN_RIGHT),
+)
+
+CONTRIBUTION_COLUMNS = (
+    TableColumn("Data", "date", format_date_brl),
+    TableColumn("Descrição", "description"),
+    currency_column("Valor (R$)", "amount"),
+)
 
 
 class InvestmentsTab(QWidget):
     """Aba de Investimentos dividida em sub-abas: Investimento e Aportes."""
 
-    def __init__(self, investment_controller: InvestmentController, broker_service: BrokerService):
+    def __init__(self, investment_controller: InvestmentController, broker_service: BrokerService, data_worker: DataWorker | None = None, recurrence_service=None):
         super().__init__()
         self.investment_controller = investment_controller
         self.broker_service = broker_service
-        self.investment_edit_index = None
-        self.current_investment_index = None
+        self.data_worker = data_worker
+        self.recurrence_service = recurrence_service
+        self.investment_edit_id = None
+        self.current_investment_id = None
 
         layout = QVBoxLayout(self)
 
@@ -77,21 +101,18 @@ class InvestmentsTab(QWidget):
         self.investment_add_btn = QPushButton("Adicionar investimento"); self.investment_add_btn.setIcon(QIcon(os.path.join(ICONS_DIR, "plus.svg"))); self.investment_add_btn.clicked.connect(self._on_add_investment)
         self.investment_delete_btn = QPushButton("Excluir selecionado(s)"); self.investment_delete_btn.setIcon(QIcon(os.path.join(ICONS_DIR, "trash.svg"))); self.investment_delete_btn.setProperty('variant', 'secondary'); self.investment_delete_btn.clicked.connect(self._on_delete_investment)
         inv_edit_btn = QPushButton("Editar selecionado"); inv_edit_btn.setIcon(QIcon(os.path.join(ICONS_DIR, "edit.svg"))); inv_edit_btn.setProperty('variant', 'secondary'); inv_edit_btn.clicked.connect(self._on_edit_investment_prepare)
+        self.investment_value_btn = QPushButton("Informar valor atual"); self.investment_value_btn.setProperty('variant', 'secondary'); self.investment_value_btn.setToolTip("Valor de mercado hoje: base da rentabilidade (TIR e TWR)"); self.investment_value_btn.clicked.connect(self._on_set_valuation)
         self.investment_save_edit_btn = QPushButton("Salvar edição"); self.investment_save_edit_btn.setIcon(QIcon(os.path.join(ICONS_DIR, "save.svg"))); self.investment_save_edit_btn.setProperty('variant', 'secondary'); self.investment_save_edit_btn.setEnabled(False); self.investment_save_edit_btn.clicked.connect(self._on_save_investment_edit)
         btn_layout.addWidget(self.investment_add_btn)
         btn_layout.addWidget(self.investment_delete_btn)
         btn_layout.addWidget(inv_edit_btn)
         btn_layout.addWidget(self.investment_save_edit_btn)
+        btn_layout.addWidget(self.investment_value_btn)
         inv_layout.addLayout(btn_layout)
 
-        self.investment_table = QTableWidget(0, 6)
-        self.investment_table.setHorizontalHeaderLabels(["Investimento", "Corretora", "Data", "Valor inicial (R$)", "Aportes (R$)", "Total investido (R$)"])
-        self.investment_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.investment_table.setAlternatingRowColors(True)
-        self.investment_table.setShowGrid(False)
-        self.investment_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.investment_table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
-        self.investment_table.itemSelectionChanged.connect(self._on_investment_selection_changed)
+        self.investment_model = RecordTableModel(INVESTMENT_COLUMNS, self)
+        self.investment_table = create_table_view(self.investment_model)
+        self.investment_table.selectionModel().selectionChanged.connect(self._on_investment_selection_changed)
         inv_layout.addWidget(self.investment_table)
 
         self.investment_total_label = QLabel("Total investido: R$ 0,00")
@@ -109,9 +130,11 @@ class InvestmentsTab(QWidget):
         self.aporte_date_edit = QDateEdit(); self.aporte_date_edit.setCalendarPopup(True); self.aporte_date_edit.setDisplayFormat("dd/MM/yyyy"); self.aporte_date_edit.setDate(QDate.currentDate())
         self.aporte_description_edit = QLineEdit()
         self.aporte_amount_edit = MoneyLineEdit()
+        self.aporte_repeat_box = RepeatComboBox(); self.aporte_repeat_box.setToolTip("Gera o aporte automaticamente a cada período a partir da data")
         aporte_form.addRow("Data:", self.aporte_date_edit)
         aporte_form.addRow("Descrição:", self.aporte_description_edit)
         aporte_form.addRow("Valor (R$):", self.aporte_amount_edit)
+        aporte_form.addRow("Repetir:", self.aporte_repeat_box)
         aport_layout.addLayout(aporte_form)
 
         aporte_btns = QHBoxLayout()
@@ -121,21 +144,16 @@ class InvestmentsTab(QWidget):
         aporte_btns.addWidget(self.aporte_delete_btn)
         aport_layout.addLayout(aporte_btns)
 
-        self.contributions_table = QTableWidget(0, 3)
-        self.contributions_table.setHorizontalHeaderLabels(["Data", "Descrição", "Valor (R$)"])
-        self.contributions_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.contributions_table.setAlternatingRowColors(True)
-        self.contributions_table.setShowGrid(False)
-        self.contributions_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.contributions_table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
+        self.contributions_model = RecordTableModel(CONTRIBUTION_COLUMNS, self)
+        self.contributions_table = create_table_view(self.contributions_model)
         aport_layout.addWidget(self.contributions_table)
 
         investments_tabs.addTab(inv_tab, "Investimento")
         investments_tabs.addTab(aport_tab, "Aportes")
         layout.addWidget(investments_tabs)
 
-        # Inicializações
-        self._load_brokers()
+        # Inicialização assíncrona: corretoras e combo de aportes são
+        # preenchidos quando a consulta de investimentos retorna
         self._refresh_investments()
 
     # ---- API pública ----
@@ -159,12 +177,33 @@ class InvestmentsTab(QWidget):
         self._refresh_investments()
 
     # ---- Implementação ----
+    def _run_query(self, key, fn, on_result):
+        # Consultas vão para o DataWorker quando disponível; senão rodam na hora
+        if self.data_worker is None:
+            on_result(fn())
+        else:
+            self.data_worker.submit(key, fn, on_result)
+
     def _load_brokers(self):
         brokers = self.broker_service.list_all()
-        self.investment_broker_box.clear(); self.investment_broker_box.addItems(brokers)
-        self.aporte_investment_box.clear()
-        invs = self.investment_controller.list_investments()
-        self.aporte_investment_box.addItems([f"{i.get('name','')} ({i.get('broker','')})" for i in invs])
+        current = [self.investment_broker_box.itemText(i) for i in range(self.investment_broker_box.count())]
+        if brokers != current:
+            self.investment_broker_box.clear(); self.investment_broker_box.addItems(brokers)
+
+    def _load_aporte_investments(self, items):
+        # Combo de aportes montado com os investimentos já carregados para a tabela
+        choices = [(f"{i.get('name','')} ({i.get('broker','')})", i.get("id")) for i in items]
+        box = self.aporte_investment_box
+        if choices == [(box.itemText(i), box.itemData(i)) for i in range(box.count())]:
+            return
+        selected = box.currentData()
+        box.clear()
+        # O id do investimento fica como dado do item do combo
+        for label, inv_id in choices:
+            box.addItem(label, inv_id)
+        idx = box.findData(selected)
+        if idx >= 0:
+            box.setCurrentIndex(idx)
 
     def _on_add_broker(self):
         name, ok = QInputDialog.getText(self, "Nova corretora", "Nome:")
@@ -180,13 +219,17 @@ class InvestmentsTab(QWidget):
         self.investment_broker_box.setCurrentText(name)
 
     def _on_manage_brokers(self):
-        brokers = self.broker_service.list_all()
-        if not brokers:
+        usage = self.broker_service.usage()
+        if not usage:
             QMessageBox.information(self, "Corretoras", "Nenhuma corretora encontrada.")
             return
-        sel, ok = QInputDialog.getItem(self, "Gerenciar corretoras", "Selecione a corretora:", brokers, 0, False)
+        brokers = [u["name"] for u in usage]
+        labels = [format_usage(u, "investimento", "investimentos") for u in usage]
+        label, ok = QInputDialog.getItem(self, "Gerenciar corretoras", "Selecione a corretora:", labels, 0, False)
         if not ok:
             return
+        i = labels.index(label)
+        sel, used = brokers[i], usage[i]["count"]
         action, ok2 = QInputDialog.getItem(self, "Ação", "Escolha a ação:", ["Renomear", "Excluir"], 0, False)
         if not ok2:
             return
@@ -199,12 +242,15 @@ class InvestmentsTab(QWidget):
                 return
             success = self.broker_service.rename_broker(sel, new_name)
             QMessageBox.information(self, "Corretoras", "Corretora renomeada." if success else "Não foi possível renomear.")
+        elif not used:
+            success = self.broker_service.delete_broker(sel)
+            QMessageBox.information(self, "Corretoras", "Corretora excluída." if success else "Não foi possível excluir.")
         else:
             reassign_options = [b for b in brokers if b != sel]
             if not reassign_options:
                 QMessageBox.information(self, "Corretoras", "Crie outra corretora para reatribuir antes de excluir.")
                 return
-            reassign_to, ok4 = QInputDialog.getItem(self, "Reatribuir investimentos", "Mover para:", reassign_options, 0, False)
+            reassign_to, ok4 = QInputDialog.getItem(self, "Reatribuir investimentos", f"Mover {used} investimento(s) para:", reassign_options, 0, False)
             if not ok4:
                 return
             success = self.broker_service.delete_broker(sel, reassign_to=reassign_to)
@@ -217,7 +263,7 @@ class InvestmentsTab(QWidget):
         broker = self.investment_broker_box.currentText().strip()
         start_date = self.investment_start_date_edit.date().toString("yyyy-MM-dd")
         description = self.investment_description_edit.text().strip()
-        initial_amount = self.investment_initial_amount_edit.value()
+        initial_amount = self.investment_initial_amount_edit.cents()
         if not name or not broker:
             return
         self.investment_controller.add_investment(name, broker, start_date, description, initial_amount)
@@ -226,42 +272,48 @@ class InvestmentsTab(QWidget):
         self._refresh_investments()
 
     def _refresh_investments(self):
-        items = self.investment_controller.list_investments()
-        self.investment_row_to_index = list(range(len(items)))
-        self.investment_table.setRowCount(0)
-        for idx, item in enumerate(items):
-            row = self.investment_table.rowCount()
-            self.investment_table.insertRow(row)
-            self.investment_table.setItem(row, 0, QTableWidgetItem(item.get("name", "")))
-            self.investment_table.setItem(row, 1, QTableWidgetItem(item.get("broker", "")))
-            self.investment_table.setItem(row, 2, QTableWidgetItem(format_date_brl(item.get("start_date", ""))))
-            init_item = QTableWidgetItem(format_currency_brl(item.get("initial_amount", 0.0)))
-            init_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.investment_table.setItem(row, 3, init_item)
-            contrib_sum = self.investment_controller.contributions_sum(idx)
-            contrib_item = QTableWidgetItem(format_currency_brl(contrib_sum))
-            contrib_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.investment_table.setItem(row, 4, contrib_item)
-            total_item = QTableWidgetItem(format_currency_brl(float(item.get("initial_amount", 0.0)) + contrib_sum))
-            total_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.investment_table.setItem(row, 5, total_item)
-        total = self.investment_controller.total_invested()
-        self.investment_total_label.setText(f"Total investido: {format_currency_brl(total)}")
+        self._run_query("investments", self._load_investments_data, self._apply_investments_data)
+
+    def _load_investments_data(self):
+        return self.investment_controller.list_investments_with_returns(), self.investment_controller.total_invested()
+
+    def _apply_investments_data(self, data):
+        items, total = data
+        self.investment_model.set_rows(items)
+        self.investment_total_label.setText(f"Total investido: {format_cents_brl(total)}")
         self._load_brokers()
+        self._load_aporte_investments(items)
         self._refresh_contributions_table()
 
+    def _on_set_valuation(self):
+        selected = self.investment_table.selectionModel().selectedRows()
+        if len(selected) != 1:
+            QMessageBox.information(self, "Valor atual", "Selecione um investimento.")
+            return
+        item = self.investment_model.row_at(selected[0].row())
+        if item is None:
+            return
+        text, ok = QInputDialog.getText(self, "Valor atual", f"Valor de mercado de {item['name']} hoje (R$):")
+        if not ok:
+            return
+        try:
+            value = parse_amount(text)
+        except ValueError:
+            QMessageBox.warning(self, "Valor atual", "Valor inválido.")
+            return
+        if value < 0:
+            return
+        self.investment_controller.add_valuation(item["id"], QDate.currentDate().toString("yyyy-MM-dd"), value)
+        self._refresh_investments()
+
     def _on_delete_investment(self):
         selected = self.investment_table.selectionModel().selectedRows()
         if not selected:
             return
-        indices = []
-        for s in selected:
-            row = s.row()
-            if row < 0 or row >= len(self.investment_row_to_index):
-                continue
-            indices.append(self.investment_row_to_index[row])
-        if indices:
-            self.investment_controller.delete_investments(indices)
+        ids = [self.investment_model.row_id(s.row()) for s in selected]
+        ids = [i for i in ids if i is not None]
+        if ids:
+            self.investment_controller.delete_investments(ids)
             self._refresh_investments()
 
     def _on_edit_investment_prepare(self):
@@ -269,13 +321,10 @@ class InvestmentsTab(QWidget):
         if len(selected) != 1:
             return
         row = selected[0].row()
-        if not hasattr(self, 'investment_row_to_index') or row < 0 or row >= len(self.investment_row_to_index):
-            return
-        full_idx = self.investment_row_to_index[row]
-        items = self.investment_controller.list_investments()
-        if full_idx < 0 or full_idx >= len(items):
+        item = self.investment_model.row_at(row)
+        if item is None:
             return
-        item = items[full_idx]
+        investment_id = item["id"]
         self.investment_name_edit.setText(item.get("name", ""))
         broker = item.get("broker", "")
         if broker and broker not in [self.investment_broker_box.itemText(i) for i in range(self.investment_broker_box.count())]:
@@ -287,8 +336,8 @@ class InvestmentsTab(QWidget):
             qdate = QDate.currentDate()
         self.investment_start_date_edit.setDate(qdate)
         self.investment_description_edit.setText(item.get("description", ""))
-        self.investment_initial_amount_edit.setText(format_currency_brl(float(item.get("initial_amount", 0.0))).replace("R$ ", ""))
-        self.investment_edit_index = full_idx
+        self.investment_initial_amount_edit.setText(format_cents_brl(int(item.get("initial_amount", 0))).replace("R$ ", ""))
+        self.investment_edit_id = investment_id
         self.investment_save_edit_btn.setEnabled(True)
         if hasattr(self, 'investment_add_btn'):
             self.investment_add_btn.setEnabled(False)
@@ -296,17 +345,17 @@ class InvestmentsTab(QWidget):
             self.investment_delete_btn.setEnabled(False)
 
     def _on_save_investment_edit(self):
-        if self.investment_edit_index is None:
+        if self.investment_edit_id is None:
             return
         name = self.investment_name_edit.text().strip()
         broker = self.investment_broker_box.currentText().strip()
         start_date = self.investment_start_date_edit.date().toString("yyyy-MM-dd")
         description = self.investment_description_edit.text().strip()
-        initial_amount = self.investment_initial_amount_edit.value()
+        initial_amount = self.investment_initial_amount_edit.cents()
         if not name or not broker:
             return
-        self.investment_controller.update_investment(self.investment_edit_index, name, broker, start_date, description, initial_amount)
-        self.investment_edit_index = None
+        self.investment_controller.update_investment(self.investment_edit_id, name, broker, start_date, description, initial_amount)
+        self.investment_edit_id = None
         self.investment_save_edit_btn.setEnabled(False)
         if hasattr(self, 'investment_add_btn'):
             self.investment_add_btn.setEnabled(True)
@@ -315,72 +364,61 @@ class InvestmentsTab(QWidget):
         self.investment_name_edit.clear(); self.investment_description_edit.clear(); self.investment_initial_amount_edit.clear()
         self._refresh_investments()
 
-    def _on_investment_selection_changed(self):
+    def _on_investment_selection_changed(self, *_):
         selected = self.investment_table.selectionModel().selectedRows()
         if len(selected) == 1:
             row = selected[0].row()
-            if hasattr(self, 'investment_row_to_index') and 0 <= row < len(self.investment_row_to_index):
-                self.current_investment_index = self.investment_row_to_index[row]
-                items = self.investment_controller.list_investments()
-                if 0 <= self.current_investment_index < len(items):
-                    label = f"{items[self.current_investment_index].get('name','')} ({items[self.current_investment_index].get('broker','')})"
-                    idx = self.aporte_investment_box.findText(label)
-                    if idx >= 0:
-                        self.aporte_investment_box.setCurrentIndex(idx)
+            investment_id = self.investment_model.row_id(row)
+            if investment_id is not None:
+                self.current_investment_id = investment_id
+                idx = self.aporte_investment_box.findData(self.current_investment_id)
+                if idx >= 0:
+                    self.aporte_investment_box.setCurrentIndex(idx)
         self._refresh_contributions_table()
 
-    def _investment_index_for_aporte(self) -> int | None:
-        labels = [f"{i.get('name','')} ({i.get('broker','')})" for i in self.investment_controller.list_investments()]
-        cur = self.aporte_investment_box.currentText()
-        try:
-            return labels.index(cur)
-        except ValueError:
-            return self.current_investment_index
+    def _investment_id_for_aporte(self) -> int | None:
+        inv_id = self.aporte_investment_box.currentData()
+        if inv_id is None:
+            return self.current_investment_id
+        return inv_id
 
     def _refresh_contributions_table(self):
-        inv_idx = self._investment_index_for_aporte()
-        if inv_idx is None:
-            self.contributions_table.setRowCount(0)
-            self.contribution_row_to_index = []
+        inv_id = self._investment_id_for_aporte()
+        if inv_id is None:
+            if self.data_worker is not None:
+                self.data_worker.cancel("contributions")
+            self.contributions_model.set_rows([])
             return
-        contribs = self.investment_controller.list_contributions(inv_idx)
-        self.contribution_row_to_index = list(range(len(contribs)))
-        self.contributions_table.setRowCount(0)
-        for item in contribs:
-            row = self.contributions_table.rowCount()
-            self.contributions_table.insertRow(row)
-            self.contributions_table.setItem(row, 0, QTableWidgetItem(format_date_brl(item.get('date',''))))
-            self.contributions_table.setItem(row, 1, QTableWidgetItem(item.get('description','')))
-            amt_item = QTableWidgetItem(format_currency_brl(item.get('amount',0.0)))
-            amt_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.contributions_table.setItem(row, 2, amt_item)
+        self._run_query(
+            "contributions",
+            lambda: self.investment_controller.list_contributions(inv_id),
+            self.contributions_model.set_rows,
+        )
 
     def _on_add_aporte(self):
-        inv_idx = self._investment_index_for_aporte()
-        if inv_idx is None:
+        inv_id = self._investment_id_for_aporte()
+        if inv_id is None:
             return
         date_str = self.aporte_date_edit.date().toString("yyyy-MM-dd")
         description = self.aporte_description_edit.text().strip()
-        amount = self.aporte_amount_edit.value()
-        if amount <= 0.0:
+        amount = self.aporte_amount_edit.cents()
+        if amount <= 0:
             return
-        self.investment_controller.add_contribution(inv_idx, date_str, description, amount)
-        self.aporte_description_edit.clear(); self.aporte_amount_edit.clear()
+        frequency = self.aporte_repeat_box.frequency()
+        if frequency and self.recurrence_service is not None:
+            self.recurrence_service.add_recurrence('contribution', frequency, date_str, amount, description, investment_id=inv_id)
+            self.recurrence_service.materialize()
+        else:
+            self.investment_controller.add_contribution(inv_id, date_str, description, amount)
+        self.aporte_description_edit.clear(); self.aporte_amount_edit.clear(); self.aporte_repeat_box.reset()
         self._refresh_investments()
 
     def _on_delete_aporte(self):
-        inv_idx = self._investment_index_for_aporte()
-        if inv_idx is None:
-            return
         selected = self.contributions_table.selectionModel().selectedRows()
         if not selected:
             return
-        indices = []
-        for s in selected:
-            row = s.row()
-            if row < 0 or row >= len(self.contribution_row_to_index):
-                continue
-            indices.append(self.contribution_row_to_index[row])
-        if indices:
-            self.investment_controller.delete_contributions(inv_idx, indices)
+        ids = [self.contributions_model.row_id(s.row()) for s in selected]
+        ids = [i for i in ids if i is not None]
+        if ids:
+            self.investment_controller.delete_contributions(ids)
             self._refresh_contributions_table()
\ No newline at end of file
@@ -1,29 +1,31 @@
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QFormLayout, QHBoxLayout, QTableWidget,
-    QTableWidgetItem, QLabel, QPushButton, QComboBox, QLineEdit, QDateEdit, QHeaderView
+    QWidget, QVBoxLayout, QFormLayout, QHBoxLayout,
+    QLabel, QPushButton, QComboBox, QLineEdit, QDateEdit
 )
 from PyQt5.QtCore import QDate, Qt, QLocale
 from PyQt5.QtGui import QIcon
 import os
 
-from app.utils.formatting import format_currency_brl, format_date_brl
+from app.utils.formatting import format_cents_brl, format_usage
 from app.ui.widgets.money_line_edit import MoneyLineEdit
+from app.ui.widgets.repeat_combo import RepeatComboBox
+from app.ui.table_model import PagedRecordTableModel, TRANSACTION_COLUMNS, create_table_view, transaction_cursor
 from app.config import ICONS_DIR
 
 
 class RevenuesTab(QWidget):
-    def __init__(self, revenue_controller, category_service, on_refresh_tables, on_refresh_reports=None):
+    def __init__(self, revenue_controller, category_service, on_refresh_tables, on_refresh_reports=None, recurrence_service=None):
         super().__init__()
         self.revenue_controller = revenue_controller
         self.category_service = category_service
         self.on_refresh_tables = on_refresh_tables
         self.on_refresh_reports = on_refresh_reports
+        self.recurrence_service = recurrence_service
 
-        self.revenue_edit_index = None
-        self.revenue_row_to_index = []
+        self.revenue_edit_id = None
 
         self._build_ui()
-        self.reload_categories()
+        # Categorias são carregadas pela janela principal após ser exibida
 
     def _build_ui(self):
         layout = QVBoxLayout()
@@ -45,11 +47,13 @@ class RevenuesTab(QWidget):
 
         self.revenue_description_edit = QLineEdit()
         self.revenue_amount_edit = MoneyLineEdit()
+        self.revenue_repeat_box = RepeatComboBox(); self.revenue_repeat_box.setToolTip("Gera o lançamento automaticamente a cada período a partir da data")
 
         form_layout.addRow("Data:", self.revenue_date_edit)
         form_layout.addRow("Categoria:", cat_row_w)
         form_layout.addRow("Descrição:", self.revenue_description_edit)
         form_layout.addRow("Valor (R$):", self.revenue_amount_edit)
+        form_layout.addRow("Repetir:", self.revenue_repeat_box)
         layout.addLayout(form_layout)
 
         btn_layout = QHBoxLayout()
@@ -63,18 +67,18 @@ class RevenuesTab(QWidget):
         btn_layout.addWidget(self.revenue_save_edit_btn)
         layout.addLayout(btn_layout)
 
-        self.revenue_table = QTableWidget(0, 4)
-        self.revenue_table.setHorizontalHeaderLabels(["Data", "Categoria", "Descrição", "Valor (R$)"])
-        self.revenue_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.revenue_table.setAlternatingRowColors(True)
-        self.revenue_table.setShowGrid(False)
-        self.revenue_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.revenue_table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
+        self.revenue_model = PagedRecordTableModel(TRANSACTION_COLUMNS, transaction_cursor, parent=self)
+        self.revenue_table = create_table_view(self.revenue_model)
         layout.addWidget(self.revenue_table)
 
         self.revenue_total_label = QLabel("Total de receitas: R$ 0,00")
         layout.addWidget(self.revenue_total_label)
 
+    def set_revenues_source(self, fetch_page, month_total: int, first_page=None) -> None:
+        """Define a função de paginação do mês exibido; as linhas são buscadas sob demanda."""
+        self.revenue_model.set_source(fetch_page, first_page)
+        self.revenue_total_label.setText(f"Total do mês: {format_cents_brl(month_total)}")
+
     def apply_locale(self, locale: QLocale):
         if isinstance(self.revenue_date_edit, QDateEdit):
             self.revenue_date_edit.setLocale(locale)
@@ -86,8 +90,11 @@ class RevenuesTab(QWidget):
 
     def reload_categories(self):
         try:
+            # Lista em cache no serviço; o combo só é refeito se ela mudou
             cats = self.category_service.list_by_type('revenue')
-            self.revenue_category_box.clear(); self.revenue_category_box.addItems(cats)
+            box = self.revenue_category_box
+            if cats != [box.itemText(i) for i in range(box.count())]:
+                box.clear(); box.addItems(cats)
         except Exception:
             pass
 
@@ -95,12 +102,19 @@ class RevenuesTab(QWidget):
         date_str = self.revenue_date_edit.date().toString("yyyy-MM-dd")
         category = self.revenue_category_box.currentText()
         description = self.revenue_description_edit.text().strip()
-        amount = self.revenue_amount_edit.value()
-        if amount <= 0.0:
+        amount = self.revenue_amount_edit.cents()
+        if amount <= 0:
             return
-        self.revenue_controller.add_revenue(date_str, category, description, amount)
+        frequency = self.revenue_repeat_box.frequency()
+        if frequency and self.recurrence_service is not None:
+            # A regra gera este e os próximos lançamentos (os vencidos já agora)
+            self.recurrence_service.add_recurrence('revenue', frequency, date_str, amount, description, category=category)
+            self.recurrence_service.materialize()
+        else:
+            self.revenue_controller.add_revenue(date_str, category, description, amount)
         self.revenue_description_edit.clear()
         self.revenue_amount_edit.clear()
+        self.revenue_repeat_box.reset()
         if callable(self.on_refresh_tables):
             self.on_refresh_tables()
         if callable(self.on_refresh_reports):
@@ -113,14 +127,9 @@ class RevenuesTab(QWidget):
         selected = self.revenue_table.selectionModel().selectedRows()
         if not selected:
             return
-        rows = sorted([idx.row() for idx in selected], reverse=True)
-        if not hasattr(self, 'revenue_row_to_index'):
-            return
-        indices = []
-        for r in rows:
-            if 0 <= r < len(self.revenue_row_to_index):
-                indices.append(self.revenue_row_to_index[r])
-        self.revenue_controller.delete_revenues(indices)
+        ids = [self.revenue_model.row_id(idx.row()) for idx in selected]
+        ids = [i for i in ids if i is not None]
+        self.revenue_controller.delete_revenues(ids)
         if callable(self.on_refresh_tables):
             self.on_refresh_tables()
         if callable(self.on_refresh_reports):
@@ -134,13 +143,12 @@ class RevenuesTab(QWidget):
         if len(selected) != 1:
             return
         row = selected[0].row()
-        if not hasattr(self, 'revenue_row_to_index') or row < 0 or row >= len(self.revenue_row_to_index):
+        revenue_id = self.revenue_model.row_id(row)
+        if revenue_id is None:
             return
-        full_idx = self.revenue_row_to_index[row]
-        items = self.revenue_controller.list_revenues()
-        if full_idx < 0 or full_idx >= len(items):
+        item = self.revenue_controller.get_revenue(revenue_id)
+        if item is None:
             return
-        item = items[full_idx]
         qdate = QDate.fromString(item.get("date", ""), "yyyy-MM-dd")
         if not qdate.isValid():
             qdate = QDate.currentDate()
@@ -157,24 +165,24 @@ class RevenuesTab(QWidget):
                     pass
         self.revenue_category_box.setCurrentText(item.get("category", ""))
         self.revenue_description_edit.setText(item.get("description", ""))
-        amount = float(item.get("amount", 0.0))
-        self.revenue_amount_edit.setText(format_currency_brl(amount).replace("R$ ", ""))
-        self.revenue_edit_index = full_idx
+        amount = int(item.get("amount", 0))
+        self.revenue_amount_edit.setText(format_cents_brl(amount).replace("R$ ", ""))
+        self.revenue_edit_id = revenue_id
         self.revenue_save_edit_btn.setEnabled(True)
         self.revenue_add_btn.setEnabled(False)
         self.revenue_delete_btn.setEnabled(False)
 
     def _on_save_revenue_edit(self):
-        if self.revenue_edit_index is None:
+        if self.revenue_edit_id is None:
             return
         date_str = self.revenue_date_edit.date().toString("yyyy-MM-dd")
         category = self.revenue_category_box.currentText()
         description = self.revenue_description_edit.text().strip()
-        amount = self.revenue_amount_edit.value()
-        if amount <= 0.0:
+        amount = self.revenue_amount_edit.cents()
+        if amount <= 0:
             return
-        self.revenue_controller.update_revenue(self.revenue_edit_index, date_str, category, description, amount)
-        self.revenue_edit_index = None
+        self.revenue_controller.update_revenue(self.revenue_edit_id, date_str, category, description, amount)
+        self.revenue_edit_id = None
         self.revenue_save_edit_btn.setEnabled(False)
         self.revenue_add_btn.setEnabled(True)
         self.revenue_delete_btn.setEnabled(True)
@@ -205,13 +213,18 @@ class RevenuesTab(QWidget):
 
     def _on_manage_categories(self):
         from PyQt5.QtWidgets import QInputDialog, QMessageBox
-        cats = self.category_service.list_by_type('revenue')
-        if not cats:
+        # Uso de cada categoria vem de uma consulta agrupada em cache
+        usage = self.category_service.usage_by_type('revenue')
+        if not usage:
             QMessageBox.information(self, "Categorias", "Nenhuma categoria encontrada.")
             return
-        sel, ok = QInputDialog.getItem(self, "Gerenciar categorias", "Selecione a categoria:", cats, 0, False)
+        cats = [u["name"] for u in usage]
+        labels = [format_usage(u, "lançamento", "lançamentos") for u in usage]
+        label, ok = QInputDialog.getItem(self, "Gerenciar categorias", "Selecione a categoria:", labels, 0, False)
         if not ok:
             return
+        i = labels.index(label)
+        sel, used = cats[i], usage[i]["count"]
         action, ok2 = QInputDialog.getItem(self, "Ação", "Escolha a ação:", ["Renomear", "Excluir"], 0, False)
         if not ok2:
             return
@@ -227,6 +240,13 @@ class RevenuesTab(QWidget):
                 QMessageBox.information(self, "Categorias", "Categoria renomeada com sucesso.")
             else:
                 QMessageBox.warning(self, "Categorias", "Não foi possível renomear a categoria.")
+        elif not used:
+            # Sem lançamentos: nada a reatribuir
+            success = self.category_service.delete_category(sel, 'revenue')
+            if success:
+                QMessageBox.information(self, "Categorias", "Categoria excluída.")
+            else:
+                QMessageBox.warning(self, "Categorias", "Não foi possível excluir a categoria.")
         else:
             # Exclusão com reatribuição
             self.category_service.add_category("Outros", 'revenue')
@@ -236,7 +256,7 @@ class RevenuesTab(QWidget):
             if not reassign_options:
                 QMessageBox.information(self, "Categorias", "Crie outra categoria para reatribuir antes de excluir.")
                 return
-            reassign_to, ok4 = QInputDialog.getItem(self, "Reatribuir lançamentos", "Mover lançamentos para:", reassign_options, 0, False)
+            reassign_to, ok4 = QInputDialog.getItem(self, "Reatribuir lançamentos", f"Mover {used} lançamento(s) para:", reassign_options, 0, False)
             if not ok4:
                 return
             success = self.category_service.delete_category(sel, 'revenue', reassign_to=reassign_to)
@@ -8,7 +8,7 @@ class MoneyLineEdit(QLineEdit):
 
     - Aceita apenas dígitos durante a edição.
     - Formata como 1.234,56 enquanto digita (últimos 2 dígitos são centavos).
-    - Fornece método value() para obter float.
+    - Fornece método value() para obter float e cents() para centavos inteiros.
     """
 
     def __init__(self, parent=None):
@@ -48,4 +48,9 @@ class MoneyLineEdit(QLineEdit):
         try:
             return float(raw)
         except ValueError:
-            return 0.0
\ No newline at end of file
+            return 0.0
+
+    def cents(self) -> int:
+        """Valor digitado em centavos, lido direto dos dígitos (sem float)."""
+        digits = re.sub(r"\D", "", self.text())
+        return int(digits) if digits else 0
@@ -0,0 +1,24 @@
+from PyQt5.QtWidgets import QComboBox
+
+# Rótulo exibido -> frequência da regra de recorrência (None = lançamento único)
+REPEAT_OPTIONS = (
+    ("Não repetir", None),
+    ("Semanal", "weekly"),
+    ("Mensal", "monthly"),
+    ("Anual", "yearly"),
+)
+
+
+class RepeatComboBox(QComboBox):
+    """Seleção da repetição de um lançamento; frequency() devolve None ou 'weekly'/'monthly'/'yearly'."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        for label, frequency in REPEAT_OPTIONS:
+            self.addItem(label, frequency)
+
+    def frequency(self):
+        return self.currentData()
+
+    def reset(self):
+        self.setCurrentIndex(0)
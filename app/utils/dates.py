@@ -0,0 +1,8 @@
+MONTH_NAMES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+
+def month_range(year: int, month: int) -> tuple[str, str]:
+    """Retorna ('YYYY-MM-01', primeiro dia do mês seguinte) para filtros `date >= ? AND date < ?`."""
+    next_month = 1 if month == 12 else month + 1
+    next_year = year + 1 if month == 12 else year
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
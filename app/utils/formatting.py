@@ -5,6 +5,14 @@ def format_currency_brl(value: float) -> str:
     return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
 
+def format_cents_brl(cents: int) -> str:
+    """Formata centavos inteiros como moeda BRL, sem passar por float."""
+    cents = int(cents or 0)
+    sign = "-" if cents < 0 else ""
+    reais, rest = divmod(abs(cents), 100)
+    return f"R$ {sign}{reais:,}".replace(",", ".") + f",{rest:02d}"
+
+
 def format_date_brl(date_str: str) -> str:
     """Converte 'YYYY-MM-DD' para 'DD/MM/YYYY'. Mantém original em caso de erro."""
     if not date_str:
@@ -13,4 +21,16 @@ def format_date_brl(date_str: str) -> str:
         dt = datetime.strptime(date_str, "%Y-%m-%d")
         return dt.strftime("%d/%m/%Y")
     except Exception:
-        return date_str
\ No newline at end of file
+        return date_str
+
+
+def format_usage(usage: dict, singular: str, plural: str) -> str:
+    """Rótulo de uma categoria/corretora: 'Nome — 3 lançamentos · R$ 10,00 · último em 01/02/2025'."""
+    count = int(usage.get("count") or 0)
+    if not count:
+        return f"{usage['name']} — sem {plural}"
+    unit = singular if count == 1 else plural
+    return (
+        f"{usage['name']} — {count} {unit} · {format_cents_brl(usage.get('total'))}"
+        f" · último em {format_date_brl(usage.get('last_date'))}"
+    )
@@ -0,0 +1,16 @@
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+
+def to_cents(value) -> int:
+    """Converte um valor em reais (float, str ou Decimal) para centavos inteiros."""
+    if value is None or value == "":
+        return 0
+    try:
+        amount = Decimal(str(value).strip().replace(",", "."))
+    except InvalidOperation:
+        return 0
+    return int(amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+
+def cents_to_reais(cents: int) -> Decimal:
+    return Decimal(int(cents or 0)) / 100
@@ -0,0 +1,35 @@
+import sys
+import time
+from typing import List, Tuple
+
+
+class StartupTimer:
+    """Marcos da inicialização, em ms desde a importação deste módulo."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+        self.finished = False
+
+    def mark(self, label: str) -> None:
+        self.marks.append((label, (time.perf_counter() - self.t0) * 1000.0))
+
+    def report(self) -> str:
+        lines, previous = ["Inicialização (ms):"], 0.0
+        for label, elapsed in self.marks:
+            lines.append(f"  {label:<24} {elapsed:8.1f}  (+{elapsed - previous:.1f})")
+            previous = elapsed
+        return "\n".join(lines)
+
+    def finish(self, label: str, print_report: bool = False) -> None:
+        """Registra o último marco (só na primeira chamada) e opcionalmente imprime o relatório."""
+        if self.finished:
+            return
+        self.finished = True
+        self.mark(label)
+        if print_report:
+            print(self.report(), file=sys.stderr)
+
+
+# Instância única usada por app.main e pela janela principal
+startup = StartupTimer()
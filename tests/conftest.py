@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+# app.config lê DATA_DIR na importação: os testes nunca tocam o banco real
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="mymoney-tests-")
+
+import pytest  # noqa: E402
+
+from app.services.db import close_connections  # noqa: E402
+from app.services.migrations import ensure_schema  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Banco novo e migrado por teste."""
+    path = str(tmp_path / "mymoney.db")
+    ensure_schema(path)
+    yield path
+    close_connections()
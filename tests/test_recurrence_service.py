@@ -0,0 +1,149 @@
+import pytest
+
+from app.models.investment import Investment
+from app.services.db import get_connection
+from app.services.investment_storage_service import InvestmentStorageService
+from app.services.recurrence_service import RecurrenceService, next_occurrence, occurrences
+
+
+@pytest.fixture
+def service(db_path):
+    svc = RecurrenceService()
+    svc.db_path = db_path
+    return svc
+
+
+def _rows(conn, table):
+    return conn.execute(f"SELECT date, category_id, description, amount FROM {table} ORDER BY date, id").fetchall()
+
+
+def _category_id(conn, name, kind):
+    return conn.execute("SELECT id FROM categories WHERE name = ? AND type = ?", (name, kind)).fetchone()[0]
+
+
+def _next_date(conn, rule_id):
+    return conn.execute("SELECT next_date FROM recurrences WHERE id = ?", (rule_id,)).fetchone()[0]
+
+
+def test_next_occurrence_returns_to_anchor_day():
+    assert next_occurrence("2024-01-31", "monthly", 31) == "2024-02-29"
+    assert next_occurrence("2024-02-29", "monthly", 31) == "2024-03-31"
+    assert next_occurrence("2023-02-28", "monthly", 31) == "2023-03-31"
+    assert next_occurrence("2024-02-29", "yearly", 29) == "2025-02-28"
+    assert next_occurrence("2024-12-30", "weekly", 30) == "2025-01-06"
+
+
+def test_occurrences_matches_next_occurrence():
+    for start, frequency in (("2019-01-31", "monthly"), ("2016-02-29", "yearly"), ("2019-12-28", "weekly")):
+        anchor = int(start[8:10])
+        expected, current = [], start
+        while current <= "2026-12-31":
+            expected.append(current)
+            current = next_occurrence(current, frequency, anchor)
+        assert list(occurrences(start, frequency, anchor, "2026-12-31")) == expected
+
+
+def test_monthly_rule_on_day_31(service):
+    rule_id = service.add_recurrence("expense", "monthly", "2024-01-31", 150000, "Aluguel", category="Moradia")
+
+    counts = service.materialize(until="2024-04-30")
+
+    conn = get_connection(service.db_path)
+    category_id = _category_id(conn, "Moradia", "expense")
+    assert counts == {"expense": 4, "revenue": 0, "contribution": 0}
+    assert _rows(conn, "expenses") == [
+        ("2024-01-31", category_id, "Aluguel", 150000),
+        ("2024-02-29", category_id, "Aluguel", 150000),
+        ("2024-03-31", category_id, "Aluguel", 150000),
+        ("2024-04-30", category_id, "Aluguel", 150000),
+    ]
+    assert _next_date(conn, rule_id) == "2024-05-31"
+
+
+def test_catch_up_over_several_years(service):
+    rent = service.add_recurrence("expense", "monthly", "2019-03-15", 120000, "Aluguel", category="Moradia")
+    gym = service.add_recurrence("expense", "weekly", "2019-03-04", 2500, "Academia", category="Saúde")
+    salary = service.add_recurrence("revenue", "monthly", "2019-03-05", 800000, "Salário", category="Salário")
+    bonus = service.add_recurrence("revenue", "yearly", "2019-12-20", 500000, "Bônus", category="Salário")
+    tax = service.add_recurrence("expense", "yearly", "2020-01-10", 90000, "IPVA", category="Transporte",
+                                 end_date="2022-12-31")
+
+    counts = service.materialize(until="2024-03-14")
+
+    conn = get_connection(service.db_path)
+    weeks = len(list(occurrences("2019-03-04", "weekly", 4, "2024-03-14")))
+    assert counts == {"expense": 60 + weeks + 3, "revenue": 61 + 5, "contribution": 0}
+
+    # Razão mensal e por categoria batem com a soma dos lançamentos gerados
+    for kind, table in (("expense", "expenses"), ("revenue", "revenues")):
+        expected = dict(conn.execute(
+            f"SELECT substr(date, 1, 7), SUM(amount) FROM {table} GROUP BY 1"
+        ).fetchall())
+        ledger = dict(conn.execute("SELECT month, total FROM monthly_totals WHERE kind = ?", (kind,)).fetchall())
+        assert ledger == expected
+    by_category = conn.execute(
+        "SELECT category_id, substr(date, 1, 7), SUM(amount) FROM expenses GROUP BY 1, 2 "
+        "UNION ALL SELECT category_id, substr(date, 1, 7), SUM(amount) FROM revenues GROUP BY 1, 2"
+    ).fetchall()
+    assert sorted(conn.execute("SELECT category_id, month, total FROM category_totals").fetchall()) == sorted(by_category)
+    moradia = _category_id(conn, "Moradia", "expense")
+    assert conn.execute(
+        "SELECT total FROM category_totals WHERE category_id = ? AND month = '2024-02'", (moradia,)
+    ).fetchone()[0] == 120000
+    assert conn.execute(
+        "SELECT total FROM monthly_totals WHERE kind = 'revenue' AND month = '2023-12'"
+    ).fetchone()[0] == 800000 + 500000
+
+    assert _next_date(conn, rent) == "2024-03-15"
+    assert _next_date(conn, gym) == next_occurrence(
+        list(occurrences("2019-03-04", "weekly", 4, "2024-03-14"))[-1], "weekly", 4)
+    assert _next_date(conn, salary) == "2024-04-05"
+    assert _next_date(conn, bonus) == "2024-12-20"
+    assert _next_date(conn, tax) == "2023-01-10"
+
+    # Nada vencido: não gera de novo
+    assert service.materialize(until="2024-03-14") == {"expense": 0, "revenue": 0, "contribution": 0}
+    counts = service.materialize(until="2024-03-15")
+    assert counts["expense"] == 1
+    assert _next_date(conn, rent) == "2024-04-15"
+
+
+def test_contribution_rule_catch_up(service, db_path):
+    storage = InvestmentStorageService()
+    storage.db_path = db_path
+    storage.save_investment(Investment(name="Tesouro", broker="XP", start_date="2020-01-10",
+                                       description="", initial_amount=100000))
+    investment_id = storage.load_investments()[0]["id"]
+    rule_id = service.add_recurrence("contribution", "monthly", "2020-02-10", 50000, "Aporte",
+                                     investment_id=investment_id)
+
+    counts = service.materialize(until="2022-01-31")
+
+    conn = get_connection(db_path)
+    assert counts["contribution"] == 24
+    assert len(storage.load_contributions(investment_id)) == 24
+    assert _next_date(conn, rule_id) == "2022-02-10"
+    assert conn.execute(
+        "SELECT cumulative FROM capital_series WHERE investment_id = ? ORDER BY date DESC LIMIT 1", (investment_id,)
+    ).fetchone()[0] == 100000 + 24 * 50000
+
+
+def test_keeps_callers_transaction(service):
+    conn = get_connection(service.db_path)
+    conn.execute("BEGIN")
+    conn.execute("INSERT INTO expenses (date, description, amount) VALUES ('2024-01-01', 'pendente', 100)")
+
+    # Sem regras vencidas
+    service.materialize(until="2024-01-31")
+    assert conn.in_transaction
+
+    rule_id = conn.execute(
+        "INSERT INTO recurrences (kind, frequency, start_date, next_date, description, amount) "
+        "VALUES ('expense', 'monthly', '2024-01-05', '2024-01-05', 'Internet', 9990)"
+    ).lastrowid
+    assert service.materialize(until="2024-01-31")["expense"] == 1
+    assert conn.in_transaction
+
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM expenses").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM recurrences WHERE id = ?", (rule_id,)).fetchone()[0] == 0